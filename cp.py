@@ -1,22 +1,49 @@
-from typing import Dict, Union, List, Tuple
+from typing import Dict, Union, List, Tuple, Optional
 from glob import glob
 from minizinc import Instance, Model, Solver, Result, model
+from contextlib import aclosing
+import asyncio
+import time
 from utils.plot import plot_vlsi, plot_multi_vlsi
 from natsort import natsorted
 import sys, os
 from datetime import timedelta
 import csv
-from utils.io import txt2dict, save_solution
+from utils.io import save_solution
+from utils.store import expand_instances, load_instance, SolutionStore
+from utils.profile import Profiler, profile_phase
+from utils.budget import Budget, SweepBudget, Status, minizinc_status
+from utils.fzn_cache import FznCache, model_files
+from utils.selector import select_models
+from utils.search import schedule_heights, within_gap, result_quality, SCHEDULES
+from utils.determine_hbound import height_bounds
+from utils.scheduler import plan_cores, available_cores, expected_runtimes, run_jobs, LptScheduler
+from utils.solution_cache import SolutionCache
+from utils.search_config import declares_search, search_data, unsupported, VAR_HEURISTICS, VAL_CHOICES, RESTARTS
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import shutil
 import re
 
 def enumerate_models() -> List[str]:
   """
-  Enumerate implemented models.
+  Enumerate implemented models, files without a solve item (e.g. determine_hbound.mzn) are only included by them.
 
   Returns: List[str]: List of implemented models, sorted by number
   """
 
-  return [x for x in natsorted(glob("cp/*.mzn")) if "hbound" not in x]
+  return [x for x in natsorted(glob("cp/*.mzn")) if declares_solve(x)]
+
+
+def declares_solve(path: str) -> bool:
+  """
+  Args:
+    path (str): Path of the .mzn file
+  Returns:
+    bool: The file has a solve item, i.e. it is a model and not a library of functions or constraints
+  """
+  with open(path) as f:
+    return re.search(r"^\s*solve\b", f.read(), flags=re.M) is not None
 
 
 def enumerate_instances() -> List[str]:
@@ -28,12 +55,13 @@ def enumerate_instances() -> List[str]:
   return natsorted(glob("instances/*.txt"))
 
 
-def report_result(data: Dict[str, Union[int, List[int]]], result: Result, show=False, plot_intermediate=False, **kwargs):
+def report_result(data: Dict[str, Union[int, List[int]]], result: Result, show=False, plot_intermediate=False, profiler=None, **kwargs):
   """Reports to the user the result from a minizinc run
 
   Args: 
     data (Dict[str, Union[int, List[int]]]): Input data for the minizinc instance
     result (Result): Result object from minizinc instance
+    profiler (Profiler, optional): Profiler of decoding and plotting. Defaults to None.
     **kwargs: Additional arguments passed to plot_vlsi function
   """
   stat = result.statistics
@@ -51,9 +79,10 @@ def report_result(data: Dict[str, Union[int, List[int]]], result: Result, show=F
     failures = -1
 
   if len(result) > 0:
-    max_y =  max(result.solution[-1].y)
-    max_y_idx = result.solution[-1].y.index(max_y)
-    height = max_y + data["cheight"][max_y_idx]
+    with profile_phase(profiler, "decode"):
+      max_y =  max(result.solution[-1].y)
+      max_y_idx = result.solution[-1].y.index(max_y)
+      height = max_y + data["cheight"][max_y_idx]
     print("Height: %d" % height)
     print("Took: %ss to find %d solutions" % (time, nSolutions))
     print("Nodes: %s - failures: %s" % (nodes, failures))
@@ -68,12 +97,310 @@ def report_result(data: Dict[str, Union[int, List[int]]], result: Result, show=F
       else:
         rotated = [False for _ in range(len(data["cwidth"]))]
     
-      plot_vlsi(data["cwidth"], data["cheight"], solution_x, solution_y, rotations=rotated, show=show, **kwargs)
+      with profile_phase(profiler, "plot"):
+        plot_vlsi(data["cwidth"], data["cheight"], solution_x, solution_y, rotations=rotated, show=show, **kwargs)
   else:
     print("No partial solutions available")
 
   return time, nSolutions, nodes, failures
 
+def satisfaction_model(path: str, directory: str) -> str:
+  """
+  Writes a copy of a model searching any solution instead of minimizing HEIGHT.
+  Local includes are copied along so that the copy can be compiled from another directory.
+
+  Args:
+    path (str): Path of the .mzn model
+    directory (str): Directory where the copy is written
+  Returns:
+    str: Path of the copy
+  """
+  with open(path) as f:
+    text, n = re.subn(r"solve(.*?)minimize\s+HEIGHT\s*;", r"solve\1satisfy;", f.read(), flags=re.S)
+
+  if n != 1:
+    raise ValueError(f"{path} does not minimize HEIGHT")
+
+  for include in model_files(path)[1:]:
+    shutil.copy(include, directory)
+
+  copy = os.path.join(directory, os.path.basename(path))
+  with open(copy, "w") as f:
+    f.write(text)
+
+  return copy
+
+
+def solution_height(data: Dict[str, Union[int, List[int]]], solution) -> int:
+  """
+  Args:
+    data (Dict[str, Union[int, List[int]]]): Input data for the minizinc instance
+    solution: Solution of a minizinc result
+  Returns:
+    int: Height used by the circuits of the solution
+  """
+  rotated = solution.rotated if hasattr(solution, "rotated") else [False] * data["N"]
+  return max(yc + (wc if r else hc) for yc, wc, hc, r in zip(solution.y, data["cwidth"], data["cheight"], rotated))
+
+
+async def solve_within_gap(instance: Instance, data: Dict[str, Union[int, List[int]]], lower_bound: int, gap: float, **kwargs) -> Result:
+  """Minimizes HEIGHT reading intermediate solutions as they are found, the solver is stopped
+  as soon as one is within the gap of the lower bound.
+
+  Args:
+    instance (Instance): Minizinc instance
+    data (Dict[str, Union[int, List[int]]]): Input data for the minizinc instance
+    lower_bound (int): Height lower bound
+    gap (float): Relative gap accepted between the height and the lower bound
+    **kwargs: Additional arguments passed to the solutions generator
+  Returns:
+    Result: Same as solving with intermediate solutions, with the status of the last solution if the solver has been stopped
+  """
+  start = time.perf_counter()
+  status, solutions, statistics = None, list(), dict()
+
+  # closing the generator stops the solver
+  async with aclosing(instance.solutions(intermediate_solutions=True, **kwargs)) as results:
+    async for result in results:
+      status = result.status
+      statistics.update(result.statistics)
+      if result.solution is not None:
+        solutions.append(result.solution)
+        if within_gap(solution_height(data, result.solution), lower_bound, gap):
+          break
+
+  statistics.setdefault("time", timedelta(seconds=time.perf_counter() - start))
+  return Result(status, solutions, statistics)
+
+
+def probe_heights(solver: Solver, path: str, data: Dict[str, Union[int, List[int]]], budget: Budget,
+                  schedule: str, free_search=False, profiler=None, fzn_cache=None, processes=None,
+                  gap: Optional[float] = None) -> Dict:
+  """Searches the minimum height solving the satisfaction version of a model at fixed heights.
+  The model is loaded once, each height is tried in a branch of it constraining HEIGHT.
+
+  Args:
+    solver (Solver): Minizinc solver
+    path (str): Path of the .mzn model
+    data (Dict[str, Union[int, List[int]]]): Input data for the minizinc instance
+    budget (Budget): Time budget of the instance
+    schedule (str): Order in which heights are tried, one of SCHEDULES
+    free_search (bool, optional): Perform free search. Defaults to False.
+    profiler (Profiler, optional): Profiler of each probe. Defaults to None.
+    fzn_cache (FznCache, optional): Cache of the compiled branches. Defaults to None.
+    processes (int, optional): Threads of the solver, None for sequential search. Defaults to None.
+    gap (Optional[float], optional): Relative gap accepted between the best height and the lower bound. Defaults to None.
+  Returns:
+    Dict: Best height and its solution, status of the search, whether the height is proven optimal,
+    lower bound proven by the search and number of solutions found
+  """
+  # same bounds as the SAT and SMT drivers
+  lower_bound, upper_bound = height_bounds(data, data["WIDTH"])
+  print(f"Searching height in [{lower_bound}, {upper_bound}] with {budget.limit:.2f}s budget")
+
+  best = {"solution": None, "solutions": 0}
+
+  with tempfile.TemporaryDirectory() as directory:
+    model = satisfaction_model(path, directory)
+
+    with budget.phase("build"):
+      parent = Instance(solver, Model(model))
+      for k, v in data.items():
+        parent[k] = v
+
+    def probe(h: int) -> Tuple[Status, Optional[int]]:
+      with parent.branch() as child:
+        child.add_string(f"constraint HEIGHT <= {h};\n")
+
+        # minizinc would not stop with a time limit of 0
+        timeout = timedelta(seconds=max(budget.remaining, 0.001))
+        with budget.phase("solve"), profile_phase(profiler, f"solve_{h}"):
+          if fzn_cache is not None:
+            child = fzn_cache.compile(child, model, {**data, "HEIGHT": h}, solver,
+                                      timeout=timeout, optimisation_level=1)
+          result = child.solve(timeout=timeout, free_search=free_search, processes=processes,
+                               optimisation_level=1)
+
+      status = minizinc_status(result.status)
+      solve_time = result.statistics["time"].total_seconds() if "time" in result.statistics else -1
+      print(f"{status}\tHeight = {h:3} [solving: {solve_time:04f}s]")
+
+      if status == Status.SAT:
+        best["solution"] = result.solution
+        best["solutions"] += 1
+        # the solution may leave rows unused, heights down to the ones it uses are skipped
+        return status, solution_height(data, result.solution)
+      return status, None
+
+    res = schedule_heights(probe, lower_bound, upper_bound, budget, schedule=schedule, gap=gap)
+
+  return {**best, **res}
+
+
+def allows_rotation(path: str) -> bool:
+  """
+  Args:
+    path (str): Path of the .mzn model
+  Returns:
+    bool: The model can rotate circuits, i.e. it outputs their rotation
+  """
+  with open(path) as f:
+    return re.search(r"\brotated\b", f.read()) is not None
+
+
+def solve_instance(m: str, i: str, solver: Solver, budget: Budget, args, fzn_cache=None, threads=1,
+                   solution_store=None, cache=None) -> List:
+  """Solves an instance with a model and reports the result
+
+  Args:
+    m (str): Path of the .mzn model
+    i (str): Path of the instance
+    solver (Solver): Minizinc solver
+    budget (Budget): Time budget of the instance
+    args (argparse.Namespace): Command line arguments
+    fzn_cache (FznCache, optional): Cache of compiled instances. Defaults to None.
+    threads (int, optional): Threads of the solver. Defaults to 1.
+    solution_store (SolutionStore, optional): Store where the solution is added. Defaults to None.
+    cache (SolutionCache, optional): Cache of optimal solutions of equivalent instances. Defaults to None.
+  Returns:
+    List: Row of the results csv
+  """
+  instance_num = re.findall(r'(\d+)', os.path.basename(i))[0]
+  name = os.path.splitext(os.path.basename(i))[0]
+  print("%s %s %s %s %s" % ("-" * 5, m, "-" * 3, i, "-" * 5))
+  data = load_instance(i)
+  # models taking their search strategy as data get the one chosen from the command line
+  if declares_search(m):
+    data.update(search_data(args.var_heuristic, args.val_choice, args.restart,
+                            restart_scale=args.restart_scale, restart_base=args.restart_base))
+  # solvers without parallel search reject the processes flag
+  processes = threads if threads > 1 else None
+
+  # profiling is disabled when profiler is None
+  profiler = None
+  if args.profile is not None:
+    profiler = Profiler(os.path.join(args.profile[0], os.path.basename(m), f"ins-{instance_num}"))
+
+  # an equivalent instance solved to optimality before is answered from the cache
+  rotations = allows_rotation(m)
+  cached = cache.lookup(data, rotations=rotations) if cache is not None else None
+  if cached is not None:
+    rotated = cached["rotations"] if rotations else [False for _ in range(data["N"])]
+    print(f"Found optimal solution h={cached['height']} of an equivalent instance in the cache")
+
+    with budget.phase("output"):
+      with profile_phase(profiler, "plot"):
+        plot_vlsi(data["cwidth"], data["cheight"], cached["x"], cached["y"], rotations=rotated,
+                  show=args.plot, title="%s | %s" % (m, i))
+
+      if args.output is not None:
+        path = os.path.join(args.output[0], f"ins-{instance_num}.txt")
+        save_solution(path, data, list(zip(cached["x"], cached["y"])))
+
+      if solution_store is not None:
+        solution_store.add(name, data, cached["x"], cached["y"], rotations=rotated)
+
+    return [instance_num, budget.elapsed, 1, -1, -1, Status.SAT, True, threads, "optimal"]
+
+  if args.schedule != "optimize":
+    res = probe_heights(solver, m, data, budget, args.schedule, free_search=args.free_search,
+                        profiler=profiler, fzn_cache=fzn_cache, processes=processes, gap=args.gap)
+    # proven optimal, within the accepted gap of the lower bound or only feasible
+    quality = result_quality(res["height"], res["optimal"], res["lower_bound"], args.gap)
+
+    with budget.phase("output"):
+      if res["solution"] is not None:
+        solution = res["solution"]
+        rotated = solution.rotated if hasattr(solution, "rotated") else [False for _ in range(data["N"])]
+        print(f"Solved with h={res['height']} in {budget.elapsed:04f} seconds ({quality})")
+
+        with profile_phase(profiler, "plot"):
+          plot_vlsi(data["cwidth"], data["cheight"], solution.x, solution.y, rotations=rotated,
+                    show=args.plot, title="%s | %s" % (m, i))
+
+        if args.output is not None:
+          path = os.path.join(args.output[0], f"ins-{instance_num}.txt")
+          save_solution(path, data, list(zip(solution.x, solution.y)))
+
+        if solution_store is not None:
+          solution_store.add(name, data, solution.x, solution.y, rotations=rotated)
+
+        if cache is not None and res["optimal"]:
+          cache.add(data, res["height"], solution.x, solution.y, rotations=rotated if rotations else None)
+      else:
+        print(f"{res['status']}: no solution found in {budget.elapsed:04f} seconds")
+
+    # nodes and failures are not aggregated over probes
+    return [instance_num, budget.elapsed, res["solutions"], -1, -1, res["status"], res["optimal"], threads, quality]
+
+  with budget.phase("build"), profile_phase(profiler, "setup"):
+    #create model new everytime so we can change parameter value
+    mzn_model = Model(m)
+    mzn_instance = Instance(solver, mzn_model)
+    # set data variables on instance
+    for k, v in data.items():
+      mzn_instance[k] = v
+
+    if fzn_cache is not None:
+      mzn_instance = fzn_cache.compile(mzn_instance, m, data, solver,
+                                       timeout=timedelta(seconds=budget.remaining),
+                                       optimisation_level=1)
+
+  # minizinc would not stop if no time is left
+  if budget.expired:
+    print("UNKNOWN: budget expired while building the instance")
+    return [instance_num, budget.elapsed, 0, -1, -1, Status.UNKNOWN, False, threads, "none"]
+
+  # same lower bound as the probes
+  lower_bound = int(sum([h * w for h, w in zip(data["cheight"], data["cwidth"])]) / data["WIDTH"])
+
+  # run model
+  with budget.phase("solve"), profile_phase(profiler, "solve"):
+    if args.gap is None:
+      result = mzn_instance.solve(intermediate_solutions=True, 
+                                  timeout=timedelta(seconds=budget.remaining),
+                                  free_search=args.free_search,
+                                  processes=processes,
+                                  optimisation_level=1)
+    else:
+      # intermediate solutions are read as they come to stop the solver within the gap
+      result = asyncio.run(solve_within_gap(mzn_instance, data, lower_bound, args.gap,
+                                            timeout=timedelta(seconds=budget.remaining),
+                                            free_search=args.free_search,
+                                            processes=processes,
+                                            optimisation_level=1))
+  status = minizinc_status(result.status)
+  optimal = result.status.name == "OPTIMAL_SOLUTION"
+  quality = result_quality(solution_height(data, result.solution[-1]) if len(result) > 0 else None, optimal, lower_bound, args.gap)
+
+  with budget.phase("output"):
+    #show report results
+    res = report_result(data, result, title="%s | %s" % (m, i), show=args.plot, profiler=profiler)
+    solved_time = res[0]
+    solutions = res[1]
+    nodes = res[2]
+    failures = res[3]
+    print(f"{status} ({quality}) in {budget.elapsed:04f} seconds with {threads} thread(s)")
+
+    if args.output is not None and solutions > 0:
+      path = os.path.join(args.output[0], f"ins-{instance_num}.txt")
+      x = result.solution[-1].x
+      y = result.solution[-1].y
+      save_solution(path, data, list(zip(x, y)))
+
+    if solution_store is not None and solutions > 0:
+      solution = result.solution[-1]
+      rotated = solution.rotated if hasattr(solution, "rotated") else None
+      solution_store.add(name, data, solution.x, solution.y, rotations=rotated)
+
+    if cache is not None and optimal:
+      solution = result.solution[-1]
+      rotated = solution.rotated if rotations else None
+      cache.add(data, solution_height(data, solution), solution.x, solution.y, rotations=rotated)
+
+  return [instance_num, solved_time, solutions, nodes, failures, status, optimal, threads, quality]
+
+
 if __name__ == "__main__":
   try:
 
@@ -81,7 +408,7 @@ if __name__ == "__main__":
     # define CLI arguments
     parser = argparse.ArgumentParser(description="Run minizinc vlsi solving method")
     parser.add_argument("--models", "-m", nargs="*", type=str,
-                        required=True, help="Model(s) to use. Leave empty to use all.")
+                        required=True, help="Model(s) to use, auto to choose the model of each instance from past results. Leave empty to use all.")
     parser.add_argument("--instances", "-i", nargs="*", type=str,
                         required=True, help="Instances(s) to load. Leave empty to use all.")
     parser.add_argument("--csv", "-csv", nargs=1, type=str, help="Save csv files in specified directory.")
@@ -92,6 +419,40 @@ if __name__ == "__main__":
     parser.add_argument("--free-search", "-f", action="store_true", help="Perform free search. Defaults to false.")
     parser.add_argument("--timeout", "-timeout", "-t", type=int, default=300,
                         help="Execution time contraint in seconds. Defaults to 300s (5m).")
+    parser.add_argument("--profile", nargs=1, type=str,
+                        help="Profile each phase and save profiles in specified directory.")
+    parser.add_argument("--sweep-budget", action="store_true",
+                        help="Hand time not used by an instance to the following ones. Defaults to false.")
+    parser.add_argument("--fzn-cache", nargs=1, type=str,
+                        help="Cache compiled FlatZinc files in specified directory.")
+    parser.add_argument("--fzn-cache-size", type=int, default=256,
+                        help="Maximum number of instances kept in the FlatZinc cache. Defaults to 256.")
+    parser.add_argument("--schedule", type=str, default="optimize", choices=["optimize"] + SCHEDULES,
+                        help="Minimize HEIGHT in a single solve or try fixed heights in the given order. Defaults to optimize.")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Threads of each solver if it supports parallel search, 0 to use the cores left by parallel instances. Defaults to 1.")
+    parser.add_argument("--cores", type=int, default=1,
+                        help=f"Cores shared by parallel instances and solver threads, up to {available_cores()} on this machine. Defaults to 1.")
+    parser.add_argument("--var-heuristic", type=str, default="first_fail", choices=VAR_HEURISTICS,
+                        help="Variable selection of models taking the search strategy as data. Defaults to first_fail.")
+    parser.add_argument("--val-choice", type=str, default="indomain_min", choices=VAL_CHOICES,
+                        help="Value choice of models taking the search strategy as data. Defaults to indomain_min.")
+    parser.add_argument("--restart", type=str, default="none", choices=RESTARTS,
+                        help="Restart policy of models taking the search strategy as data. Defaults to none.")
+    parser.add_argument("--restart-scale", type=int, default=100,
+                        help="Restart limit scale of luby and geometric restarts. Defaults to 100.")
+    parser.add_argument("--restart-base", type=float, default=1.5,
+                        help="Growth of geometric restarts limit. Defaults to 1.5.")
+    parser.add_argument("--solution-store", nargs=1, type=str,
+                        help="Save solutions of each model in a packed store in specified directory.")
+    parser.add_argument("--cache", nargs=1, type=str,
+                        help="Reuse optimal solutions of equivalent instances cached in specified directory.")
+    parser.add_argument("--history", nargs=1, type=str, default=["csv"],
+                        help="Directory of past results of each backend, e.g. csv/sat/NaiveModel.csv, --models auto chooses from. Defaults to csv.")
+    parser.add_argument("--rotations", action="store_true",
+                        help="With --models auto, choose among the models rotating circuits. Defaults to false.")
+    parser.add_argument("--gap", type=float,
+                        help="Stop as soon as (best height - lower bound) / lower bound is within specified tolerance, e.g. 0.05.")
                         
     # parse CLI arguments
     args = parser.parse_args()
@@ -99,65 +460,99 @@ if __name__ == "__main__":
     models = args.models if len(args.models) > 0 else enumerate_models()
     # load specified instances or load all instances if left empty
     instances = args.instances if len(args.instances) > 0 else enumerate_instances()
+    # instance stores are replaced with the instances they hold
+    instances = expand_instances(instances)
+    # with auto, each instance is solved by the model that did best on the most similar instances of past results
+    if models == ["auto"]:
+      plan = select_models(instances, "cp", args.history[0], timeout=args.timeout, rotations=args.rotations)
+      models, model_instances = list(plan.keys()), list(plan.values())
+    else:
+      model_instances = [instances] * len(models)
+    # a strategy passed as data must be followed by the solver, otherwise runs would be labelled with a search that did not happen
+    ignored = unsupported(args.solver[0], args.var_heuristic, args.val_choice, args.restart)
+    if len(ignored) > 0 and any(declares_search(m) for m in models):
+      parser.error(f"{args.solver[0]} does not honour {', '.join(ignored)}")
+    # optimal solutions are shared by instances with the same circuits in any order
+    cache = None
+    if args.cache is not None:
+      cache = SolutionCache(args.cache[0])
     # TODO: Solver config
     solver = Solver.lookup(args.solver[0])
+    # flattening is skipped for instances compiled in previous runs
+    fzn_cache = None
+    if args.fzn_cache is not None:
+      fzn_cache = FznCache(args.fzn_cache[0], max_entries=args.fzn_cache_size)
+
+    if args.csv is not None and not os.path.exists(args.csv[0]):
+      os.mkdir(args.csv[0])
+    if args.output is not None and not os.path.exists(args.output[0]):
+      os.mkdir(args.output[0])
 
-    # execute each model
+    # results csv file and solution store of each model
+    files, csv_writers, solution_stores = dict(), dict(), dict()
     for m in models:
       if args.csv is not None:
-        if not os.path.exists(args.csv[0]):
-          os.mkdir(args.csv[0])
+        files[m] = open(os.path.join(args.csv[0], os.path.basename(m) + ".csv"), "w")
+        csv_writers[m] = csv.writer(files[m])
+        csv_writers[m].writerow(["instance nr", "time", "solutions", "nodes", "failures", "status", "optimal", "threads", "quality"])
 
-        f = open(os.path.join(args.csv[0], os.path.basename(m) + ".csv"), "w")
-        csv_writer = csv.writer(f)
-        csv_writer.writerow(["instance nr", "time", "solutions", "nodes", "failures"])
+      solution_stores[m] = None
+      if args.solution_store is not None:
+        solution_stores[m] = SolutionStore(os.path.join(args.solution_store[0], os.path.basename(m)))
 
-      if args.output is not None:
-        if not os.path.exists(args.output[0]):
-          os.mkdir(args.output[0])
-
-      #counter for custom step
-      for i in instances:
-        instance_num = re.findall(r'(\d+)', i)[0]
-
-        print("%s %s %s %s %s" % ("-" * 5, m, "-" * 3, i, "-" * 5))
-
-        data = txt2dict(i)
-        #create model new everytime so we can change parameter value
-        mzn_model = Model(m)
-        mzn_instance = Instance(solver, mzn_model)
-        # set data variables on instance
-        for k, v in data.items():
-          mzn_instance[k] = v
-
-        # run model
-        result = mzn_instance.solve(intermediate_solutions=True, 
-                                    timeout=timedelta(seconds=args.timeout),
-                                    free_search=args.free_search,
-                                    optimisation_level=1)
-
-        #show report results
-        res = report_result(data, result, title="%s | %s" % (m, i), show=args.plot)
-        solved_time = res[0]
-        solutions = res[1]
-        nodes = res[2]
-        failures = res[3]
-        
-        if args.csv is not None:
-          csv_writer.writerow([instance_num, solved_time, solutions, nodes, failures])
-        
-        if args.output is not None and solutions > 0:
-          path = os.path.join(args.output[0], f"ins-{instance_num}.txt")
-          x = result.solution[-1].x
-          y = result.solution[-1].y
-          save_solution(path, data, list(zip(x, y)))
-                  
+    # every instance of every model is a job of the sweep
+    jobs = [(m, i) for m, instances in zip(models, model_instances) for i in instances]
+    # plots are shown by the main thread and a sweep budget hands time from an instance to the next one,
+    # instances are solved one at a time in both cases
+    workers, threads = plan_cores(args.cores, 1 if args.plot or args.sweep_budget else len(jobs), args.threads, "-p" in solver.stdFlags)
+    print(f"Solving {workers} instance(s) at a time with {threads} solver thread(s) each")
+
+    if workers == 1:
+      for m, instances in zip(models, model_instances):
+        sweep = SweepBudget(args.timeout, len(instances))
+
+        for i in instances:
+          # every phase of the instance is charged on its budget
+          budget = sweep.allocate() if args.sweep_budget else Budget(args.timeout)
+          row = solve_instance(m, i, solver, budget, args, fzn_cache=fzn_cache, threads=threads,
+                               solution_store=solution_stores[m], cache=cache)
+          sweep.release(budget)
+
+          if args.csv is not None:
+            csv_writers[m].writerow(row)
+    else:
+      # jobs of every model share the workers, the ones expected to take longest go first
+      scheduler = LptScheduler(expected_runtimes("cp", jobs, args.history[0], args.timeout), group=lambda job: job[0])
+      with ThreadPoolExecutor(max_workers=workers) as pool:
+        # the budget of an instance starts when a worker picks it up
+        rows = run_jobs(pool, lambda m, i: solve_instance(m, i, solver, Budget(args.timeout), args,
+                                                          fzn_cache=fzn_cache, threads=threads,
+                                                          solution_store=solution_stores[m], cache=cache),
+                        scheduler, workers)
+      print(scheduler.report())
+
+      # rows are written in the order of the instances
+      if args.csv is not None:
+        for m, i in jobs:
+          csv_writers[m].writerow(rows[(m, i)])
+
+    for m in models:
       if args.csv is not None:
-        f.close()
+        files[m].close()
+
+      if solution_stores[m] is not None:
+        solution_stores[m].flush()
+
+    if fzn_cache is not None:
+      print(fzn_cache.report())
+
+    if cache is not None:
+      print(cache.report())
       
 
   except KeyboardInterrupt:
-    f.close()
+    for f in files.values():
+      f.close()
 
     print('Interrupted')
     try:
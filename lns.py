@@ -0,0 +1,147 @@
+import sat, smt
+from typing import List
+from glob import glob
+from utils.plot import plot_vlsi
+from utils.determine_hbound import shelf_packing
+from utils.lns import lns, packing_height, Z3Backend, MinizincBackend, NEIGHBORHOODS
+from natsort import natsorted
+from functools import partial
+import sys, os
+import csv
+import argparse
+from utils.io import save_solution
+from utils.store import expand_instances, load_instance, SolutionStore
+from utils.budget import Budget, SweepBudget
+import re
+
+def enumerate_instances() -> List[str]:
+  """
+  Enumerate input instances
+
+  Returns: List[str]: List of available instances, sorted by number
+  """
+  return natsorted(glob("instances/*.txt"))
+
+
+if __name__ == "__main__":
+  try:
+    # define CLI arguments
+    parser = argparse.ArgumentParser(description="Run large-neighborhood search vlsi solving method")
+    parser.add_argument("--backend", "-b", type=str, default="smt", choices=["sat", "smt", "cp"],
+                        help="Backend solving each neighborhood. Defaults to smt.")
+    parser.add_argument("--models", "-m", nargs="*", type=str, required=True,
+                        help="Model(s) of the backend: class names for sat and smt, .mzn paths for cp. Leave empty to use NaiveModel or cp/stuckey_way.mzn.")
+    parser.add_argument("--instances", "-i", nargs="*", type=str,
+                        required=True, help="Instances(s) to load. Leave empty to use all.")
+    parser.add_argument("--solver", "-s", type=str, default="chuffed", choices=["chuffed", "gecode"],
+                        help="Solver that Minizinc will use with the cp backend. Defaults to Chuffed.")
+    parser.add_argument("--csv", "-csv", nargs=1, type=str, help="Save csv files in specified directory.")
+    parser.add_argument("--plot", "-p", action="store_true", help="Plot final result. Defaults to false.")
+    parser.add_argument("--output", "-o", nargs=1, type=str, help="Save results files in specified directory.")
+    parser.add_argument("--timeout", "-timeout", "-t", type=int, default=300,
+                        help="Execution time contraint in seconds. Defaults to 300s (5m).")
+    parser.add_argument("--sweep-budget", action="store_true",
+                        help="Hand time not used by an instance to the following ones. Defaults to false.")
+    parser.add_argument("--step-timeout", type=float, default=5,
+                        help="Time limit of each neighborhood in seconds. Defaults to 5s.")
+    parser.add_argument("--neighborhoods", nargs="+", type=str, default=NEIGHBORHOODS, choices=NEIGHBORHOODS,
+                        help="Neighborhoods tried in turn. Defaults to window top random.")
+    parser.add_argument("--size", type=int, default=8, help="Circuits freed by each neighborhood. Defaults to 8.")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                        help="Neighborhoods solved in parallel, each by its own process. Defaults to 1.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the neighborhoods. Defaults to 0.")
+    parser.add_argument("--solution-store", nargs=1, type=str,
+                        help="Save solutions of each model in a packed store in specified directory.")
+
+    # parse CLI arguments
+    args = parser.parse_args()
+    # use specified models or the simplest model of the backend if left empty
+    if args.backend == "cp":
+      # cp needs the minizinc binary, only imported when used
+      from cp import allows_rotation
+      models = args.models if len(args.models) > 0 else ["cp/stuckey_way.mzn"]
+      for m in models:
+        if allows_rotation(m):
+          parser.error(f"{m} rotates circuits, fixed circuits would not keep their orientation")
+    else:
+      backend = sat if args.backend == "sat" else smt
+      models = [getattr(backend, m) for m in (args.models if len(args.models) > 0 else ["NaiveModel"])]
+      for m in models:
+        if m.ROTATIONS:
+          parser.error(f"{m.__name__} rotates circuits, fixed circuits would not keep their orientation")
+    # load specified instances or load all instances if left empty
+    instances = args.instances if len(args.instances) > 0 else enumerate_instances()
+    # instance stores are replaced with the instances they hold
+    instances = expand_instances(instances)
+
+    # execute each model
+    for model in models:
+      name = os.path.splitext(os.path.basename(model))[0] if args.backend == "cp" else model.__name__
+
+      if args.csv is not None:
+        if not os.path.exists(args.csv[0]):
+          os.mkdir(args.csv[0])
+
+        f = open(os.path.join(args.csv[0], f"lns-{args.backend}-{name}.csv"), "w")
+        csv_writer = csv.writer(f)
+        csv_writer.writerow(["instance nr", "total_time", "x", "y", "status", "optimal", "rounds", "improvements"])
+
+      if args.output is not None:
+        if not os.path.exists(args.output[0]):
+          os.mkdir(args.output[0])
+
+      solutions = None
+      if args.solution_store is not None:
+        solutions = SolutionStore(os.path.join(args.solution_store[0], f"lns-{args.backend}-{name}"))
+
+      sweep = SweepBudget(args.timeout, len(instances))
+
+      for i in instances:
+        instance_num = re.findall(r'(\d+)', os.path.basename(i))[0]
+        print("%s %s %s %s %s" % ("-" * 5, name, "-" * 3, i, "-" * 5))
+
+        # every phase of the instance is charged on its budget
+        budget = sweep.allocate() if args.sweep_budget else Budget(args.timeout)
+        data = load_instance(i)
+
+        lower_bound = max(max(data["cheight"]), sum(w * h for w, h in zip(data["cwidth"], data["cheight"])) // data["WIDTH"])
+        # the backend is built in each worker process, only the way to build it is sent to them
+        if args.backend == "cp":
+          make_backend = partial(MinizincBackend, model, args.solver, data)
+        else:
+          upper_bound = packing_height(data, shelf_packing(data)[1])
+          make_backend = partial(Z3Backend, model, data, lower_bound, upper_bound)
+
+        result = lns(make_backend, data, lower_bound, budget, schedule=args.neighborhoods, size=args.size,
+                     step_timeout=args.step_timeout, workers=args.workers, seed=args.seed)
+        solved_time = budget.elapsed
+
+        with budget.phase("output"):
+          print(f"Solved with h={result['height']} in {solved_time:04f} seconds after {result['rounds']} neighborhoods" +
+                (" (optimal)" if result["optimal"] else ""))
+          plot_vlsi(data["cwidth"], data["cheight"], result["x"], result["y"], show=args.plot)
+
+          if args.output is not None:
+            path = os.path.join(args.output[0], f"ins-{instance_num}.txt")
+            save_solution(path, data, list(zip(result["x"], result["y"])))
+
+          if solutions is not None:
+            solutions.add(os.path.splitext(os.path.basename(i))[0], data, result["x"], result["y"])
+
+        if args.csv is not None:
+          csv_writer.writerow([i, budget.elapsed, result["x"], result["y"], result["status"], result["optimal"],
+                               result["rounds"], result["improvements"]])
+
+        sweep.release(budget)
+
+      if args.csv is not None:
+        f.close()
+
+      if solutions is not None:
+        solutions.flush()
+  except KeyboardInterrupt:
+    print('Interrupted')
+    try:
+      sys.exit(0)
+    except SystemExit:
+      os._exit(0)
@@ -0,0 +1,4 @@
+from .skyline_model import SkylineModel
+from .skyline_model_rot import SkylineModelRot
+from .bnb_model import BnBModel
+from .bnb_model_rot import BnBModelRot
@@ -0,0 +1,226 @@
+from typing import Dict, Any, List, Tuple, Optional
+import time
+from utils.profile import profile_phase
+from utils.budget import Status
+
+class NativeModel(object):
+  """
+  Model solved in Python without z3 or minizinc, with the same input and output interface as SatModel
+  so that it can be used by the drivers in place of it.
+  """
+  ROTATIONS = False
+
+  def __init__(self, width: int, cwidth: List[int], cheight: List[int], lb: int, ub: int, timeout: float = 300, stats: bool = False, profiler=None):
+    """Initialize attributes
+
+    Args:
+        width (int): Boards width
+        cwidth (List[int]): Width of each circuit
+        cheight (List[int]): Height of each circuit
+        lb (int): Height lower bound
+        ub (int): Height upper bound
+        timeout (float, optional): Time limit in seconds, building the model is charged too. Defaults to 300.
+        stats (bool, optional): Collect statistics of each check. Defaults to False.
+        profiler (Profiler, optional): Profiler of the setup. Defaults to None.
+    """
+    self.N = len(cwidth)
+    self.WIDTH = width
+    self.cwidth = list(cwidth)
+    self.cheight = list(cheight)
+
+    self.HEIGHT_LB = lb
+    self.HEIGHT_UB = ub
+
+    build_start = time.perf_counter()
+    self.status = Status.UNKNOWN
+    self.solution = None
+
+    # no constraint families, statistics of each check only
+    self.collect_stats = stats
+    self.family_stats = dict()
+    self.solver_stats = list()
+
+    self.init_time = time.perf_counter()
+    with profile_phase(profiler, "setup"):
+      self.setup()
+    self.init_time = time.perf_counter() - self.init_time
+
+    # time spent building the model is charged on the time limit
+    self.remaining_time = timeout - (time.perf_counter() - build_start)
+
+    self.solved_time = -1
+    self.setup_time = 0
+
+  @classmethod
+  def expected_size(cls, n: int, width: int, height: int) -> Tuple[int, int]:
+    """
+    Args:
+        n (int): Number of circuits
+        width (int): Boards width
+        height (int): Height upper bound
+    Returns:
+        Tuple[int, int]: Number of variables and clauses, none as the model has no encoding
+    """
+    return 0, 0
+
+  def setup(self):
+    """
+    Precomputes what does not depend on the height that is being tried
+    """
+    pass
+
+  def search(self, height: int, fixed: List[Tuple[int, int, int]], deadline: float) -> Tuple[Status, Optional[Tuple[List[int], List[int], List[bool]]]]:
+    """
+    Search a packing no higher than a given height
+
+    Args:
+        height (int): Height of the board
+        fixed (List[Tuple[int, int, int]]): Circuits placed in a given position, as (circuit, x, y)
+        deadline (float): time.perf_counter() value when the search has to stop
+    Raises:
+        NotImplementedError: If not overriden raises not implemented error
+    Returns:
+        Tuple[Status, Optional[Tuple[List[int], List[int], List[bool]]]]: Outcome and, if SAT,
+        x and y positions and rotations of each circuit
+    """
+    raise NotImplementedError
+
+  @property
+  def solved(self) -> bool:
+    """
+    Returns:
+        bool: instance has been solved or not
+    """
+    return self.status == Status.SAT
+
+  def configure(self, params: Dict[str, Any]):
+    """
+    Native models have no z3 parameters, profiles are ignored
+
+    Args:
+        params (Dict[str, Any]): Parameter name and value
+    """
+    pass
+
+  def solve(self, height: int, assumptions: List[Tuple[int, int, int]] = []):
+    """
+    Solve the model
+
+    Args:
+        height (int): Height of the board
+        assumptions (List[Tuple[int, int, int]], optional): Fixed positions given by fix_position. Defaults to [].
+    """
+    self.setup_time = 0
+
+    if self.remaining_time <= 0:
+      self.status = Status.UNKNOWN
+      self.solved_time = 0
+      return
+
+    self.solved_time = time.perf_counter()
+    self.status, solution = self.search(height, list(assumptions), self.solved_time + self.remaining_time)
+    if solution is not None:
+      self.solution = solution
+    self.solved_time = time.perf_counter() - self.solved_time
+
+    self.solver_stats.append({
+      "height": height,
+      "result": str(self.status).lower(),
+      "time": self.solved_time,
+      "statistics": self.statistics_of_check() if self.collect_stats else dict()
+    })
+
+    self.remaining_time -= self.solved_time
+
+  def statistics_of_check(self) -> Dict[str, Any]:
+    """
+    Returns:
+        Dict[str, Any]: Search statistics of the last check
+    """
+    return dict()
+
+  def fix_position(self, c: int, x: int, y: int) -> List[Tuple[int, int, int]]:
+    """
+    Fixed position of a circuit, to be used as solve assumptions
+
+    Args:
+        c (int): Circuit index
+        x (int): Left-bottom x position
+        y (int): Left-bottom y position
+    Returns:
+        List[Tuple[int, int, int]]: Fixed position, empty if it is outside of the board
+    """
+    if x >= self.WIDTH or y >= self.HEIGHT_UB:
+      return []
+
+    return [(c, x, y)]
+
+  def _idxs_positions(self) -> List[Tuple[int, int]]:
+    """
+    Raises:
+        RuntimeError: Instance has not been solved
+    Returns:
+        List[Tuple[int, int]]: left-bottom index of rectangle placings
+    """
+    if not self.solved:
+      raise RuntimeError("Model not solved!")
+
+    return list(zip(self.solution[0], self.solution[1]))
+
+  @property
+  def x(self) -> List[int]:
+    """
+    Returns:
+        List[int]: Rectangles left bottom index x-positions
+    """
+    return [p[0] for p in self._idxs_positions()]
+
+  @property
+  def y(self) -> List[int]:
+    """
+    Returns:
+        List[int]: Rectangles left bottom index y-positions
+    """
+    return [p[1] for p in self._idxs_positions()]
+
+  @property
+  def positions(self) -> Tuple[List[int], List[int]]:
+    """
+    Returns:
+        Tuple[List[int], List[int]]: Rectangles left-bottom x and y positions
+    """
+    return self.x, self.y
+
+  @property
+  def rotations(self) -> List[bool]:
+    """
+    Returns:
+      List[bool]: Wether a circuit has been rotated
+    """
+    if not self.solved:
+      raise RuntimeError("Model not solved!")
+
+    return list(self.solution[2])
+
+  @property
+  def statistics(self) -> Dict:
+    """
+    Returns:
+      Dict: Statistics of each check performed by the solver
+    """
+    return {
+      "families": self.family_stats,
+      "solver": self.solver_stats
+    }
+
+  @property
+  def time(self) -> Dict:
+    """
+    Returns:
+      Dict: Time taken to solve the instance, split into setup and actual solving
+    """
+    return {
+      "init": self.init_time,
+      "solve": self.solved_time,
+      "setup": self.setup_time
+    }
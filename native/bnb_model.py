@@ -0,0 +1,266 @@
+from typing import List, Tuple, Optional, Dict, Any
+import time
+from .base import NativeModel
+from utils.budget import Status
+
+class _Timeout(Exception):
+  """
+  Raised when the search runs past its deadline
+  """
+  pass
+
+class BnBModel(NativeModel):
+  """
+  Exact branch and bound
+
+  Each row of the board is a bitmask held in a Python int. The search always fills the lowest,
+  leftmost empty cell: either a circuit gets its bottom-left corner there or the cell is left empty.
+  Every packing can be built this way, so a height is UNSAT once the search is exhausted.
+
+  Pruning:
+    * area: circuits left must fit in the cells that are neither used nor left empty, minus the cells
+      of each row that no combination of widths of circuits left can fill exactly
+    * symmetry: circuits with the same dimensions are interchangeable, only one of them is tried
+    * dominance: an empty run of a row narrower than every circuit left is left empty at once
+    * memo: partial packings that failed, i.e. occupied rows from the lowest empty cell and circuits left,
+      are kept with the most rows above that cell they failed with. A partial packing failing with some rows
+      fails with fewer too, so it is not searched again at that height or below, e.g. by the next linear probes
+  """
+  # memo entries kept before the memo is cleared
+  MEMO_SIZE = 1_000_000
+  # nodes between deadline checks
+  CHECK_EVERY = 4096
+
+  def setup(self):
+    """
+    Groups circuits with the same dimensions, taller ones are tried first
+    """
+    groups = dict()
+    for c in range(self.N):
+      groups.setdefault(self._group_dimensions(c), []).append(c)
+
+    self.groups = sorted(groups.items(), key=lambda g: (g[0][1], g[0][0]), reverse=True)
+    # most rows from the lowest empty cell each failed partial packing has been searched with
+    self.failed = dict()
+    self.reach = dict()
+    self.nodes = 0
+    self.failures = 0
+
+  def _group_dimensions(self, c: int) -> Tuple[int, int]:
+    """
+    Args:
+        c (int): Circuit
+    Returns:
+        Tuple[int, int]: Dimensions identifying the circuits interchangeable with c
+    """
+    return self.cwidth[c], self.cheight[c]
+
+  def _orientations(self, dims: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """
+    Args:
+        dims (Tuple[int, int]): Dimensions of a group
+    Returns:
+        List[Tuple[int, int]]: Width and height of each orientation circuits of the group can be placed in
+    """
+    return [dims]
+
+  def statistics_of_check(self) -> Dict[str, Any]:
+    """
+    Returns:
+        Dict[str, Any]: Nodes as decisions and dead ends as conflicts of the last check
+    """
+    return {"decisions": self.nodes, "conflicts": self.failures, "memo": len(self.failed)}
+
+  def search(self, height: int, fixed: List[Tuple[int, int, int]], deadline: float) -> Tuple[Status, Optional[Tuple[List[int], List[int], List[bool]]]]:
+    """
+    Same as NativeModel.search
+    """
+    self.nodes, self.failures = 0, 0
+    self.deadline = deadline
+    self.H = height
+    self.full = (1 << self.WIDTH) - 1
+    self.rows = [0] * height
+    self.px, self.py, self.rotated = [0] * self.N, [0] * self.N, [False] * self.N
+
+    # fixed circuits are placed first and leave the search
+    placed = set()
+    for c, x, y in fixed:
+      mask = ((1 << self.cwidth[c]) - 1) << x
+      if x + self.cwidth[c] > self.WIDTH or y + self.cheight[c] > height or any(self.rows[r] & mask for r in range(y, y + self.cheight[c])):
+        return Status.UNSAT, None
+      for r in range(y, y + self.cheight[c]):
+        self.rows[r] |= mask
+      self.px[c], self.py[c] = x, y
+      placed.add(c)
+
+    self.members = [[c for c in g if c not in placed] for _, g in self.groups]
+    self.count = [len(m) for m in self.members]
+    self.dims = [d for d, _ in self.groups]
+    self.area_left = sum(self.cwidth[c] * self.cheight[c] for c in range(self.N) if c not in placed)
+    self.free = self.WIDTH * height - sum(self.cwidth[c] * self.cheight[c] for c in placed)
+
+    # circuits that fit in no orientation make the height infeasible
+    for g, dims in enumerate(self.dims):
+      if self.count[g] > 0 and not any(w <= self.WIDTH and h <= height for w, h in self._orientations(dims)):
+        return Status.UNSAT, None
+
+    if len(self.failed) > self.MEMO_SIZE:
+      self.failed.clear()
+      self.reach.clear()
+
+    try:
+      found = self._fill(0)
+    except _Timeout:
+      return Status.UNKNOWN, None
+
+    if not found:
+      return Status.UNSAT, None
+    return Status.SAT, (list(self.px), list(self.py), list(self.rotated))
+
+  def _fill(self, y: int) -> bool:
+    """
+    Fill the board from the lowest, leftmost empty cell, at row y or above
+
+    Args:
+        y (int): Row of the last filled cell, rows below it are full
+    Returns:
+        bool: All circuits have been placed
+    """
+    rows, full, H = self.rows, self.full, self.H
+    # cells left empty by this call, undone when backtracking
+    wasted = list()
+    states = list()
+
+    try:
+      while True:
+        if self.area_left == 0:
+          return True
+        if self.area_left > self.free - self._waste(y):
+          break
+
+        self.nodes += 1
+        if self.nodes % self.CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+          raise _Timeout()
+
+        while y < H and rows[y] == full:
+          y += 1
+        if y == H:
+          break
+
+        # rows below y are full, what is left only depends on the occupied rows from y, the circuits left and the rows available
+        top = H
+        while top > y and rows[top - 1] == 0:
+          top -= 1
+        state = (tuple(rows[y:top]), tuple(self.count))
+        if self.failed.get(state, 0) >= H - y:
+          break
+        states.append((state, H - y))
+
+        # lowest empty cell of the row and length of the empty run starting there
+        row = rows[y]
+        x = (~row & (row + 1)).bit_length() - 1
+        rest = row >> x
+        run = (rest & -rest).bit_length() - 1 if rest != 0 else self.WIDTH - x
+
+        fitting = [(g, w, h) for g in range(len(self.dims)) if self.count[g] > 0
+                   for w, h in self._orientations(self.dims[g]) if w <= run and y + h <= H]
+
+        if len(fitting) == 0:
+          # no circuit can start anywhere in the run
+          mask = ((1 << run) - 1) << x
+          rows[y] |= mask
+          wasted.append((y, mask))
+          self.free -= run
+          continue
+
+        for g, w, h in fitting:
+          mask = ((1 << w) - 1) << x
+          if any(rows[r] & mask for r in range(y + 1, y + h)):
+            continue
+
+          c = self._place(g, x, y, w, h, mask)
+          if self._fill(y):
+            return True
+          self._remove(g, c, y, h, mask)
+
+        # no circuit has its corner in the cell
+        rows[y] |= 1 << x
+        wasted.append((y, 1 << x))
+        self.free -= 1
+    finally:
+      for r, mask in wasted:
+        rows[r] &= ~mask
+        self.free += bin(mask).count("1")
+
+    self.failures += 1
+    for state, available in states:
+      if self.failed.get(state, 0) < available:
+        self.failed[state] = available
+    return False
+
+  def _waste(self, y: int) -> int:
+    """
+    Lower bound of the cells that will stay empty in rows y and above.
+    A row is only filled by circuits left, so each empty run of a row is filled at most by the largest
+    sum of their widths that fits in it.
+
+    Args:
+        y (int): Lowest row that is not full
+    Returns:
+        int: Cells that cannot be filled
+    """
+    key = tuple(self.count)
+    if key not in self.reach:
+      # bit k is set if some circuits left have total width k
+      reach, board = 1, (1 << (self.WIDTH + 1)) - 1
+      for g, dims in enumerate(self.dims):
+        for _ in range(self.count[g]):
+          shifted = 0
+          for w, _ in self._orientations(dims):
+            shifted |= reach << w
+          reach = (reach | shifted) & board
+      self.reach[key] = reach
+    reach = self.reach[key]
+
+    waste = 0
+    for row in self.rows[y:]:
+      x = 0
+      while x < self.WIDTH:
+        rest = row >> x
+        if rest & 1:
+          # skip the used cells
+          x += ((~rest) & (rest + 1)).bit_length() - 1
+          continue
+        run = (rest & -rest).bit_length() - 1 if rest != 0 else self.WIDTH - x
+        waste += run - ((reach & ((1 << (run + 1)) - 1)).bit_length() - 1)
+        x += run
+    return waste
+
+  def _place(self, g: int, x: int, y: int, w: int, h: int, mask: int) -> int:
+    """
+    Place the next circuit of a group
+
+    Returns:
+        int: Placed circuit
+    """
+    self.count[g] -= 1
+    c = self.members[g][self.count[g]]
+    for r in range(y, y + h):
+      self.rows[r] |= mask
+
+    self.px[c], self.py[c] = x, y
+    self.rotated[c] = w != self.cwidth[c]
+    self.area_left -= w * h
+    self.free -= w * h
+    return c
+
+  def _remove(self, g: int, c: int, y: int, h: int, mask: int):
+    """
+    Undo _place
+    """
+    for r in range(y, y + h):
+      self.rows[r] &= ~mask
+
+    self.count[g] += 1
+    self.area_left += self.cwidth[c] * self.cheight[c]
+    self.free += self.cwidth[c] * self.cheight[c]
@@ -0,0 +1,28 @@
+from typing import List, Tuple
+from .bnb_model import BnBModel
+
+class BnBModelRot(BnBModel):
+  """
+  Exact branch and bound with rotations
+
+  Circuits are grouped by (short side, long side) and each group is tried in both orientations.
+  """
+  ROTATIONS = True
+
+  def _group_dimensions(self, c: int) -> Tuple[int, int]:
+    """
+    Args:
+        c (int): Circuit
+    Returns:
+        Tuple[int, int]: Short and long side of the circuit
+    """
+    return min(self.cwidth[c], self.cheight[c]), max(self.cwidth[c], self.cheight[c])
+
+  def _orientations(self, dims: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """
+    Args:
+        dims (Tuple[int, int]): Short and long side of a group
+    Returns:
+        List[Tuple[int, int]]: Width and height of each orientation circuits of the group can be placed in
+    """
+    return [dims] if dims[0] == dims[1] else [(dims[1], dims[0]), dims]
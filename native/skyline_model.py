@@ -0,0 +1,107 @@
+from typing import List, Tuple, Optional, Callable, Dict
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .base import NativeModel
+from utils.budget import Status
+from utils.determine_hbound import shelf_packing
+
+class SkylineModel(NativeModel):
+  """
+  Skyline heuristic
+
+  The board is described by its skyline, the height reached in each column. Circuits are placed one
+  at a time in the lowest position, leftmost among equally low ones, and the skyline is raised
+  under them. Every circuit order of ORDERS is packed, along with the shelf packing of the upper
+  bound, and the lowest packing is kept.
+  Packings are found in milliseconds for thousands of circuits, but no height is ever proven
+  infeasible: heights below the packing are UNKNOWN.
+  """
+  # circuits are packed in decreasing order of each key
+  ORDERS: Dict[str, Callable[[int, int], Tuple]] = {
+    "height": lambda w, h: (h, w),
+    "width": lambda w, h: (w, h),
+    "area": lambda w, h: (w * h, h),
+    "perimeter": lambda w, h: (w + h, h)
+  }
+
+  def setup(self):
+    """
+    Packs circuits in every order, the packing does not depend on the height that is being tried
+    """
+    x, y = shelf_packing({"WIDTH": self.WIDTH, "N": self.N, "cwidth": self.cwidth, "cheight": self.cheight})
+    self.packing = (x, y, [False] * self.N)
+    self.packing_height = max(y[c] + self.cheight[c] for c in range(self.N))
+    self.order = "shelf"
+
+    # rotating circuits greedily may give a higher packing than keeping all of them as they are
+    for rotate in ([False, True] if self.ROTATIONS else [False]):
+      for name, key in self.ORDERS.items():
+        order = sorted(range(self.N), key=lambda c: key(*self._sort_dimensions(c, rotate)), reverse=True)
+        packing, height = self.pack(order, rotate)
+
+        if height < self.packing_height:
+          self.packing, self.packing_height = packing, height
+          self.order = name + (" rotated" if rotate else "")
+
+  def _sort_dimensions(self, c: int, rotate: bool) -> Tuple[int, int]:
+    """
+    Args:
+        c (int): Circuit
+        rotate (bool): Circuits can be rotated
+    Returns:
+        Tuple[int, int]: Dimensions the circuit is sorted by
+    """
+    return self.cwidth[c], self.cheight[c]
+
+  def _orientations(self, c: int, rotate: bool) -> List[Tuple[int, int, bool]]:
+    """
+    Args:
+        c (int): Circuit
+        rotate (bool): Circuits can be rotated
+    Returns:
+        List[Tuple[int, int, bool]]: Width, height and rotation of each orientation the circuit can be placed in
+    """
+    orientations = [(self.cwidth[c], self.cheight[c], False)]
+    if rotate and self.cwidth[c] != self.cheight[c]:
+      orientations.append((self.cheight[c], self.cwidth[c], True))
+
+    return [o for o in orientations if o[0] <= self.WIDTH]
+
+  def pack(self, order: List[int], rotate: bool = False) -> Tuple[Tuple[List[int], List[int], List[bool]], int]:
+    """
+    Skyline packing of circuits in a given order
+
+    Args:
+        order (List[int]): Circuits in the order they are placed
+        rotate (bool, optional): Each circuit is placed in the orientation reaching lowest. Defaults to False.
+    Returns:
+        Tuple[Tuple[List[int], List[int], List[bool]], int]: x and y positions and rotations of each circuit, height of the packing
+    """
+    skyline = np.zeros(self.WIDTH, dtype=np.int64)
+    x, y, rotated = [0] * self.N, [0] * self.N, [False] * self.N
+
+    for c in order:
+      best = None
+      for w, h, r in self._orientations(c, rotate):
+        # lowest y the circuit can be placed at in each column, i.e. the highest skyline under it
+        base = sliding_window_view(skyline, w).max(axis=1)
+        px = int(np.argmin(base))
+        # lowest top first, so that rotating never raises the packing more than needed
+        candidate = (int(base[px]) + h, int(base[px]), px, w, r)
+        if best is None or candidate < best:
+          best = candidate
+
+      top, y[c], x[c], w, rotated[c] = best
+      skyline[x[c]:x[c] + w] = top
+
+    return (x, y, rotated), int(skyline.max())
+
+  def search(self, height: int, fixed: List[Tuple[int, int, int]], deadline: float) -> Tuple[Status, Optional[Tuple[List[int], List[int], List[bool]]]]:
+    """
+    Same as NativeModel.search
+    """
+    # the skyline cannot pack around circuits placed in advance
+    if len(fixed) > 0 or self.packing_height > height:
+      return Status.UNKNOWN, None
+
+    return Status.SAT, self.packing
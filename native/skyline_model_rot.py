@@ -0,0 +1,24 @@
+from typing import Tuple
+from .skyline_model import SkylineModel
+
+class SkylineModelRot(SkylineModel):
+  """
+  Skyline heuristic with rotations
+
+  Every order is also packed placing each circuit in the orientation reaching lowest. When rotating,
+  circuits are sorted by their (long side, short side) so that the order does not depend on how they are given.
+  """
+  ROTATIONS = True
+
+  def _sort_dimensions(self, c: int, rotate: bool) -> Tuple[int, int]:
+    """
+    Args:
+        c (int): Circuit
+        rotate (bool): Circuits can be rotated
+    Returns:
+        Tuple[int, int]: Long and short side of the circuit when rotating
+    """
+    if not rotate:
+      return super()._sort_dimensions(c, rotate)
+
+    return max(self.cwidth[c], self.cheight[c]), min(self.cwidth[c], self.cheight[c])
@@ -2,4 +2,5 @@ from .naive_model import NaiveModel
 from .symmetry_model import SymmetryModel
 from .maybe_symmetry_model import MaybeSymmetryModel
 from .naive_model_rot import NaiveModelRot
-from .symmetry_model_rot import SymmetryModelRot
\ No newline at end of file
+from .symmetry_model_rot import SymmetryModelRot
+from .naive_model_smtlib import NaiveModelSmtlib
\ No newline at end of file
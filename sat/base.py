@@ -4,14 +4,24 @@ import z3
 from z3.z3 import Int, Not
 import time
 import numpy as np
+from utils.stats import solver_statistics
+from utils.profile import profile_phase
+from utils.budget import Status, z3_status
+from utils.z3_profile import set_params
+from utils.z3_pipeline import make_solver
 
 class SatModel(object):
   """
   Sat model implementing some common logic between solvers such as input interface, output interface etc.
   """
   ROTATIONS = False
+  # logic or tactic pipeline of the solver, generic z3 solver if both are None
+  LOGIC = None
+  TACTIC = None
+  # model run instead if the encoding is expected not to fit the memory limit, see utils.memory
+  FALLBACK = None
 
-  def __init__(self, width: int, cwidth: List[int], cheight: List[int], lb: int, ub: int, timeout=None):
+  def __init__(self, width: int, cwidth: List[int], cheight: List[int], lb: int, ub: int, timeout: float = 300, stats: bool = False, profiler=None):
     """Initialize solver and attributes
 
     Args:
@@ -20,6 +30,9 @@ class SatModel(object):
         cheight (List[int]): Height of each circuit
         lb (int): Height lower bound
         ub (int): Height upper bound
+        timeout (float, optional): Time limit in seconds, building the encoding is charged too. Defaults to 300.
+        stats (bool, optional): Collect size of each constraint family. Defaults to False.
+        profiler (Profiler, optional): Profiler of setup and constraints posting. Defaults to None.
     """    
     self.N = len(cwidth)
     self.WIDTH = width
@@ -29,19 +42,29 @@ class SatModel(object):
     self.HEIGHT_LB = lb
     self.HEIGHT_UB = ub
     
-    # build the board representation
-    self.setup()
+    build_start = time.perf_counter()
 
-    self.remaining_time = timeout
+    # build the board representation
+    with profile_phase(profiler, "setup"):
+      self.setup()
 
-    self.solver = z3.Solver()
+    self.solver = make_solver(self.LOGIC, self.TACTIC)
     self._solved_once = False
-    self._solved = False
+    self.status = Status.UNKNOWN
+
+    # statistics of each constraint family and of each check
+    self.collect_stats = stats
+    self.family_stats = dict()
+    self.solver_stats = list()
 
     self.init_time = time.perf_counter()
-    self.post_static_constraints()
+    with profile_phase(profiler, "post_static_constraints"):
+      self.post_static_constraints()
     self.init_time = time.perf_counter() - self.init_time
 
+    # time spent building the encoding is charged on the time limit
+    self.remaining_time = timeout - (time.perf_counter() - build_start)
+
     self.solved_time = -1
     self.setup_time = 0
 
@@ -51,6 +74,23 @@ class SatModel(object):
     """
     raise NotImplementedError
 
+  @classmethod
+  def expected_size(cls, n: int, width: int, height: int) -> Tuple[int, int]:
+    """
+    Size of the encoding before building it, dominated by the board of each circuit
+
+    Args:
+        n (int): Number of circuits
+        width (int): Boards width
+        height (int): Height upper bound
+    Returns:
+        Tuple[int, int]: Number of variables and clauses
+    """
+    variables = n * width * height + n * (width + height) + height
+    # no two circuits on a cell and channeling between the board and the position of each circuit
+    clauses = width * height * n * (n - 1) // 2 + n * width * height
+    return variables, clauses
+
   def post_static_constraints(self):
     """
     Method used to post static constraints on the model 
@@ -67,14 +107,24 @@ class SatModel(object):
     Returns:
         bool: instance has been solved or not
     """
-    return self._solved
+    return self.status == Status.SAT
+
+  def configure(self, params: Dict[str, Any]):
+    """
+    Set z3 parameters of the solver, e.g. loaded from a profile written by utils.tune
+
+    Args:
+        params (Dict[str, Any]): Parameter name and value
+    """
+    set_params(self.solver, params)
 
-  def solve(self, height: int):
+  def solve(self, height: int, assumptions: List[z3.BoolRef] = []):
     """
     Solve the model
 
     Args:
         height (int): Height of the board
+        assumptions (List[z3.BoolRef], optional): Literals holding in this check only, e.g. fixed positions. Defaults to [].
     """
     # setup time is time spent setting up before actually solving
     self.setup_time = 0
@@ -92,17 +142,47 @@ class SatModel(object):
 
     self.setup_time = time.perf_counter() - self.setup_time
 
+    # a z3 timeout of 0 means no timeout at all, time is already over
+    if self.remaining_time <= 0:
+      self.status = Status.UNKNOWN
+      self.solved_time = 0
+      return
+
     # search for a solution in remaining time (must be provided in ms)
-    self.solver.set("timeout", int(self.remaining_time * 1000))
+    self.solver.set("timeout", max(1, int(self.remaining_time * 1000)))
 
     self.solved_time = time.perf_counter()
-    self._solved = self.solver.check(*pre_requisites) == z3.sat
+    result = self.solver.check(*pre_requisites, *assumptions)
+    self.status = z3_status(result, self.solver.reason_unknown())
     self.solved_time = time.perf_counter() - self.solved_time
+
+    self.solver_stats.append({
+      "height": height,
+      "result": str(result),
+      "time": self.solved_time,
+      "statistics": solver_statistics(self.solver)
+    })
     
     self.remaining_time -= self.solved_time
 
     self._solved_once = True
 
+  def fix_position(self, c: int, x: int, y: int) -> List[z3.BoolRef]:
+    """
+    Literals placing a circuit, to be used as solve assumptions
+
+    Args:
+        c (int): Circuit index
+        x (int): Left-bottom x position
+        y (int): Left-bottom y position
+    Returns:
+        List[z3.BoolRef]: Literals, empty if the position is outside of the board
+    """
+    if x >= self.WIDTH or y >= self.HEIGHT_UB:
+      return []
+
+    return [self.cx[c, x], self.cy[c, y]]
+
   def _idxs_positions(self) -> List[Tuple[int, int]]:
     """
     Raises:
@@ -146,6 +226,17 @@ class SatModel(object):
     if self.ROTATIONS:
       raise NotImplementedError
 
+  @property
+  def statistics(self) -> Dict:
+    """
+    Returns:
+      Dict: Statistics of each constraint family and of each check performed by the solver
+    """
+    return {
+      "families": self.family_stats,
+      "solver": self.solver_stats
+    }
+
   @property
   def time(self) -> Dict:
     """
@@ -4,6 +4,7 @@ import numpy as np
 from .naive_model import NaiveModel
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
   
 class MaybeSymmetryModel(NaiveModel):
   """
@@ -14,6 +15,7 @@ class MaybeSymmetryModel(NaiveModel):
     # build iboard
     self.iboard = np.array([[z3.Bool(f"cb_{i}_{j}") for j in range(self.WIDTH)] for i in range(self.HEIGHT_UB)])
     
+  @constraint_family
   def iboard_channeling_constraint(self) -> z3.BoolRef:
     """
     Only channel if position is in bound
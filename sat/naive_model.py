@@ -2,8 +2,10 @@ import typing
 import z3
 import numpy as np
 from .base import SatModel
+from native import BnBModel
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
 
 class NaiveModel(SatModel):
   """
@@ -12,6 +14,7 @@ class NaiveModel(SatModel):
   Each circuits gets a whole WIDTHxHEIGHT board representation
   Fixed width and not overlapping circuits constraints are posted.
   """
+  FALLBACK = BnBModel
 
   def setup(self):
     """
@@ -85,6 +88,7 @@ class NaiveModel(SatModel):
     """
     return z3.And(self._at_least_n(vars, n), self._at_most_n(list(vars), n))
 
+  @constraint_family
   def allowed_height_constraint(self):
     """
     Ensure no placement outside of max height
@@ -98,6 +102,7 @@ class NaiveModel(SatModel):
     return z3.And(constraints)
 
 
+  @constraint_family
   def cx_cy_leftbottom_constraint(self) -> z3.BoolRef:
     """
     Ensure that only one bottom left index is set
@@ -110,6 +115,7 @@ class NaiveModel(SatModel):
 
     return z3.And(constraints)
 
+  @constraint_family
   def channeling_constraint(self) -> z3.BoolRef:
     """
     Only channel if position is in bound
@@ -125,6 +131,7 @@ class NaiveModel(SatModel):
 
     return z3.And(constraints)
 
+  @constraint_family
   def bound_constraint(self) -> z3.BoolRef:
     """
     Bound values of iboard to keep circuits in board.
@@ -156,6 +163,7 @@ class NaiveModel(SatModel):
 
     return z3.And(constraints)
 
+  @constraint_family
   def placement_constraint(self) -> z3.BoolRef:
     """
     For each circuit in indexes one and only one index can be true
@@ -176,6 +184,7 @@ class NaiveModel(SatModel):
 
     return z3.And(constraints)
 
+  @constraint_family
   def overlapping_constraint(self) -> z3.BoolRef:
     """
     Overlapping constraint between two circuits. Only one circuit can be at index (i,j).
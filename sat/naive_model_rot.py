@@ -2,8 +2,10 @@ import typing
 import z3
 import numpy as np
 from .base import SatModel
+from native import BnBModelRot
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
 
 class NaiveModelRot(SatModel):
   """
@@ -11,8 +13,13 @@ class NaiveModelRot(SatModel):
 
   Each circuits gets a whole WIDTHxHEIGHT board representation
   Fixed width and not overlapping circuits constraints are posted.
+
+  Rotation is encoded once per circuit through its effective width and height, which are
+  order-encoded: "effective dimension > k" is either a constant or the rotation literal.
+  Square circuits and circuits that cannot fit rotated get no rotation variable.
   """
   ROTATIONS = True
+  FALLBACK = BnBModelRot
 
   def setup(self):
     """
@@ -32,7 +39,50 @@ class NaiveModelRot(SatModel):
     # allowed_height
     self.a_h = np.array([z3.Bool(f"a_{i}") for i in range(self.HEIGHT_UB)])
     # array that dictates which components have been rotated
-    self.rot = np.array([z3.Bool(f"r_{i}") for i in range(self.N)])
+    self.rot = np.array([z3.Bool(f"r_{c}") if self._can_rotate(c) else z3.BoolVal(False) for c in range(self.N)])
+    # orientations each circuit can be placed in
+    self.orientations = [self._orientations(c) for c in range(self.N)]
+
+  def _can_rotate(self, c: int) -> bool:
+    """
+    Args:
+        c (int): Circuit
+    Returns:
+        bool: Rotating the circuit gives a different circuit that fits in the board
+    """
+    return self.cwidth[c] != self.cheight[c] and self.cheight[c] <= self.WIDTH and self.cwidth[c] <= self.HEIGHT_UB
+
+  def _orientations(self, c: int) -> List[typing.Tuple[int, int, typing.Any]]:
+    """
+    Args:
+        c (int): Circuit
+    Returns:
+        List[Tuple[int, int, Any]]: Width, height and literal holding when the circuit is placed in that orientation
+    """
+    orientations = [(self.cwidth[c], self.cheight[c], z3.Not(self.rot[c]))]
+    if self._can_rotate(c):
+      orientations.append((self.cheight[c], self.cwidth[c], self.rot[c]))
+    return orientations
+
+  def _holds(self, c: int, predicate) -> typing.Union[bool, z3.BoolRef]:
+    """
+    Order encoding of a predicate on the effective width and height of a circuit
+
+    Args:
+        c (int): Circuit
+        predicate (Callable[[int, int], bool]): Predicate on (effective width, effective height)
+    Returns:
+        Union[bool, z3.BoolRef]: True or False if the predicate does not depend on the rotation,
+          otherwise the literal of the orientation where it holds
+    """
+    holds = [literal for w, h, literal in self.orientations[c] if predicate(w, h)]
+
+    if len(holds) == len(self.orientations[c]):
+      return True
+    elif len(holds) == 0:
+      return False
+    else:
+      return holds[0]
 
 
   def _idxs_positions(self):
@@ -101,6 +151,7 @@ class NaiveModelRot(SatModel):
     """
     return z3.And(self._at_least_n(vars, n), self._at_most_n(list(vars), n))
 
+  @constraint_family
   def allowed_height_constraint(self):
     """
     Ensure no placement outside of max height
@@ -113,6 +164,7 @@ class NaiveModelRot(SatModel):
 
     return z3.And(constraints)
 
+  @constraint_family
   def cx_cy_leftbottom_constraint(self) -> z3.BoolRef:
     """
     Ensure that only one bottom left index is set
@@ -125,35 +177,52 @@ class NaiveModelRot(SatModel):
 
     return z3.And(constraints)
 
+  @constraint_family
   def channeling_constraint(self) -> z3.BoolRef:
     """
-    Only channel if position is in bound
+    Only channel if position is in bound.
+    A single channeling constraint is posted for each position, cells covered only in one
+    orientation are guarded by the order encoding of the effective width and height.
     """
     constraints = list()
 
     for c in range(self.N):
-      for i in range(self.HEIGHT_UB - self.cheight[c] + 1):
-        for j in range(self.WIDTH - self.cwidth[c] + 1):
-          constraints.append(
-            z3.Implies(
-              z3.Not(self.rot[c]),
-              z3.And(self.cy[c, i], self.cx[c, j])
-                     ==
-                     z3.And([self.cboard[c, i + u, j + v] for u in range(self.cheight[c]) for v in range(self.cwidth[c])]))
-          )
-
-      for i in range(self.HEIGHT_UB - self.cwidth[c] + 1):
-        for j in range(self.WIDTH - self.cheight[c] + 1):
-          constraints.append(
-            z3.Implies(
-              self.rot[c],
-              z3.And(self.cy[c, i], self.cx[c, j])
-                     ==
-                     z3.And([self.cboard[c, i + u, j + v] for u in range(self.cwidth[c]) for v in range(self.cheight[c])]))
-          )
+      size = max(self.cwidth[c], self.cheight[c])
+      # cells covered by the circuit relative to its bottom left corner
+      covering = [(u, v, self._holds(c, lambda w, h: u < h and v < w)) for u in range(size) for v in range(size)]
+      covering = [(u, v, covered) for u, v, covered in covering if covered is not False]
+
+      for i in range(self.HEIGHT_UB):
+        for j in range(self.WIDTH):
+          # the circuit placed in (i, j) must fit the board in at least one orientation
+          if not any(i + h <= self.HEIGHT_UB and j + w <= self.WIDTH for w, h, _ in self.orientations[c]):
+            continue
+
+          # cells covered in every orientation and cells covered only when an orientation literal holds
+          cells = list()
+          guarded = dict()
+          for u, v, covered in covering:
+            if covered is True:
+              cells.append(self.cboard[c, i + u, j + v])
+              continue
+
+            # group is None when the orientation would bring the circuit out of the board
+            literal, group = guarded.setdefault(id(covered), [covered, list()])
+            if group is None:
+              continue
+            elif i + u < self.HEIGHT_UB and j + v < self.WIDTH:
+              group.append(self.cboard[c, i + u, j + v])
+            else:
+              guarded[id(covered)][1] = None
+
+          for literal, group in guarded.values():
+            cells.append(z3.Not(literal) if group is None else z3.Implies(literal, z3.And(group)))
+
+          constraints.append(z3.And(self.cy[c, i], self.cx[c, j]) == z3.And(cells))
 
     return z3.And(constraints)
 
+  @constraint_family
   def bound_constraint(self) -> z3.BoolRef:
     """
     Bound values of iboard to keep circuits in board.
@@ -169,50 +238,39 @@ class NaiveModelRot(SatModel):
 
     for c in range(self.N):
       for i in range(self.HEIGHT_UB):
-        fits_not_rot = i + self.cheight[c] <= self.HEIGHT_UB
-        fits_rot = i + self.cwidth[c] <= self.HEIGHT_UB
-        
-        fits_both = fits_rot and fits_not_rot
+        fits = self._holds(c, lambda w, h: i + h <= self.HEIGHT_UB)
 
-        # if circuit does not fit either rotated or not then this y value is forbidden
-        if not (fits_rot or fits_not_rot):
+        # if circuit does not fit in any orientation then this y value is forbidden
+        if fits is False:
           constraints.append(z3.Not(self.cy[c, i]))
-        elif fits_rot and not fits_not_rot:
-          constraints.append(z3.Implies(self.cy[c, i], self.rot[c]))
-        elif fits_not_rot and not fits_rot:
-          constraints.append(z3.Implies(self.cy[c, i], z3.Not(self.rot[c])))
+          continue
+        elif fits is not True:
+          constraints.append(z3.Implies(self.cy[c, i], fits))
+
+        # circuit can be placed on a certain row only if all rows to the circuits effective height are allowed
+        # having enough room vertically is a necessary condition to place a circuit in a row
+        rows = list()
+        for u in range(max(self.cwidth[c], self.cheight[c])):
+          covered = self._holds(c, lambda w, h: u < h and i + h <= self.HEIGHT_UB)
+          if covered is True:
+            rows.append(self.a_h[i + u])
+          elif covered is not False:
+            rows.append(z3.Implies(covered, self.a_h[i + u]))
+
+        constraints.append(z3.Implies(self.cy[c, i], z3.And(rows)))
 
       # a circuit can be placed on a certain column only if it would not go out of the circuit
       for j in range(self.WIDTH):
-        fits_not_rot = j + self.cwidth[c] <= self.WIDTH
-        fits_rot = j + self.cheight[c] <= self.WIDTH
-        
-        fits_both = fits_rot and fits_not_rot
-      
-        # if circuit does not fit either rotated or not then this y value is forbidden
-        if not (fits_rot or fits_not_rot):
+        fits = self._holds(c, lambda w, h: j + w <= self.WIDTH)
+
+        if fits is False:
           constraints.append(z3.Not(self.cx[c, j]))
-        elif fits_rot and not fits_not_rot:
-          constraints.append(z3.Implies(self.cx[c, j], self.rot[c]))
-        elif fits_not_rot and not fits_rot:
-          constraints.append(z3.Implies(self.cx[c, j], z3.Not(self.rot[c])))
-
-      # circuit can be placed on a certain row only if all rows to the circuits height are allowed
-      # having enough room vertically is a necessary condition to place a circuit in a row
-      for i in range(self.HEIGHT_UB - self.cheight[c] + 1):
-        constraints.append(
-          z3.Implies(z3.And(z3.Not(self.rot[c]), self.cy[c, i]), z3.And([self.a_h[i + h] for h in range(self.cheight[c])]))
-        )
-
-      # circuit can be placed on a certain row only if all rows to the circuits height are allowed
-      # having enough room vertically is a necessary condition to place a circuit in a row
-      for i in range(self.HEIGHT_UB - self.cwidth[c] + 1):
-        constraints.append(
-          z3.Implies(z3.And(self.rot[c], self.cy[c, i]), z3.And([self.a_h[i + h] for h in range(self.cwidth[c])]))
-        )
+        elif fits is not True:
+          constraints.append(z3.Implies(self.cx[c, j], fits))
 
     return z3.And(constraints)
 
+  @constraint_family
   def placement_constraint(self) -> z3.BoolRef:
     """
     For each circuit in indexes one and only one index can be true
@@ -232,6 +290,7 @@ class NaiveModelRot(SatModel):
 
     return z3.And(constraints)
 
+  @constraint_family
   def overlapping_constraint(self) -> z3.BoolRef:
     """
     Overlapping constraint between two circuits. Only one circuit can be at index (i,j).
@@ -0,0 +1,206 @@
+import z3
+import time
+import numpy as np
+from .naive_model import NaiveModel
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import List, Callable, Tuple
+from utils.stats import encoding_size
+
+def _names(prefix: str, *shape: int) -> np.ndarray:
+  """
+  Builds an array of variable names following the naming used in NaiveModel.setup
+
+  Args:
+      prefix (str): Name prefix e.g. cb, cx, cy
+      *shape (int): Shape of the variable array
+  Returns:
+      np.ndarray: Array of names such as prefix_c_i_j
+  """
+  names = np.full(shape, prefix, dtype=object)
+  for axis, size in enumerate(shape):
+    idx = np.arange(size).reshape([-1 if a == axis else 1 for a in range(len(shape))]).astype(str).astype(object)
+    names = names + "_" + idx
+
+  return names
+
+def _and(terms: List[str]) -> str:
+  """
+  Conjunction of SMT-LIB2 terms, empty conjunction is true
+  """
+  return "(and %s)" % " ".join(terms) if len(terms) > 0 else "true"
+
+def _or(terms: List[str]) -> str:
+  """
+  Disjunction of SMT-LIB2 terms, empty disjunction is false
+  """
+  return "(or %s)" % " ".join(terms) if len(terms) > 0 else "false"
+
+def _exactly_one(vars: np.ndarray) -> str:
+  """
+  Pairwise exactly one encoding, same as NaiveModel._exactly_n(vars, 1)
+  """
+  vars = list(vars)
+  at_most = ["(not (and %s %s))" % pair for pair in combinations(vars, 2)]
+  return _and([_or(vars), _and(at_most)])
+
+def render_allowed_height(N: int, WIDTH: int, HEIGHT_UB: int, cwidth: List[int], cheight: List[int]) -> str:
+  """
+  SMT-LIB2 rendering of NaiveModel.allowed_height_constraint
+  """
+  cy = _names("cy", N, HEIGHT_UB)
+  a_h = _names("a", HEIGHT_UB)
+  return _and(list(("(=> " + cy + " " + a_h[np.newaxis, :] + ")").ravel()))
+
+def render_cx_cy_leftbottom(N: int, WIDTH: int, HEIGHT_UB: int, cwidth: List[int], cheight: List[int]) -> str:
+  """
+  SMT-LIB2 rendering of NaiveModel.cx_cy_leftbottom_constraint
+  """
+  cx = _names("cx", N, WIDTH)
+  cy = _names("cy", N, HEIGHT_UB)
+  constraints = list()
+
+  for c in range(N):
+    constraints.append(_exactly_one(cx[c]))
+    constraints.append(_exactly_one(cy[c]))
+
+  return _and(constraints)
+
+def render_placement(N: int, WIDTH: int, HEIGHT_UB: int, cwidth: List[int], cheight: List[int]) -> str:
+  """
+  SMT-LIB2 rendering of NaiveModel.placement_constraint
+  """
+  cx = _names("cx", N, WIDTH)
+  cy = _names("cy", N, HEIGHT_UB)
+  constraints = list()
+
+  for c in range(N):
+    constraints.append(_exactly_one(cy[c]))
+    constraints.append(_exactly_one(cx[c]))
+
+  return _and(constraints)
+
+def render_bound(N: int, WIDTH: int, HEIGHT_UB: int, cwidth: List[int], cheight: List[int]) -> str:
+  """
+  SMT-LIB2 rendering of NaiveModel.bound_constraint
+  """
+  cx = _names("cx", N, WIDTH)
+  cy = _names("cy", N, HEIGHT_UB)
+  a_h = _names("a", HEIGHT_UB)
+  constraints = list()
+
+  for c in range(N):
+    for i in range(HEIGHT_UB - cheight[c] + 1):
+      constraints.append("(=> %s %s)" % (cy[c, i], _and(list(a_h[i:i + cheight[c]]))))
+
+    constraints.extend("(not %s)" % v for v in cy[c, HEIGHT_UB - cheight[c] + 1:])
+    constraints.extend("(not %s)" % v for v in cx[c, WIDTH - cwidth[c] + 1:])
+
+  return _and(constraints)
+
+def render_overlapping(N: int, WIDTH: int, HEIGHT_UB: int, cwidth: List[int], cheight: List[int]) -> str:
+  """
+  SMT-LIB2 rendering of NaiveModel.overlapping_constraint
+  """
+  cboard = _names("cb", N, HEIGHT_UB, WIDTH)
+  # every pair of circuits is rendered for the whole board at once
+  pairs = [("(not (and " + cboard[a] + " " + cboard[b] + "))") for a, b in combinations(range(N), 2)]
+
+  if len(pairs) == 0:
+    return "true"
+
+  pairs = np.stack(pairs, axis=-1)
+  cells = ["(and %s)" % " ".join(pairs[i, j]) for i in range(HEIGHT_UB) for j in range(WIDTH)]
+  return _and(cells)
+
+def render_channeling(N: int, WIDTH: int, HEIGHT_UB: int, cwidth: List[int], cheight: List[int]) -> str:
+  """
+  SMT-LIB2 rendering of NaiveModel.channeling_constraint
+  """
+  cboard = _names("cb", N, HEIGHT_UB, WIDTH)
+  cx = _names("cx", N, WIDTH)
+  cy = _names("cy", N, HEIGHT_UB)
+  constraints = list()
+
+  for c in range(N):
+    for i in range(HEIGHT_UB - cheight[c] + 1):
+      for j in range(WIDTH - cwidth[c] + 1):
+        rect = cboard[c, i:i + cheight[c], j:j + cwidth[c]].ravel()
+        constraints.append("(= (and %s %s) %s)" % (cy[c, i], cx[c, j], _and(list(rect))))
+
+  return _and(constraints)
+
+def render_declarations(N: int, WIDTH: int, HEIGHT_UB: int, cwidth: List[int], cheight: List[int]) -> str:
+  """
+  SMT-LIB2 declarations of the variables built in NaiveModel.setup
+  """
+  names = [_names("cb", N, HEIGHT_UB, WIDTH), _names("cx", N, WIDTH), _names("cy", N, HEIGHT_UB), _names("a", HEIGHT_UB)]
+  return "\n".join("(declare-const %s Bool)" % v for n in names for v in n.ravel())
+
+def _timed(family: Callable, *args) -> Tuple[str, float]:
+  """
+  Renders a constraint family measuring the time it takes
+  """
+  start = time.perf_counter()
+  text = family(*args)
+  return text, time.perf_counter() - start
+
+class NaiveModelSmtlib(NaiveModel):
+  """
+  Naive model whose static constraints are rendered as SMT-LIB2 text
+
+  Each constraint family of NaiveModel is rendered by a module level function so that families
+  can be rendered in worker processes. The whole text is then loaded with a single call
+  to the z3 parser, avoiding one FFI call for each term that is built.
+  """
+  # number of processes used to render the constraint families, 1 renders them sequentially
+  PROCESSES = 1
+
+  # renderer of each constraint family, keyed by the NaiveModel method so that family statistics of the two models can be joined
+  FAMILIES = {
+    "allowed_height_constraint": render_allowed_height,
+    "cx_cy_leftbottom_constraint": render_cx_cy_leftbottom,
+    "placement_constraint": render_placement,
+    "bound_constraint": render_bound,
+    "overlapping_constraint": render_overlapping,
+    "channeling_constraint": render_channeling
+  }
+
+  def render(self) -> str:
+    """
+    Renders the static constraints as SMT-LIB2 text
+
+    Returns:
+        str: SMT-LIB2 script containing declarations and assertions
+    """
+    args = (self.N, self.WIDTH, self.HEIGHT_UB, list(self.cwidth), list(self.cheight))
+
+    if self.PROCESSES > 1:
+      with ProcessPoolExecutor(max_workers=self.PROCESSES) as pool:
+        futures = [pool.submit(_timed, f, *args) for f in self.FAMILIES.values()]
+        rendered = [f.result() for f in futures]
+    else:
+      rendered = [_timed(f, *args) for f in self.FAMILIES.values()]
+
+    families = list()
+    for family, (text, elapsed) in zip(self.FAMILIES, rendered):
+      self.family_stats[family] = {"time": elapsed}
+      families.append(text)
+
+    assertions = "\n".join("(assert %s)" % f for f in families)
+    return render_declarations(*args) + "\n" + assertions
+
+  def post_static_constraints(self):
+    """
+    Post static constraints parsing them from SMT-LIB2 text
+    """
+    text = self.render()
+
+    start = time.perf_counter()
+    self.solver.from_string(text)
+    self.family_stats["parse"] = {"time": time.perf_counter() - start}
+
+    # assertions are parsed in the same order as the families
+    if self.collect_stats:
+      for family, assertion in zip(self.FAMILIES, self.solver.assertions()):
+        self.family_stats[family].update(encoding_size(assertion))
@@ -4,6 +4,7 @@ import numpy as np
 from .naive_model import NaiveModel
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
 
 def z3_bEq(a: z3.BoolRef, b: z3.BoolRef) -> z3.BoolRef:
   """
@@ -26,6 +27,7 @@ class SymmetryModel(NaiveModel):
     # build iboard
     self.iboard = np.array([[z3.Bool(f"cb_{i}_{j}") for j in range(self.WIDTH)] for i in range(self.HEIGHT_UB)])
     
+  @constraint_family
   def iboard_channeling_constraint(self) -> z3.BoolRef:
     """
     Only channel if position is in bound
@@ -58,11 +60,13 @@ class SymmetryModel(NaiveModel):
     
     return z3.And(constraints)
 
+  @constraint_family
   def horizontal_symmetry_breaking(self):
     flat = [self.iboard[i][j] for i in range(self.HEIGHT_UB) for j in range(self.WIDTH)]
     hor_flat = [self.iboard[i][j] for i in range(self.HEIGHT_UB) for j in reversed(range(self.WIDTH))]
     return self._lex_lesseq(flat, hor_flat)
 
+  @constraint_family
   def vertical_symmetry_breaking(self):
     constraints = list()
 
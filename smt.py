@@ -1,8 +1,9 @@
 from smt import NaiveModel, SymmetryModel, NaiveModelRot, SymmetryModelRot
+from native import SkylineModel, SkylineModelRot, BnBModel, BnBModelRot
 from typing import Dict, Union, List
 from glob import glob
 from utils.plot import plot_vlsi, plot_multi_vlsi
-from utils.determine_hbound import greedy_height
+from utils.determine_hbound import height_bounds
 from natsort import natsorted
 import sys, os
 import wandb
@@ -10,9 +11,26 @@ from datetime import timedelta
 import csv
 import time
 import numpy as np
-from utils.io import txt2dict, save_solution
+from utils.io import save_solution
+from utils.store import expand_instances, load_instance, SolutionStore
+from utils.stats import family_rows, solver_rows, FAMILY_HEADER, SOLVER_HEADER
+from utils.profile import Profiler, profile_phase
+from utils.budget import Budget, SweepBudget, Status
+from utils.solution_cache import SolutionCache
+from utils.search import result_quality, SCHEDULES
+from utils.opt_search import minimize_height, OPT_MODES
+from utils.repair import previous_solution, match_circuits, repair_upper_bound, repair
+from utils.z3_profile import load_profile
+from utils.portfolio import portfolio_model
+from utils.z3_pipeline import PIPELINES, GENERIC, with_pipeline
+from utils.selector import select_models
+from utils.memory import admit, run_limited, oom_result
 import re
 
+# models that can be given by name
+MODELS = {m.__name__: m for m in [NaiveModel, SymmetryModel, NaiveModelRot, SymmetryModelRot,
+                                  SkylineModel, SkylineModelRot, BnBModel, BnBModelRot]}
+
 def enumerate_models() -> List[str]:
     """
     Enumerate implemented models.
@@ -39,7 +57,7 @@ if __name__ == "__main__":
         # define CLI arguments
         parser = argparse.ArgumentParser(description="Run minizinc vlsi solving method")
         parser.add_argument("--models", "-m", nargs="*", type=str,
-                            required=True, help="Model(s) to use. Leave empty to use all.")
+                            required=True, help="Model(s) to use, auto to choose the model of each instance from past results. Leave empty to use all.")
         parser.add_argument("--instances", "-i", nargs="*", type=str,
                             required=True, help="Instances(s) to load. Leave empty to use all.")
         parser.add_argument("--csv", "-csv", nargs=1, type=str, help="Save csv files in specified directory.")
@@ -47,84 +65,230 @@ if __name__ == "__main__":
         parser.add_argument("--output", "-o", nargs=1, type=str, help="Save results files in specified directory.")
         parser.add_argument("--timeout", "-timeout", "-t", type=int, default=300,
                             help="Execution time contraint in seconds. Defaults to 300s (5m).")
+        parser.add_argument("--stats", action="store_true",
+                            help="Collect size of each constraint family. Defaults to false.")
+        parser.add_argument("--profile", nargs=1, type=str,
+                            help="Profile each phase and save profiles in specified directory.")
+        parser.add_argument("--sweep-budget", action="store_true",
+                            help="Hand time not used by an instance to the following ones. Defaults to false.")
+        parser.add_argument("--schedule", type=str, default="linear", choices=SCHEDULES,
+                            help="Order in which heights are tried. Defaults to linear.")
+        parser.add_argument("--solution-store", nargs=1, type=str,
+                            help="Save solutions of each model in a packed store in specified directory.")
+        parser.add_argument("--cache", nargs=1, type=str,
+                            help="Reuse optimal solutions of equivalent instances cached in specified directory.")
+        parser.add_argument("--previous", nargs=1, type=str,
+                            help="Solution file or directory of solutions of a previous version of the instances, repaired instead of solving from scratch.")
+        parser.add_argument("--z3-profile", nargs=1, type=str,
+                            help="Set z3 parameters of each model found by utils.tune in specified profile.")
+        parser.add_argument("--portfolio", type=int, default=1,
+                            help="Solve each height with K copies of the model with different seeds in parallel processes, taking the first answer. Defaults to 1.")
+        parser.add_argument("--z3-parallel", type=int,
+                            help="Enable z3 parallel mode with specified number of threads.")
+        parser.add_argument("--opt-mode", type=str, default="probe", choices=OPT_MODES,
+                            help="How the height is minimized: probes in the order of --schedule, z3.Optimize, probes in linear or binary order, or core-guided search from the lower bound. Defaults to probe.")
+        parser.add_argument("--history", nargs=1, type=str, default=["csv"],
+                            help="Directory of past results of each backend, e.g. csv/sat/NaiveModel.csv, --models auto chooses from. Defaults to csv.")
+        parser.add_argument("--rotations", action="store_true",
+                            help="With --models auto, choose among the models rotating circuits. Defaults to false.")
+        parser.add_argument("--memory", type=float,
+                            help="Memory limit of each instance in MB, models expected to exceed it fall back to a smaller model or are skipped.")
+        parser.add_argument("--gap", type=float,
+                            help="Stop as soon as (best height - lower bound) / lower bound is within specified tolerance, e.g. 0.05.")
+        # a logic and a tactic cannot be used together
+        pipeline = parser.add_mutually_exclusive_group()
+        pipeline.add_argument("--logic", type=str,
+                              help="Solve each model with the z3 solver for specified logic, e.g. QF_FD or QF_IDL.")
+        pipeline.add_argument("--tactic", type=str,
+                              help=f"Solve each model with specified z3 tactic, one of {{{', '.join([GENERIC, *PIPELINES])}}} or a comma separated chain of tactics.")
 
         # parse CLI arguments
         args = parser.parse_args()
         # use specified models or use all models if left empty
 
         models = args.models if len(args.models) > 0 else enumerate_models()
-        models = [eval(m) for m in models]
-
         # load specified instances or load all instances if left empty
         instances = args.instances if len(args.instances) > 0 else enumerate_instances()
+        # instance stores are replaced with the instances they hold
+        instances = expand_instances(instances)
+        # with auto, each instance is solved by the model that did best on the most similar instances of past results
+        if models == ["auto"]:
+            plan = select_models(instances, "smt", args.history[0], timeout=args.timeout, rotations=args.rotations)
+            models, model_instances = list(plan.keys()), list(plan.values())
+        else:
+            model_instances = [instances] * len(models)
+        unknown = [m for m in models if isinstance(m, str) and m not in MODELS]
+        if len(unknown) > 0:
+            parser.error(f"unknown model(s) {', '.join(unknown)}, choose from {', '.join(MODELS)}")
+        models = [MODELS[m] if isinstance(m, str) else m for m in models]
+        # the pipeline given on the command line replaces the one declared by the model actually built,
+        # on a subclass so that the models of the fallback chain are left untouched and get it as well
+        def pipeline_model(m):
+            return with_pipeline(m, args.logic, args.tactic) if args.logic is not None or args.tactic is not None else m
+        # each model may be run as a portfolio of diversified copies, each copy built with the pipeline
+        if args.portfolio > 1:
+            models = [portfolio_model(pipeline_model(m), args.portfolio) for m in models]
+        # only SMT models can be handed to z3.Optimize
+        if args.opt_mode == "optimize" and not all(hasattr(m, "optimize") for m in models):
+            parser.error("--opt-mode optimize needs SMT models and no --portfolio")
+        # cores name circuits only through the literals of SMT models
+        if args.opt_mode == "core" and not all(hasattr(m, "circuit_literal") for m in models):
+            parser.error("--opt-mode core needs SMT models and no --portfolio")
+
+        # optimal solutions are shared by instances with the same circuits in any order
+        cache = None
+        if args.cache is not None:
+            cache = SolutionCache(args.cache[0])
 
         # execute each model
-        for model in models:
+        for model, instances in zip(models, model_instances):
             if args.csv is not None:
                 if not os.path.exists(args.csv[0]):
                     os.mkdir(args.csv[0])
                 
                 f = open(os.path.join(args.csv[0], model.__name__ + ".csv"), "w")
                 csv_writer = csv.writer(f)
-                csv_writer.writerow(["instance nr", "time", "build_time", "x", "y"])
+                csv_writer.writerow(["instance nr", "time", "build_time", "x", "y", "status", "optimal", "quality", "model"])
+
+                # encoding and solver statistics are written alongside the results
+                families_f = open(os.path.join(args.csv[0], model.__name__ + ".families.csv"), "w")
+                families_writer = csv.writer(families_f)
+                families_writer.writerow(FAMILY_HEADER)
+                solver_f = open(os.path.join(args.csv[0], model.__name__ + ".solver.csv"), "w")
+                solver_writer = csv.writer(solver_f)
+                solver_writer.writerow(SOLVER_HEADER)
+                # bounds of the height over time
+                trace_f = open(os.path.join(args.csv[0], model.__name__ + ".trace.csv"), "w")
+                trace_writer = csv.writer(trace_f)
+                trace_writer.writerow(["instance nr", "time", "lower", "upper"])
 
             if args.output is not None:
                 if not os.path.exists(args.output[0]):
                     os.mkdir(args.output[0])
 
+            # z3 parameters of the model, z3 defaults if the profile has none for it
+            params = load_profile(args.z3_profile[0], model) if args.z3_profile is not None else dict()
+            if args.z3_parallel is not None:
+                params = {**params, "parallel.enable": True, "parallel.threads.max": args.z3_parallel}
+
+            solutions = None
+            if args.solution_store is not None:
+                solutions = SolutionStore(os.path.join(args.solution_store[0], model.__name__))
+
+
+            sweep = SweepBudget(args.timeout, len(instances))
 
             for i in instances:
-                instance_num = re.findall(r'(\d+)', i)[0]
+                instance_num = re.findall(r'(\d+)', os.path.basename(i))[0]
                 print("%s %s %s %s %s" % ("-" * 5, model, "-" * 3, i, "-" * 5))
 
-                best_x = []
-                best_y = []
+                # every phase of the instance is charged on its budget
+                budget = sweep.allocate() if args.sweep_budget else Budget(args.timeout)
+                data = load_instance(i)
 
-                best_h = None
-                data = txt2dict(i)
-                # sort height and width by height
-                sheight = sorted(data["cheight"], reverse=True)
-                swidth = [i for _, i in sorted(zip(data["cheight"], data["cwidth"]), reverse=True)]
+                lower_bound, upper_bound = height_bounds(data, data["WIDTH"])
 
-                upper_bound = greedy_height(data["N"], data["WIDTH"], swidth, sheight)
-                lower_bound = int(sum([h * w for h, w in zip(sheight, swidth)]) / data["WIDTH"])
-                print(f"Searching height in [{lower_bound}, {upper_bound}]")
+                # circuits of the previous version that did not change can be kept where they were
+                previous = previous_solution(args.previous[0], instance_num) if args.previous is not None else None
+                if previous is not None:
+                    matched = match_circuits(previous, data)
+                    repaired_bound = repair_upper_bound(previous, data, matched)
+                    if repaired_bound is not None:
+                        upper_bound = max(lower_bound, min(upper_bound, repaired_bound))
+                print(f"Searching height in [{lower_bound}, {upper_bound}] with {budget.limit:.2f}s budget")
 
-                # create model new everytime so we can change parameter value
-                solver = model(data["WIDTH"], data["cwidth"], data["cheight"], lower_bound, upper_bound, timeout=args.timeout)
-                print(f"Built encoding and constraints in: {solver.time['init']:04f}s")
+                # profiling is disabled when profiler is None
+                profiler = None
+                if args.profile is not None:
+                    profiler = Profiler(os.path.join(args.profile[0], model.__name__, f"ins-{instance_num}"))
 
-                start_t = time.perf_counter()
-                for h in range(upper_bound, lower_bound - 1, -1):
-                    solver.solve(height=h)
-                    print(f"{'SAT' if solver.solved else 'UNSAT'}\tHeight = {h} [solving: {solver.time['solve']:04f}s setup: {solver.time['setup']:04f}s]")
+                # a model expected not to fit the memory limit is replaced with its fallback
+                instance_model = admit(model, data["N"], data["WIDTH"], upper_bound, args.memory)
+                if instance_model is not None and instance_model is not model:
+                    print("%s %s %s %s %s" % ("-" * 5, instance_model, "-" * 3, i, "-" * 5))
+                # portfolio copies got the pipeline when the portfolio was made
+                if instance_model is not None and args.portfolio <= 1:
+                    instance_model = pipeline_model(instance_model)
 
-                    if solver.solved and solver.remaining_time > 0:
-                        best_h = h
-                        best_x = solver.x
-                        best_y = solver.y
+                # an equivalent instance solved to optimality before is answered from the cache
+                result = None
+                if cache is not None:
+                    result = cache.lookup(data, rotations=model.ROTATIONS)
+
+                if result is not None:
+                    print("Found optimal solution of an equivalent instance in the cache")
+                    result = {**result, "status": Status.SAT, "optimal": True}
+                    build_time, family_stats, solver_stats = 0, dict(), list()
+                elif instance_model is None:
+                    print("No model is expected to fit the memory limit, instance skipped")
+                    result = oom_result()
+                    build_time, family_stats, solver_stats = 0, dict(), list()
+                else:
+                    # the model is built and solved under the memory limit, running out of it ends the instance with an out of memory status
+                    def build_and_search():
+                        # create model new everytime so we can change parameter value
+                        with budget.phase("build"):
+                            solver = instance_model(data["WIDTH"], data["cwidth"], data["cheight"], lower_bound, upper_bound,
+                                                    timeout=budget.remaining, stats=args.stats, profiler=profiler)
+                        if args.z3_profile is not None or args.z3_parallel is not None:
+                            solver.configure(params)
+                        print(f"Built encoding and constraints in: {solver.time['init']:04f}s")
+
+                        if previous is not None:
+                            result = repair(solver, previous, matched, lower_bound, upper_bound, budget, profiler=profiler, schedule=args.schedule, gap=args.gap)
+                        else:
+                            result = minimize_height(solver, lower_bound, upper_bound, budget, mode=args.opt_mode, profiler=profiler, schedule=args.schedule, gap=args.gap)
+                        return result, solver.time["init"], solver.family_stats, solver.solver_stats
+
+                    try:
+                        result, build_time, family_stats, solver_stats = run_limited(build_and_search, args.memory)
+                    except MemoryError as e:
+                        print(f"Out of memory: {e}")
+                        result = oom_result()
+                        build_time, family_stats, solver_stats = 0, dict(), list()
+
+                    if cache is not None and result["optimal"]:
+                        cache.add(data, result["height"], result["x"], result["y"], rotations=result["rotations"])
+                solved_time = budget.elapsed
+                # proven optimal, within the accepted gap of the lower bound or only feasible
+                quality = result_quality(result["height"], result["optimal"], result.get("lower_bound", lower_bound), args.gap)
+
+                with budget.phase("output"):
+                    if result["height"] is not None:
+                        print(f"Solved with h={result['height']} in {solved_time:04f} seconds ({quality})")
+                        with profile_phase(profiler, "plot"):
+                            plot_vlsi(data["cwidth"], data["cheight"], result["x"], result["y"], show=args.plot, rotations=result["rotations"])
                     else:
-                        break
+                        print(f"{result['status']}: no solution found in {solved_time:04f} seconds")
 
-                end_t = time.perf_counter()
+                    if args.output is not None and result["height"] is not None:
+                        path = os.path.join(args.output[0], f"ins-{instance_num}.txt")
+                        save_solution(path, data, list(zip(result["x"], result["y"])))
 
-                if best_h is not None:
-                    rotations = solver.rotations if solver.ROTATIONS else None
-                    solved_time = end_t - start_t
-                    print(f"Solved with h={best_h} in {solved_time:04f} seconds")
-                    plot_vlsi(data["cwidth"], data["cheight"], best_x, best_y, show=args.plot, rotations=rotations)
+                    if solutions is not None and result["height"] is not None:
+                        solutions.add(os.path.splitext(os.path.basename(i))[0], data, result["x"], result["y"], rotations=result["rotations"])
 
-                    if args.csv is not None:
-                        csv_writer.writerow([i, solved_time, solver.time["init"], best_x, best_y])
+                if args.csv is not None:
+                    # the model column names the model that ran, a fallback of the requested one if it was expected not to fit the memory limit
+                    csv_writer.writerow([i, budget.elapsed, build_time, result["x"], result["y"], result["status"], result["optimal"], quality,
+                                         instance_model.__name__ if instance_model is not None else None])
+                    families_writer.writerows(family_rows(i, family_stats))
+                    solver_writer.writerows(solver_rows(i, solver_stats))
+                    trace_writer.writerows([[i, t["time"], t["lower"], t["upper"]] for t in result.get("trace", [])])
 
+                sweep.release(budget)
 
-                if args.output is not None and best_h is not None:
-                    path = os.path.join(args.output[0], f"ins-{instance_num}.txt")
-                    x = best_x
-                    y = best_y
-                    save_solution(path, data, list(zip(x, y)))                
             if args.csv is not None:
                 f.close()
+                families_f.close()
+                solver_f.close()
+                trace_f.close()
+
+            if solutions is not None:
+                solutions.flush()
+
+            if cache is not None:
+                print(cache.report())
             
 
     except KeyboardInterrupt:
@@ -1,17 +1,29 @@
 from os import stat
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Callable, Optional
 import z3
 from z3.z3 import Int, Not
 import time
 import numpy as np
+from utils.stats import solver_statistics
+from utils.profile import profile_phase
+from utils.budget import Status, z3_status
+from utils.z3_profile import set_params
+from utils.z3_pipeline import make_solver
 
 class SmtModel(object):
   ROTATIONS = False
+  # logic or tactic pipeline of the solver, generic z3 solver if both are None
+  LOGIC = None
+  TACTIC = None
+  # the width is a variable up to the given one, set by utils.width_sweep
+  WIDTH_SWEEP = False
+  # model run instead if the encoding is expected not to fit the memory limit, see utils.memory
+  FALLBACK = None
   """
   Sat model implementing some common logic between solvers such as input interface, output interface etc.
   """
 
-  def __init__(self, width: int, cwidth: List[int], cheight: List[int], lb: int, ub: int, timeout: int = 300):
+  def __init__(self, width: int, cwidth: List[int], cheight: List[int], lb: int, ub: int, timeout: float = 300, stats: bool = False, profiler=None):
     """Initialize solver and attributes
 
     Args:
@@ -20,9 +32,13 @@ class SmtModel(object):
         cheight (List[int]): Height of each circuit
         lb (int): Height lower bound
         ub (int): Height upper bound
+        timeout (float, optional): Time limit in seconds, building the encoding is charged too. Defaults to 300.
+        stats (bool, optional): Collect size of each constraint family. Defaults to False.
+        profiler (Profiler, optional): Profiler of setup and constraints posting. Defaults to None.
     """    
     self.N = len(cwidth)
     self.WIDTH = width
+    self.WIDTH_UB = width
 
     self.cwidth = cwidth
     self.cheight = cheight
@@ -30,18 +46,36 @@ class SmtModel(object):
     self.HEIGHT_LB = lb
     self.HEIGHT_UB = ub
     
+    build_start = time.perf_counter()
+
     # build the board representation
-    self.setup()
-    self.solver = z3.Solver()
+    with profile_phase(profiler, "setup"):
+      self.setup()
+    self.solver = make_solver(self.LOGIC, self.TACTIC)
 
     self._solved_once = False
+    self.status = Status.UNKNOWN
+    # unsat core of the last check and best model found by optimize
+    self.core = list()
+    self.incumbent = None
+    self.params = dict()
+
+    # statistics of each constraint family and of each check
+    self.collect_stats = stats
+    self.family_stats = dict()
+    self.solver_stats = list()
+
     self.init_time = time.perf_counter()
-    self.post_static_constraints()
+    with profile_phase(profiler, "post_static_constraints"):
+      self.post_static_constraints()
+      if self.WIDTH_SWEEP:
+        self.solver.add(self.WIDTH <= self.WIDTH_UB)
     self.init_time = time.perf_counter() - self.init_time
 
     self.solved_time = -1
     self.setup_time = 0
-    self.remaining_time = timeout
+    # time spent building the encoding is charged on the time limit
+    self.remaining_time = timeout - (time.perf_counter() - build_start)
 
   def setup(self):
     """
@@ -59,6 +93,24 @@ class SmtModel(object):
     self.cy = np.array([z3.Int(f"cy_{i}") for i in range(self.N)])
 
     self.HEIGHT = z3.Int('HEIGHT')
+    # widths of the sweep are assumptions on the width variable
+    if self.WIDTH_SWEEP:
+      self.WIDTH = z3.Int('WIDTH')
+
+  @classmethod
+  def expected_size(cls, n: int, width: int, height: int) -> Tuple[int, int]:
+    """
+    Size of the encoding before building it, positions are integers whatever the size of the board
+
+    Args:
+        n (int): Number of circuits
+        width (int): Boards width
+        height (int): Height upper bound
+    Returns:
+        Tuple[int, int]: Number of variables and clauses
+    """
+    # a disjunction for each pair of circuits and the bounds of each circuit
+    return 2 * n + 1, 2 * n * (n - 1) + 4 * n
 
   def post_static_constraints(self):
     """
@@ -76,18 +128,55 @@ class SmtModel(object):
     Returns:
         bool: instance has been solved or not
     """
-    try:
-      self.solver.model()
-      return True
-    except:
-      return False
+    return self.status == Status.SAT
+
+  def configure(self, params: Dict[str, Any]):
+    """
+    Set z3 parameters of the solver, e.g. loaded from a profile written by utils.tune
 
-  def solve(self, height: int):
+    Args:
+        params (Dict[str, Any]): Parameter name and value
+    """
+    self.params = params
+    set_params(self.solver, params)
+
+  def width_literal(self, width: int) -> z3.BoolRef:
+    """
+    Args:
+        width (int): Width of the board, no larger than the one the model has been built with
+    Returns:
+        z3.BoolRef: Constraint fixing the width, assumed by each check of a width sweep
+    """
+    return self.WIDTH == width
+
+  def height_literal(self, height: int) -> z3.BoolRef:
+    """
+    Args:
+        height (int): Height of the board
+    Returns:
+        z3.BoolRef: Constraint bounding the height, assumed by each check
+    """
+    return self.HEIGHT <= height
+
+  def circuit_literal(self, c: int, height: int) -> z3.BoolRef:
+    """
+    Args:
+        c (int): Circuit
+        height (int): Height of the board
+    Returns:
+        z3.BoolRef: Constraint keeping the circuit below the height, assumed by core-guided checks
+    """
+    return self.cy[c] + self.cheight[c] <= height
+
+  def solve(self, height: int, assumptions: List[z3.BoolRef] = [], circuits: Optional[List[int]] = None):
     """
     Solve the model
 
     Args:
         height (int): Height of the board
+        assumptions (List[z3.BoolRef], optional): Constraints holding in this check only, e.g. fixed positions. Defaults to [].
+        circuits (Optional[List[int]], optional): Circuits kept below the height, each by its own literal so that
+          unsat cores name them, the others are left unbounded. Defaults to None, bounding the height of the board.
     """
     # setup time is time spent setting up before actually solving
     self.setup_time = 0
@@ -95,20 +184,114 @@ class SmtModel(object):
 
     # post dynamic constraints
     self.setup_time = time.perf_counter()
-    
+    # the height is an assumption of the check so that any height can be tried next
+    if circuits is None:
+      height_bound = [self.height_literal(height)]
+    else:
+      height_bound = [self.circuit_literal(c, height) for c in circuits]
     self.setup_time = time.perf_counter() - self.setup_time
 
+    # a z3 timeout of 0 means no timeout at all, time is already over
+    if self.remaining_time <= 0:
+      self.status = Status.UNKNOWN
+      self.solved_time = 0
+      return
+
     # search for a solution
     self.solved_time = time.perf_counter()
-    self.solver.add(self.HEIGHT <= height)
-    self.solver.set("timeout", int(self.remaining_time * 1000))
-    self.solver.check()
+    self.solver.set("timeout", max(1, int(self.remaining_time * 1000)))
+    result = self.solver.check(*height_bound, *assumptions)
+    self.status = z3_status(result, self.solver.reason_unknown())
     self.solved_time = time.perf_counter() - self.solved_time
+    self.incumbent = None
+    # solvers built from tactics give no cores
+    self.core = list(self.solver.unsat_core()) if self.status == Status.UNSAT else list()
+
+    self.solver_stats.append({
+      "height": height,
+      "result": str(result),
+      "time": self.solved_time,
+      "statistics": solver_statistics(self.solver)
+    })
 
     self.remaining_time -= self.solved_time
     
     self._solved_once = True
 
+  def optimize(self, assumptions: List[z3.BoolRef] = [], on_height: Callable[[int], None] = None) -> bool:
+    """
+    Minimize the height with z3.Optimize over the constraints of the model.
+    Every model found on the way is kept, so that a solution is available even if time runs out.
+
+    Args:
+        assumptions (List[z3.BoolRef], optional): Constraints holding in this check only, e.g. fixed positions. Defaults to [].
+        on_height (Callable[[int], None], optional): Called with the height of each model found. Defaults to None.
+    Returns:
+        bool: Whether the height of the last model found is proven optimal
+    """
+    self.setup_time = time.perf_counter()
+    optimizer = z3.Optimize()
+    set_params(optimizer, self.params)
+    optimizer.add(self.solver.assertions())
+    optimizer.add(self.HEIGHT >= self.HEIGHT_LB)
+    optimizer.minimize(self.HEIGHT)
+
+    def improved(model: z3.ModelRef):
+      self.incumbent = model
+      if on_height is not None:
+        on_height(model.eval(self.HEIGHT).as_long())
+
+    optimizer.set_on_model(improved)
+    self.incumbent = None
+    self.setup_time = time.perf_counter() - self.setup_time
+
+    if self.remaining_time <= 0:
+      self.status = Status.UNKNOWN
+      self.solved_time = 0
+      return False
+
+    self.solved_time = time.perf_counter()
+    optimizer.set("timeout", max(1, int(self.remaining_time * 1000)))
+    result = optimizer.check(self.height_literal(self.HEIGHT_UB), *assumptions)
+    self.solved_time = time.perf_counter() - self.solved_time
+
+    if result == z3.sat:
+      self.incumbent = optimizer.model()
+    # a model found before running out of time is a solution, not proven optimal
+    self.status = Status.SAT if self.incumbent is not None else z3_status(result, optimizer.reason_unknown())
+    height = self.incumbent.eval(self.HEIGHT).as_long() if self.incumbent is not None else self.HEIGHT_UB
+
+    self.solver_stats.append({
+      "height": height,
+      "result": str(result),
+      "time": self.solved_time,
+      "statistics": solver_statistics(optimizer)
+    })
+
+    self.remaining_time -= self.solved_time
+    self._solved_once = True
+    return result == z3.sat
+
+  def model(self) -> z3.ModelRef:
+    """
+    Returns:
+        z3.ModelRef: Model of the last check, or best model found by optimize
+    """
+    return self.incumbent if self.incumbent is not None else self.solver.model()
+
+  def fix_position(self, c: int, x: int, y: int) -> List[z3.BoolRef]:
+    """
+    Constraints placing a circuit, to be used as solve assumptions
+
+    Args:
+        c (int): Circuit index
+        x (int): Left-bottom x position
+        y (int): Left-bottom y position
+    Returns:
+        List[z3.BoolRef]: Constraints on the circuit position
+    """
+    return [self.cx[c] == x, self.cy[c] == y]
+
   def _idxs_positions(self) -> List[Tuple[int, int]]:
     """
     Raises:
@@ -143,6 +326,17 @@ class SmtModel(object):
     """
     return self.x, self.y
 
+  @property
+  def statistics(self) -> Dict:
+    """
+    Returns:
+      Dict: Statistics of each constraint family and of each check performed by the solver
+    """
+    return {
+      "families": self.family_stats,
+      "solver": self.solver_stats
+    }
+
   @property
   def time(self) -> Dict:
     """
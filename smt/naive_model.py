@@ -4,6 +4,7 @@ import numpy as np
 from .base import SmtModel
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
 
 
 class NaiveModel(SmtModel):
@@ -24,11 +25,12 @@ class NaiveModel(SmtModel):
         idxs = list()
 
         for c in range(self.N):
-            idxs.append((self.solver.model().evaluate(self.cx[c]).as_long(),
-                         self.solver.model().evaluate(self.cy[c]).as_long()))
+            idxs.append((self.model().evaluate(self.cx[c]).as_long(),
+                         self.model().evaluate(self.cy[c]).as_long()))
 
         return idxs
 
+    @constraint_family
     def allowed_height_constraint(self):
         """
     Ensure no placement outside of max height
@@ -40,6 +42,7 @@ class NaiveModel(SmtModel):
 
         return z3.And(constraints)
 
+    @constraint_family
     def allowed_width_constraint(self):
         """
     Ensure no placement outside of max width
@@ -50,6 +53,7 @@ class NaiveModel(SmtModel):
             constraints.append(self.cx[x] >= 0)
         return z3.And(constraints)
 
+    @constraint_family
     def overlapping_constraint(self) -> z3.BoolRef:
         """
         Overlapping constraint between two circuits. Only one circuit can be at index (i,j).
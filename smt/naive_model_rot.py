@@ -4,6 +4,7 @@ import numpy as np
 from .naive_model import SmtModel
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
 
 
 class NaiveModelRot(SmtModel):
@@ -14,6 +15,10 @@ class NaiveModelRot(SmtModel):
 
     Each circuits gets a whole WIDTHxHEIGHT board representation
     Fixed width and not overlapping circuits constraints are posted.
+
+    Rotation is tied once to the effective width and height of each circuit, every other
+    constraint is posted on the effective dimensions.
+    Square circuits and circuits that cannot fit rotated get no rotation variable.
     """
 
     def _idxs_positions(self):
@@ -24,14 +29,14 @@ class NaiveModelRot(SmtModel):
         idxs = list()
 
         for c in range(self.N):
-            idxs.append((self.solver.model().evaluate(self.cx[c]).as_long(),
-                         self.solver.model().evaluate(self.cy[c]).as_long()))
+            idxs.append((self.model().evaluate(self.cx[c]).as_long(),
+                         self.model().evaluate(self.cy[c]).as_long()))
 
         return idxs
 
     @property
     def rotations(self):
-        model = self.solver.model()
+        model = self.model()
         rot = list()
 
         for r in self.rotated:
@@ -42,46 +47,72 @@ class NaiveModelRot(SmtModel):
 
         return rot
 
+    def circuit_literal(self, c: int, height: int) -> z3.BoolRef:
+        """
+        Args:
+            c (int): Circuit
+            height (int): Height of the board
+        Returns:
+            z3.BoolRef: Constraint keeping the circuit below the height whatever its rotation
+        """
+        return self.cy[c] + self.eheight[c] <= height
+
     def setup(self):
         # build default setup
         super().setup()
 
-        # build flattenpos arrays
-        self.rotated = np.array([z3.Bool(f"r_{i}") for i in range(self.N)])
-            
+        # build rotation arrays
+        self.rotated = np.array([z3.Bool(f"r_{i}") if self._can_rotate(i) else z3.BoolVal(False) for i in range(self.N)])
+        # effective width and height, constants for circuits that cannot be rotated
+        self.ewidth = np.array([z3.Int(f"ew_{i}") if self._can_rotate(i) else self.cwidth[i] for i in range(self.N)], dtype=object)
+        self.eheight = np.array([z3.Int(f"eh_{i}") if self._can_rotate(i) else self.cheight[i] for i in range(self.N)], dtype=object)
+
+    def _can_rotate(self, c: int) -> bool:
+        """
+        Args:
+            c (int): Circuit
+        Returns:
+            bool: Rotating the circuit gives a different circuit that fits in the board
+        """
+        return self.cwidth[c] != self.cheight[c] and self.cheight[c] <= self.WIDTH_UB and self.cwidth[c] <= self.HEIGHT_UB
+
+    @constraint_family
+    def effective_dimension_constraint(self):
+        """
+        Tie effective width and height to the rotation of each circuit
+        """
+        constraints = list()
+        for c in range(self.N):
+            if self._can_rotate(c):
+                constraints.append(self.ewidth[c] == z3.If(self.rotated[c], self.cheight[c], self.cwidth[c]))
+                constraints.append(self.eheight[c] == z3.If(self.rotated[c], self.cwidth[c], self.cheight[c]))
+
+        return z3.And(constraints)
+
+    @constraint_family
     def allowed_height_constraint(self):
         """
         Ensure no placement outside of max height
         """
         constraints = list()
         for y in range(self.N):
-            constraints.append(
-                z3.If(
-                    self.rotated[y],
-                    self.cy[y] + self.cwidth[y] <= self.HEIGHT,
-                    self.cy[y] + self.cheight[y] <= self.HEIGHT  
-                )
-            )
+            constraints.append(self.cy[y] + self.eheight[y] <= self.HEIGHT)
             constraints.append(self.cy[y] >= 0)
 
         return z3.And(constraints)
 
+    @constraint_family
     def allowed_width_constraint(self):
         """
         Ensure no placement outside of max width
         """
         constraints = list()
         for x in range(self.N):
-            constraints.append(
-                z3.If(
-                    self.rotated[x],
-                    self.cx[x] + self.cheight[x] <= self.WIDTH,
-                    self.cx[x] + self.cwidth[x] <= self.WIDTH  
-                )
-            )
+            constraints.append(self.cx[x] + self.ewidth[x] <= self.WIDTH)
             constraints.append(self.cx[x] >= 0)
         return z3.And(constraints)
 
+    @constraint_family
     def overlapping_constraint(self) -> z3.BoolRef:
         """
         Overlapping constraint between two circuits. Only one circuit can be at index (i,j).
@@ -97,40 +128,14 @@ class NaiveModelRot(SmtModel):
         for i in range(self.N):
             for j in range(self.N):
                 if i < j:
-                    # both not rotated
-                    constraints.append(z3.Implies(
-                        z3.Not(z3.And(self.rotated[i], self.rotated[j])),
-                        z3.Or(
-                            self.cx[i] + self.cwidth[i]  <= self.cx[j], self.cx[j] + self.cwidth[j]  <= self.cx[i],
-                            self.cy[i] + self.cheight[i] <= self.cy[j], self.cy[j] + self.cheight[j] <= self.cy[i]
-                        )))
-
-                    # only i rotated
-                    constraints.append(z3.Implies(
-                        z3.And(self.rotated[i], z3.Not(self.rotated[j])),
-                        z3.Or(
-                            self.cx[i] + self.cheight[i] <= self.cx[j],
-                            self.cx[j] + self.cwidth[j] <= self.cx[i],
-                            self.cy[i] + self.cwidth[i] <= self.cy[j],
-                            self.cy[j] + self.cheight[j] <= self.cy[i])))
-
-                    # only j rotated
-                    constraints.append(z3.Implies(
-                        z3.And(z3.Not(self.rotated[i]), self.rotated[j]),
-                        z3.Or(
-                            self.cx[i] + self.cwidth[i] <= self.cx[j],
-                            self.cx[j] + self.cheight[j] <= self.cx[i],
-                            self.cy[i] + self.cheight[i] <= self.cy[j],
-                            self.cy[j] + self.cwidth[j] <= self.cy[i])))
-
-                    # both rotated
-                    constraints.append(z3.Implies(
-                        z3.And(self.rotated[i], self.rotated[j]),
+                    constraints.append(
                         z3.Or(
-                            self.cx[i] + self.cheight[i] <= self.cx[j],
-                            self.cx[j] + self.cheight[j] <= self.cx[i],
-                            self.cy[i] + self.cwidth[i] <= self.cy[j],
-                            self.cy[j] + self.cwidth[j] <= self.cy[i])))
+                            self.cx[i] + self.ewidth[i] <= self.cx[j],
+                            self.cx[j] + self.ewidth[j] <= self.cx[i],
+                            self.cy[i] + self.eheight[i] <= self.cy[j],
+                            self.cy[j] + self.eheight[j] <= self.cy[i]
+                        )
+                    )
 
         return z3.And(constraints)
 
@@ -139,6 +144,7 @@ class NaiveModelRot(SmtModel):
         Post static constraints
         """
         self.solver.add(
+            self.effective_dimension_constraint(),
             self.allowed_height_constraint(),
             self.allowed_width_constraint(),
             self.overlapping_constraint(),
@@ -4,6 +4,7 @@ import numpy as np
 from .naive_model import NaiveModel
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
 
 def z3_bEq(a, b):
   """
@@ -29,8 +30,10 @@ class SymmetryModel(NaiveModel):
     self.flatpos_ver = z3.IntVector("flatpos_ver", self.N)
 
   def flatten_position(self, i, j):
-      return i*self.WIDTH+j
+      # rows are as long as the widest board so that positions stay linear when the width is a variable
+      return i*self.WIDTH_UB+j
 
+  @constraint_family
   def channel_flatpos(self):
     constraints = list()
 
@@ -62,6 +65,7 @@ class SymmetryModel(NaiveModel):
     return z3.And(constraints)
 
 
+  @constraint_family
   def symmetry_breaking(self):
 
     constraints = list()
@@ -4,6 +4,7 @@ import numpy as np
 from .naive_model_rot import NaiveModelRot
 from itertools import chain, combinations
 from typing import List
+from utils.stats import constraint_family
 
 def z3_bEq(a, b):
   """
@@ -29,27 +30,18 @@ class SymmetryModelRot(NaiveModelRot):
     self.flatpos_ver = z3.IntVector("flatpos_ver", self.N)
 
   def flatten_position(self, i, j):
-      return i*self.WIDTH+j
+      # rows are as long as the widest board so that positions stay linear when the width is a variable
+      return i*self.WIDTH_UB+j
 
+  @constraint_family
   def channel_flatpos(self):
     constraints = list()
 
     for i in range(self.N):
       constraints.append(self.flatpos[i] == self.flatten_position(self.cy[i], self.cx[i]))
-      constraints.append(
-        z3.If(
-          self.rotated[i],
-          self.flatpos_hor[i] == self.flatten_position(self.cy[i], self.WIDTH - self.cheight[i] - self.cx[i]),
-          self.flatpos_hor[i] == self.flatten_position(self.cy[i], self.WIDTH - self.cwidth[i] - self.cx[i])))
-        
-      constraints.append(
-        z3.If(
-          self.rotated[i],
-          self.flatpos_ver[i] == self.flatten_position(self.HEIGHT - self.cwidth[i] - self.cy[i], self.cx[i]),
-          self.flatpos_ver[i] == self.flatten_position(self.HEIGHT - self.cheight[i] - self.cy[i], self.cx[i])
-        )
-      )
-        
+      constraints.append(self.flatpos_hor[i] == self.flatten_position(self.cy[i], self.WIDTH - self.ewidth[i] - self.cx[i]))
+      constraints.append(self.flatpos_ver[i] == self.flatten_position(self.HEIGHT - self.eheight[i] - self.cy[i], self.cx[i]))
+
     return z3.And(constraints)
 
   def _lex_lesseq(self, a, b) -> z3.BoolRef:
@@ -73,6 +65,7 @@ class SymmetryModelRot(NaiveModelRot):
     return z3.And(constraints)
 
 
+  @constraint_family
   def symmetry_breaking(self):
     constraints = list()
     constraints.append(self._lex_lesseq(self.flatpos, self.flatpos_hor))
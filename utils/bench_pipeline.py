@@ -0,0 +1,110 @@
+"""
+Compare z3 logics and tactic pipelines of models across instances.
+
+Each model is run with each pipeline on each instance in the same way as the drivers, runs are scored by PAR2:
+solving time if the height is proven optimal, twice the timeout otherwise. Runs are dispatched to the processes
+longest expected first, see utils.scheduler.
+
+usage: python -m utils.bench_pipeline -m MODEL ... [-i INSTANCES ...] [--pipelines PIPELINE ...]
+                                      [-t TIMEOUT] [--processes P] [--csv CSV] [--history HISTORY]
+"""
+from typing import Dict, Any, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from contextlib import redirect_stdout
+import argparse
+import csv
+import sys
+import io
+from glob import glob
+from natsort import natsorted
+from utils.budget import Budget
+from utils.search import search_height
+from utils.store import expand_instances, load_instance
+from utils.determine_hbound import height_bounds
+from utils.tune import find_model
+from utils.z3_pipeline import parse_pipeline, with_pipeline
+from utils.scheduler import expected_runtimes, run_jobs, LptScheduler
+
+# pipelines tried by default for each family of models
+DEFAULT_PIPELINES = {
+  "sat": ["generic", "QF_FD", "sat", "sat-cnf"],
+  "smt": ["generic", "QF_IDL", "QF_LIA", "lia", "bv", "bv-sat"]
+}
+
+def run(key: str, pipeline: str, instance: str, timeout: float) -> Dict[str, Any]:
+  """
+  Solve an instance with a pipeline, in the same way as the drivers
+
+  Args:
+      key (str): Module and class name of the model
+      pipeline (str): generic, a logic or a tactic
+      instance (str): Path of the instance
+      timeout (float): Time limit in seconds
+  Returns:
+      Dict[str, Any]: Height found, whether it is optimal, solving time and PAR2 score of the run
+  """
+  sys.setrecursionlimit(3000)
+  model = with_pipeline(find_model(key), *parse_pipeline(pipeline))
+  data = load_instance(instance)
+  budget = Budget(timeout)
+
+  lower_bound, upper_bound = height_bounds(data, data["WIDTH"])
+
+  with redirect_stdout(io.StringIO()):
+    solver = model(data["WIDTH"], data["cwidth"], data["cheight"], lower_bound, upper_bound, timeout=budget.remaining)
+    result = search_height(solver, lower_bound, upper_bound, budget)
+
+  return {
+    "height": result["height"],
+    "optimal": result["optimal"],
+    "time": budget.elapsed,
+    "par2": budget.elapsed if result["optimal"] else 2 * timeout
+  }
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Compare z3 logics and tactic pipelines of models")
+  parser.add_argument("--models", "-m", nargs="+", type=str, required=True, help="Models to run, e.g. sat.NaiveModel or smt.SymmetryModel.")
+  parser.add_argument("--instances", "-i", nargs="*", type=str, default=[], help="Instances(s) to load. Leave empty to use all.")
+  parser.add_argument("--pipelines", nargs="*", type=str, default=[],
+                      help="Pipelines to compare: generic, a logic (e.g. QF_FD) or a tactic. Leave empty to use the ones of each model family.")
+  parser.add_argument("--timeout", "-t", type=float, default=60, help="Time limit of each run in seconds. Defaults to 60s.")
+  parser.add_argument("--processes", "-p", type=int, default=1, help="Runs done in parallel. Defaults to 1.")
+  parser.add_argument("--csv", "-csv", nargs=1, type=str, help="Save the result of each run in specified csv file.")
+  parser.add_argument("--history", type=str, default="csv",
+                      help="Directory of past results of each backend runs are expected to take as long as. Defaults to csv.")
+  args = parser.parse_args()
+
+  instances = expand_instances(args.instances if len(args.instances) > 0 else natsorted(glob("instances/*.txt")))
+  tasks: List[Tuple[str, str, str]] = list()
+  for key in args.models:
+    pipelines = args.pipelines if len(args.pipelines) > 0 else DEFAULT_PIPELINES[key.split(".")[0]]
+    tasks.extend((key, p, i) for p in pipelines for i in instances)
+
+  # runs expected to take longest go first, every pipeline of a model is expected to take as long as its past results
+  estimates = dict()
+  for backend in {key.split(".")[0] for key, _, _ in tasks}:
+    runs = {(key.split(".")[1], i) for key, _, i in tasks if key.split(".")[0] == backend}
+    estimates.update({(f"{backend}.{m}", i): t for (m, i), t in expected_runtimes(backend, list(runs), args.history, args.timeout).items()})
+  scheduler = LptScheduler({(key, p, i): estimates[(key, i)] for key, p, i in tasks}, group=lambda task: task[:2])
+
+  with ProcessPoolExecutor(args.processes) as pool:
+    outcomes = run_jobs(pool, partial(run, timeout=args.timeout), scheduler, args.processes)
+  results = [outcomes[task] for task in tasks]
+  print(scheduler.report())
+
+  if args.csv is not None:
+    with open(args.csv[0], "w") as f:
+      csv_writer = csv.writer(f)
+      csv_writer.writerow(["model", "pipeline", "instance", "height", "optimal", "time", "par2"])
+      for (key, p, i), r in zip(tasks, results):
+        csv_writer.writerow([key, p, i, r["height"], r["optimal"], r["time"], r["par2"]])
+
+  # summary of each model and pipeline, best PAR2 first
+  summary = dict()
+  for (key, p, _), r in zip(tasks, results):
+    summary.setdefault((key, p), list()).append(r)
+
+  print("%-24s %-32s %8s %10s" % ("model", "pipeline", "optimal", "mean par2"))
+  for (key, p), runs in sorted(summary.items(), key=lambda e: (e[0][0], sum(r["par2"] for r in e[1]))):
+    print("%-24s %-32s %8d %10.2f" % (key, p, sum(r["optimal"] for r in runs), sum(r["par2"] for r in runs) / len(runs)))
@@ -0,0 +1,63 @@
+"""
+Compare the time needed to build the static constraints of the SAT naive model
+through the z3 bindings and through the SMT-LIB2 text builder.
+
+usage: python -m utils.bench_smtlib [-i INSTANCES ...] [--csv CSV] [--processes P] [--check]
+"""
+import argparse
+import csv
+import sys
+from glob import glob
+import z3
+from natsort import natsorted
+from sat import NaiveModel, NaiveModelSmtlib
+from utils.io import txt2dict
+from utils.determine_hbound import height_bounds
+
+def equivalent(a: z3.Solver, b: z3.Solver) -> bool:
+  """
+  Check that the assertions of two solvers are logically equivalent
+  """
+  s = z3.Solver()
+  s.add(z3.Not(z3.And(a.assertions()) == z3.And(b.assertions())))
+  return s.check() == z3.unsat
+
+if __name__ == "__main__":
+  sys.setrecursionlimit(3000)
+
+  parser = argparse.ArgumentParser(description="Compare z3 bindings and SMT-LIB2 text constraint building")
+  parser.add_argument("--instances", "-i", nargs="*", type=str, default=[], help="Instances(s) to load. Leave empty to use all.")
+  parser.add_argument("--csv", "-csv", nargs=1, type=str, help="Save timings in specified csv file.")
+  parser.add_argument("--processes", "-p", type=int, default=1, help="Processes used to render constraint families. Defaults to 1.")
+  parser.add_argument("--check", "-c", action="store_true", help="Prove that both builders post the same formula.")
+  args = parser.parse_args()
+
+  instances = args.instances if len(args.instances) > 0 else natsorted(glob("instances/*.txt"))
+  NaiveModelSmtlib.PROCESSES = args.processes
+
+  if args.csv is not None:
+    f = open(args.csv[0], "w")
+    csv_writer = csv.writer(f)
+    csv_writer.writerow(["instance nr", "bindings_time", "smtlib_time", "speedup", "equivalent"])
+
+  print("%-24s %12s %12s %8s" % ("instance", "bindings", "smtlib", "speedup"))
+  for i in instances:
+    data = txt2dict(i)
+    lb, ub = height_bounds(data, data["WIDTH"])
+
+    bindings = NaiveModel(data["WIDTH"], data["cwidth"], data["cheight"], lb, ub)
+    smtlib = NaiveModelSmtlib(data["WIDTH"], data["cwidth"], data["cheight"], lb, ub)
+
+    speedup = bindings.time["init"] / smtlib.time["init"]
+    same = equivalent(bindings.solver, smtlib.solver) if args.check else None
+    print("%-24s %11.4fs %11.4fs %7.1fx%s" % (i, bindings.time["init"], smtlib.time["init"], speedup,
+                                            "" if same is None else " equivalent: %s" % same))
+
+    if args.csv is not None:
+      csv_writer.writerow([i, bindings.time["init"], smtlib.time["init"], speedup, same])
+
+    # release the z3 terms before building the next instance
+    del bindings, smtlib
+
+  if args.csv is not None:
+    f.close()
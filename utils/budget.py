@@ -0,0 +1,139 @@
+from typing import Dict
+from contextlib import contextmanager
+from enum import Enum
+import time
+
+class Status(Enum):
+  """
+  Outcome of a solver call: a solution has been found, no solution exists, the answer is not known
+  (e.g. time ran out) or memory ran out
+  """
+  SAT = "SAT"
+  UNSAT = "UNSAT"
+  UNKNOWN = "UNKNOWN"
+  OOM = "OOM"
+
+  def __str__(self) -> str:
+    return self.value
+
+def z3_status(result, reason: str = "") -> Status:
+  """
+  Converts a z3 check result
+
+  Args:
+      result (z3.CheckSatResult): Result of z3 check
+      reason (str, optional): Reason of an unknown result, see z3.Solver.reason_unknown. Defaults to "".
+  Returns:
+      Status: Corresponding status
+  """
+  if str(result) == "unknown" and "memory" in reason:
+    return Status.OOM
+  return {"sat": Status.SAT, "unsat": Status.UNSAT}.get(str(result), Status.UNKNOWN)
+
+def minizinc_status(status) -> Status:
+  """
+  Converts the status of a minizinc result
+
+  Args:
+      status (minizinc.Status): Status of the minizinc result
+  Returns:
+      Status: Corresponding status
+  """
+  if status.has_solution():
+    return Status.SAT
+  elif status.name == "UNSATISFIABLE":
+    return Status.UNSAT
+  else:
+    return Status.UNKNOWN
+
+class Budget(object):
+  """
+  Wall-clock time budget of a single instance.
+  Every phase (build, solve, decode, output) is charged since the budget is a deadline
+  starting when the budget is created.
+  """
+  def __init__(self, limit: float):
+    """
+    Args:
+        limit (float): Time limit in seconds
+    """
+    self.limit = limit
+    self.start = time.perf_counter()
+    self.phases = dict()
+
+  @property
+  def elapsed(self) -> float:
+    """
+    Returns:
+        float: Seconds elapsed since the budget has been created
+    """
+    return time.perf_counter() - self.start
+
+  @property
+  def remaining(self) -> float:
+    """
+    Returns:
+        float: Seconds left, never negative
+    """
+    return max(0, self.limit - self.elapsed)
+
+  @property
+  def expired(self) -> bool:
+    """
+    Returns:
+        bool: No time left
+    """
+    return self.remaining <= 0
+
+  @contextmanager
+  def phase(self, name: str):
+    """
+    Records time spent in a phase
+
+    Args:
+        name (str): Name of the phase
+    """
+    start = time.perf_counter()
+    try:
+      yield self
+    finally:
+      self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+  def report(self) -> Dict[str, float]:
+    """
+    Returns:
+        Dict[str, float]: Time spent in each phase and in total
+    """
+    return {**self.phases, "total": self.elapsed}
+
+class SweepBudget(object):
+  """
+  Time budget of a sweep over several instances.
+  Each instance gets an even share of the time left, so time not used by easy
+  instances is handed to the following ones.
+  """
+  def __init__(self, per_instance: float, instances: int):
+    """
+    Args:
+        per_instance (float): Nominal time limit of each instance in seconds
+        instances (int): Number of instances in the sweep
+    """
+    self.pool = per_instance * instances
+    self.instances = instances
+
+  def allocate(self) -> Budget:
+    """
+    Returns:
+        Budget: Budget of the next instance
+    """
+    return Budget(self.pool / max(1, self.instances))
+
+  def release(self, budget: Budget):
+    """
+    Returns the unused time of an instance budget to the sweep
+
+    Args:
+        budget (Budget): Budget given by allocate
+    """
+    self.pool = max(0, self.pool - budget.elapsed)
+    self.instances -= 1
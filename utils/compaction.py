@@ -0,0 +1,61 @@
+"""
+Gravity compaction of a packing: circuits are pushed down and then left, over and over, until none of them moves.
+
+A packing found at height h often leaves slack, the compacted packing may use fewer rows so that the height search
+can skip the heights between the two. Each push moves a circuit against the nearest circuit below (or to its left)
+sharing some of its columns (or rows), the edges of the circuits are kept in interval arrays so that each push
+checks every other circuit at once.
+"""
+from typing import List, Tuple, Optional
+import numpy as np
+
+def push(start: np.ndarray, size: np.ndarray, other_start: np.ndarray, other_size: np.ndarray) -> bool:
+  """
+  Pushes each circuit towards 0 along one axis, from the one nearest to 0, against the circuits it faces.
+  Two circuits face each other if their intervals on the other axis overlap.
+
+  Args:
+      start (np.ndarray): Position of each circuit along the axis, updated in place
+      size (np.ndarray): Size of each circuit along the axis
+      other_start (np.ndarray): Position of each circuit along the other axis
+      other_size (np.ndarray): Size of each circuit along the other axis
+  Returns:
+      bool: Whether some circuit has moved
+  """
+  other_end = other_start + other_size
+  moved = False
+  # circuits nearer to 0 settle first so that the ones behind can follow them
+  for c in np.argsort(start, kind="stable"):
+    end = start + size
+    facing = (other_start < other_end[c]) & (other_start[c] < other_end)
+    facing[c] = False
+    # circuits in front of c, those behind it are not in the way
+    blocking = facing & (end <= start[c])
+    target = end[blocking].max() if blocking.any() else 0
+    if target < start[c]:
+      start[c] = target
+      moved = True
+  return moved
+
+def compact(cwidth: List[int], cheight: List[int], x: List[int], y: List[int],
+            rotations: Optional[List[bool]] = None) -> Tuple[List[int], List[int], int]:
+  """
+  Args:
+      cwidth (List[int]): Width of each circuit
+      cheight (List[int]): Height of each circuit
+      x (List[int]): Left x position of each circuit in a packing without overlaps
+      y (List[int]): Bottom y position of each circuit in a packing without overlaps
+      rotations (Optional[List[bool]], optional): Wether a circuit has been rotated. Defaults to None.
+  Returns:
+      Tuple[List[int], List[int], int]: x and y positions of the compacted packing and its height
+  """
+  rotations = rotations if rotations is not None else [False] * len(cwidth)
+  w = np.array([h if r else w for w, h, r in zip(cwidth, cheight, rotations)], dtype=int)
+  h = np.array([w if r else h for w, h, r in zip(cwidth, cheight, rotations)], dtype=int)
+  cx, cy = np.array(x, dtype=int), np.array(y, dtype=int)
+
+  # each pass either moves a circuit towards the bottom-left corner or ends the compaction
+  while push(cy, h, cx, w) | push(cx, w, cy, h):
+    pass
+
+  return cx.tolist(), cy.tolist(), int((cy + h).max())
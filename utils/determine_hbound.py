@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import Any, Dict, List, Tuple, Union
 
 def greedy_height(N: int,  # number of circuits
                   W: int,  # width of the board
@@ -19,4 +19,44 @@ def greedy_height(N: int,  # number of circuits
       else:
         return greedy_height(N, W, widths, heights, row_height, height_acc, width_acc + ew, it + 1)
     else:
-      return greedy_height(N, W, widths, heights, 0, height_acc, 0, it)
\ No newline at end of file
+      return greedy_height(N, W, widths, heights, 0, height_acc, 0, it)
+
+def height_bounds(data: Dict[str, Any], width: int) -> Tuple[int, int]:
+  """
+  Height bounds of an instance on a board of a given width, from the area of the circuits and greedy_height
+
+  Args:
+      data (Dict[str, Any]): Instance
+      width (int): Width of the board, no smaller than the widest circuit
+  Returns:
+      Tuple[int, int]: Height lower and upper bound
+  """
+  sheight = sorted(data["cheight"], reverse=True)
+  swidth = [w for _, w in sorted(zip(data["cheight"], data["cwidth"]), reverse=True)]
+
+  upper_bound = greedy_height(data["N"], width, swidth, sheight)
+  lower_bound = int(sum([h * w for h, w in zip(sheight, swidth)]) / width)
+  return lower_bound, upper_bound
+
+def shelf_packing(data: Dict[str, Union[int, List[int]]]) -> Tuple[List[int], List[int]]:
+  """
+  Packing with the same shelves as greedy_height: circuits sorted by height fill rows from left to right
+
+  Args:
+      data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+  Returns:
+      Tuple[List[int], List[int]]: Circuits left-bottom x and y positions
+  """
+  x, y = [0] * data["N"], [0] * data["N"]
+  row_y, row_height, row_width = 0, 0, 0
+
+  for c in sorted(range(data["N"]), key=lambda c: data["cheight"][c], reverse=True):
+    if row_width + data["cwidth"][c] > data["WIDTH"]:
+      row_y, row_height, row_width = row_y + row_height, 0, 0
+
+    x[c], y[c] = row_width, row_y
+    row_width += data["cwidth"][c]
+    # the first circuit of a row is the highest one
+    row_height = max(row_height, data["cheight"][c])
+
+  return x, y
@@ -0,0 +1,210 @@
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from contextlib import contextmanager
+from datetime import timedelta
+from minizinc import Instance, Solver
+from minizinc.CLI import CLIInstance
+import hashlib
+import shutil
+import threading
+import json
+import time
+import os
+import re
+
+# flags needed at compile time so that the output model prints solutions the way minizinc-python parses them
+OUTPUT_FLAGS = {"output-mode": "json", "output-objective": True, "output-output-item": True}
+
+def model_files(path: str) -> List[str]:
+  """
+  Model file followed by the files it includes from its own directory (e.g. determine_hbound.mzn).
+  Standard library includes such as globals.mzn are not followed, the solver version is part of the key instead.
+
+  Args:
+      path (str): Path of the .mzn model
+  Returns:
+      List[str]: Paths of the model and its local includes
+  """
+  files = [path]
+  directory = os.path.dirname(path)
+
+  for f in files:
+    with open(f) as model:
+      for include in re.findall(r'include\s+"([^"]+)"', model.read()):
+        local = os.path.join(directory, include)
+        if os.path.exists(local) and local not in files:
+          files.append(local)
+
+  return files
+
+class FlatInstance(CLIInstance):
+  """
+  Instance solving a compiled .fzn file with its .ozn output model, skipping the flattening.
+  Solving method and output type are copied from the instance the files have been compiled from.
+  """
+  def __init__(self, solver: Solver, source: CLIInstance, fzn: str, ozn: str, release: Optional[Callable[[], None]] = None):
+    """
+    Args:
+        solver (Solver): Solver the files have been compiled for
+        source (CLIInstance): Instance the files have been compiled from
+        fzn (str): Path of the FlatZinc file
+        ozn (str): Path of the output model
+        release (Optional[Callable[[], None]], optional): Called once the solver is done with the files. Defaults to None.
+    """
+    super().__init__(solver)
+    self._method = source.method
+    self._input = source.input
+    self._output = source._output
+    self.output_type = source.output_type
+    self.fzn = fzn
+    self.ozn = ozn
+    self.release = release
+
+  @contextmanager
+  def files(self):
+    try:
+      yield [self.fzn, "--ozn-file", self.ozn]
+    finally:
+      if self.release is not None:
+        self.release()
+        self.release = None
+
+class FznCache(object):
+  """
+  Bounded directory cache of compiled FlatZinc files.
+  Entries are keyed by the hash of model files, instance data, solver and compiler options,
+  least recently used entries are evicted once the cache holds more than max_entries.
+  The cache can be shared by threads: an instance missed by several of them is flattened once,
+  and entries are not evicted while a solver is reading their files.
+  """
+  def __init__(self, directory: str, max_entries: int = 256):
+    """
+    Args:
+        directory (str): Directory of the cache
+        max_entries (int, optional): Maximum number of cached instances. Defaults to 256.
+    """
+    self.directory = directory
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    # flattening time avoided by cache hits
+    self.saved = 0
+    # guards the counters, the entries in use and the files of the cache
+    self.lock = threading.Lock()
+    # solvers reading the files of each entry
+    self.pins: Dict[str, int] = dict()
+    # held while an entry is flattened
+    self.compiling: Dict[str, threading.Lock] = dict()
+    os.makedirs(directory, exist_ok=True)
+
+  def key(self, model: str, data: Dict[str, Any], solver: Solver, options: Dict[str, Any]) -> str:
+    """
+    Args:
+        model (str): Path of the .mzn model
+        data (Dict[str, Any]): Instance data
+        solver (Solver): Solver used to flatten the model
+        options (Dict[str, Any]): Compiler options
+    Returns:
+        str: Hash identifying the compiled instance
+    """
+    h = hashlib.sha256()
+    for f in model_files(model):
+      with open(f, "rb") as content:
+        h.update(content.read())
+
+    h.update(json.dumps(data, sort_keys=True).encode())
+    h.update(f"{solver.id}@{solver.version}".encode())
+    h.update(json.dumps(options, sort_keys=True).encode())
+    return h.hexdigest()
+
+  def _entry(self, key: str) -> Tuple[str, str, str]:
+    path = os.path.join(self.directory, key)
+    return path + ".fzn", path + ".ozn", path + ".json"
+
+  def compile(self, instance: Instance, model: str, data: Dict[str, Any], solver: Solver,
+              timeout: Optional[timedelta] = None, optimisation_level: Optional[int] = None) -> FlatInstance:
+    """
+    Compiled version of an instance, flattened only if it is not cached
+
+    Args:
+        instance (Instance): Instance built from the model with data assigned
+        model (str): Path of the .mzn model
+        data (Dict[str, Any]): Instance data
+        solver (Solver): Solver used to flatten and solve the model
+        timeout (Optional[timedelta], optional): Time limit of flattening. Defaults to None.
+        optimisation_level (Optional[int], optional): Compiler optimisation level. Defaults to None.
+    Returns:
+        FlatInstance: Instance solving the cached files
+    """
+    key = self.key(model, data, solver, {"optimisation_level": optimisation_level, **OUTPUT_FLAGS})
+    fzn, ozn, meta = self._entry(key)
+
+    with self.lock:
+      compiling = self.compiling.setdefault(key, threading.Lock())
+
+    # threads missing the same entry wait for the first one to flatten it
+    with compiling:
+      with self.lock:
+        hit = os.path.exists(meta)
+        if hit:
+          with open(meta) as f:
+            entry = json.load(f)
+          self.hits += 1
+          self.saved += entry["flatten_time"]
+          # mark as recently used
+          os.utime(meta)
+        # the entry is kept until the solver is done with its files
+        self.pins[key] = self.pins.get(key, 0) + 1
+
+      if not hit:
+        start = time.perf_counter()
+        try:
+          with instance.flat(timeout=timeout, optimisation_level=optimisation_level, **OUTPUT_FLAGS) as (tmp_fzn, tmp_ozn, _):
+            shutil.copyfile(tmp_fzn.name, fzn)
+            shutil.copyfile(tmp_ozn.name, ozn)
+        except BaseException:
+          self.release(key)
+          raise
+        entry = {"model": model, "solver": solver.id, "flatten_time": time.perf_counter() - start}
+
+        with self.lock:
+          self.misses += 1
+          # metadata is written last, an entry is valid only once its files are complete
+          with open(meta, "w") as f:
+            json.dump(entry, f)
+        self.evict()
+
+    return FlatInstance(solver, instance, fzn, ozn, release=lambda: self.release(key))
+
+  def release(self, key: str):
+    """
+    Allow an entry to be evicted once no solver reads its files
+
+    Args:
+        key (str): Key of the entry
+    """
+    with self.lock:
+      self.pins[key] -= 1
+      if self.pins[key] == 0:
+        del self.pins[key]
+
+  def evict(self):
+    """
+    Remove least recently used entries exceeding max_entries, entries in use are kept
+    """
+    with self.lock:
+      keys = [f[:-len(".json")] for f in os.listdir(self.directory) if f.endswith(".json")]
+      keys.sort(key=lambda k: os.path.getmtime(self._entry(k)[2]), reverse=True)
+
+      for key in keys[self.max_entries:]:
+        if key in self.pins:
+          continue
+        for f in self._entry(key):
+          if os.path.exists(f):
+            os.remove(f)
+
+  def report(self) -> str:
+    """
+    Returns:
+        str: Hits, misses and flattening time saved
+    """
+    return "FlatZinc cache: %d hits, %d misses, %.2fs flattening saved" % (self.hits, self.misses, self.saved)
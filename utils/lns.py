@@ -0,0 +1,246 @@
+"""
+Large-neighborhood search.
+
+Starting from a shelf packing, a neighborhood of circuits is freed while every other circuit
+is fixed where it is, and the subproblem is solved by one of the exact backends under a short
+time limit. A move is accepted only if it does not increase the height.
+"""
+from typing import Dict, Union, List, Tuple, Optional, Any, Callable
+from multiprocessing import Pool, TimeoutError
+from datetime import timedelta
+import random
+import tempfile
+from utils.budget import Budget, Status, minizinc_status
+from utils.solution_cache import validate
+from utils.determine_hbound import shelf_packing
+
+NEIGHBORHOODS = ["window", "top", "random"]
+
+def packing_height(data: Dict[str, Union[int, List[int]]], y: List[int]) -> int:
+  """
+  Returns:
+      int: Height reached by the highest circuit
+  """
+  return max(y[c] + data["cheight"][c] for c in range(data["N"]))
+
+def neighborhood(kind: str, data: Dict[str, Union[int, List[int]]], y: List[int], size: int, rng: random.Random) -> List[int]:
+  """
+  Circuits to free
+
+  Args:
+      kind (str): One of NEIGHBORHOODS.
+        window: circuits closest to a random row of the board,
+        top: circuits reaching highest, the ones setting the height,
+        random: any circuits
+      data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+      y (List[int]): Current circuits y positions
+      size (int): Number of circuits to free
+      rng (random.Random): Random generator
+  Returns:
+      List[int]: Freed circuits
+  """
+  circuits = list(range(data["N"]))
+  size = min(size, data["N"])
+  # ties are broken at random so that repeated neighborhoods differ
+  rng.shuffle(circuits)
+
+  if kind == "window":
+    row = rng.randrange(packing_height(data, y))
+    # distance of the vertical span of each circuit from the row, 0 if it crosses it
+    distance = lambda c: max(0, y[c] - row, row - (y[c] + data["cheight"][c] - 1))
+    return sorted(circuits, key=distance)[:size]
+  elif kind == "top":
+    return sorted(circuits, key=lambda c: y[c] + data["cheight"][c], reverse=True)[:size]
+  elif kind == "random":
+    return circuits[:size]
+  else:
+    raise ValueError(f"Unknown neighborhood {kind}")
+
+class Z3Backend(object):
+  """
+  Subproblems solved by a SAT/SMT model built once for the whole instance, fixed circuits are assumptions of each check
+  """
+  def __init__(self, model, data: Dict[str, Union[int, List[int]]], lower_bound: int, upper_bound: int):
+    """
+    Args:
+        model (type): SatModel or SmtModel class, without rotations
+        data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+        lower_bound (int): Height lower bound
+        upper_bound (int): Height of the starting packing, no subproblem is solved above it
+    """
+    self.model = model(data["WIDTH"], data["cwidth"], data["cheight"], lower_bound, upper_bound, timeout=float("inf"))
+
+  def solve(self, fixed: Dict[int, Tuple[int, int]], height: int, time_limit: float) -> Optional[Tuple[List[int], List[int]]]:
+    """
+    Args:
+        fixed (Dict[int, Tuple[int, int]]): Position of each fixed circuit
+        height (int): Height of the board
+        time_limit (float): Time limit in seconds
+    Returns:
+        Optional[Tuple[List[int], List[int]]]: Circuits positions, None if no packing was found
+    """
+    assumptions = list()
+    for c, (x, y) in fixed.items():
+      assumptions.extend(self.model.fix_position(c, x, y))
+
+    self.model.remaining_time = time_limit
+    self.model.solve(height=height, assumptions=assumptions)
+    return self.model.positions if self.model.status == Status.SAT else None
+
+class MinizincBackend(object):
+  """
+  Subproblems solved by the satisfaction version of a CP model, fixed circuits are constraints of a branch of the instance
+  """
+  def __init__(self, model: str, solver: str, data: Dict[str, Union[int, List[int]]]):
+    """
+    Args:
+        model (str): Path of the .mzn model, without rotations
+        solver (str): Minizinc solver name
+        data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+    """
+    # minizinc is only needed, and only importable with its binary installed, by this backend
+    from minizinc import Instance, Model, Solver
+    from cp import satisfaction_model
+
+    self.directory = tempfile.TemporaryDirectory()
+    self.instance = Instance(Solver.lookup(solver), Model(satisfaction_model(model, self.directory.name)))
+    for k, v in data.items():
+      self.instance[k] = v
+
+  def solve(self, fixed: Dict[int, Tuple[int, int]], height: int, time_limit: float) -> Optional[Tuple[List[int], List[int]]]:
+    """
+    Same as Z3Backend.solve
+    """
+    with self.instance.branch() as child:
+      # circuits are 1-indexed in the models
+      constraints = [f"x[{c + 1}] = {x} /\\ y[{c + 1}] = {y}" for c, (x, y) in fixed.items()]
+      child.add_string("".join(f"constraint {c};\n" for c in constraints + [f"HEIGHT <= {height}"]))
+      result = child.solve(timeout=timedelta(seconds=max(time_limit, 0.001)), optimisation_level=1)
+
+    if minizinc_status(result.status) != Status.SAT:
+      return None
+    return list(result.solution.x), list(result.solution.y)
+
+# backend of the current process, built once by init_worker and reused for every neighborhood
+_backend = None
+
+def init_worker(make_backend: Callable[[], Any]):
+  """
+  Build the backend of a process
+
+  Args:
+      make_backend (Callable[[], Any]): Picklable callable returning a backend
+  """
+  global _backend
+  _backend = make_backend()
+
+def solve_neighborhood(freed: List[int], x: List[int], y: List[int], height: int, time_limit: float) -> Optional[Tuple[List[int], List[int]]]:
+  """
+  Place the freed circuits on a board of given height, the other ones stay where they are
+
+  Args:
+      freed (List[int]): Freed circuits
+      x (List[int]): Current circuits x positions
+      y (List[int]): Current circuits y positions
+      height (int): Height of the board
+      time_limit (float): Time limit in seconds
+  Returns:
+      Optional[Tuple[List[int], List[int]]]: New positions, None if no packing was found
+  """
+  freed = set(freed)
+  fixed = {c: (x[c], y[c]) for c in range(len(x)) if c not in freed}
+  return _backend.solve(fixed, height, time_limit)
+
+def lns(make_backend: Callable[[], Any], data: Dict[str, Union[int, List[int]]], lower_bound: int, budget: Budget,
+        schedule: List[str] = NEIGHBORHOODS, size: int = 8, step_timeout: float = 5, workers: int = 1,
+        seed: int = 0, start: Optional[Tuple[List[int], List[int]]] = None) -> Dict[str, Any]:
+  """
+  Improve a packing until the budget runs out or the height reaches its lower bound.
+  Each round solves one neighborhood per worker, in the order of the schedule, and keeps the lowest packing
+  among the ones no higher than the current one.
+  A round first asks for a packing one row lower and, if none is found, for an equally high one, so that
+  the search can move across packings of the same height.
+
+  Args:
+      make_backend (Callable[[], Any]): Picklable callable building the backend of each worker
+      data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+      lower_bound (int): Height lower bound
+      budget (Budget): Time budget of the instance
+      schedule (List[str], optional): Neighborhoods tried in turn, each one of NEIGHBORHOODS. Defaults to NEIGHBORHOODS.
+      size (int, optional): Number of circuits freed by a neighborhood. Defaults to 8.
+      step_timeout (float, optional): Time limit of each subproblem in seconds. Defaults to 5.
+      workers (int, optional): Neighborhoods solved in parallel by as many processes. Defaults to 1.
+      seed (int, optional): Seed of the neighborhoods. Defaults to 0.
+      start (Optional[Tuple[List[int], List[int]]], optional): Starting positions. Defaults to the shelf packing.
+  Returns:
+      Dict[str, Any]: Best height and positions, status, whether the height is proven optimal,
+      number of rounds and of improving moves
+  """
+  rng = random.Random(seed)
+  x, y = start if start is not None else shelf_packing(data)
+  height = packing_height(data, y)
+  rounds, improvements = 0, 0
+  print(f"Starting from h={height}, lower bound {lower_bound}")
+
+  pool = None
+  if workers > 1:
+    pool = Pool(processes=workers, initializer=init_worker, initargs=(make_backend,))
+  else:
+    with budget.phase("build"):
+      init_worker(make_backend)
+
+  def solve_round(neighborhoods: List[List[int]], target: int) -> Optional[Tuple[List[int], List[int], int]]:
+    time_limit = min(step_timeout, budget.remaining)
+    # circuits fixed above the target make the subproblem trivially infeasible
+    tasks = [n for n in neighborhoods if all(y[c] + data["cheight"][c] <= target for c in set(range(data["N"])) - set(n))]
+    if pool is not None:
+      pending = [pool.apply_async(solve_neighborhood, (n, x, y, target, time_limit)) for n in tasks]
+      results = list()
+      for p in pending:
+        # workers still building their backend when the budget runs out give no result
+        try:
+          results.append(p.get(timeout=budget.remaining))
+        except TimeoutError:
+          results.append(None)
+    else:
+      results = [solve_neighborhood(n, x, y, target, time_limit) for n in tasks]
+
+    moves = [(nx, ny, packing_height(data, ny)) for nx, ny in filter(None, results)]
+    moves = [m for m in moves if validate(data, m[0], m[1], target)]
+    return min(moves, key=lambda m: m[2], default=None)
+
+  try:
+    while height > lower_bound and not budget.expired:
+      neighborhoods = list()
+      for _ in range(workers):
+        kind = schedule[rounds % len(schedule)]
+        neighborhoods.append(neighborhood(kind, data, y, size, rng))
+        rounds += 1
+
+      with budget.phase("solve"):
+        move = solve_round(neighborhoods, height - 1)
+        if move is None and not budget.expired:
+          move = solve_round(neighborhoods, height)
+
+      if move is not None:
+        x, y = move[0], move[1]
+        if move[2] < height:
+          improvements += 1
+          print(f"Round {rounds:4}: h={move[2]} [{budget.elapsed:04f}s]")
+        height = move[2]
+  finally:
+    if pool is not None:
+      # workers may still be building or solving, their results are not needed anymore
+      pool.terminate()
+
+  return {
+    "height": height,
+    "x": x,
+    "y": y,
+    "rotations": None,
+    "status": Status.SAT,
+    # only the area bound can prove a local search optimal
+    "optimal": height == lower_bound,
+    "rounds": rounds,
+    "improvements": improvements
+  }
@@ -0,0 +1,155 @@
+"""
+Memory limit of each instance: models are admitted only if their encoding is expected to fit the limit,
+and building and solving past it end with an out of memory status instead of taking the machine down.
+
+The memory of an encoding is estimated from the number of variables and clauses given by expected_size of the model,
+measured on the SAT models: a z3 context takes about BASE_MB and each variable or clause about BYTES_PER_TERM.
+A model that does not fit is replaced with its FALLBACK, e.g. the SAT models fall back to the branch and bound
+model, and the instance is skipped if no model of the chain fits.
+Admitted models are built and solved in a child process under the limit: z3 does not give back the memory taken
+by a build that ran out of it, the child process does when it ends.
+"""
+from typing import Dict, Any, Optional, Callable
+from contextlib import contextmanager
+import multiprocessing
+import resource
+import z3
+from utils.budget import Status
+
+BASE_MB = 22
+BYTES_PER_TERM = 700
+
+def expected_memory(model, n: int, width: int, height: int) -> float:
+  """
+  Args:
+      model (type): Model class
+      n (int): Number of circuits
+      width (int): Boards width
+      height (int): Height upper bound
+  Returns:
+      float: Memory expected to be taken by the encoding in MB
+  """
+  variables, clauses = model.expected_size(n, width, height)
+  return BASE_MB + (variables + clauses) * BYTES_PER_TERM / 2 ** 20
+
+def admit(model, n: int, width: int, height: int, limit: Optional[float]) -> Optional[type]:
+  """
+  Args:
+      model (type): Model class
+      n (int): Number of circuits
+      width (int): Boards width
+      height (int): Height upper bound
+      limit (Optional[float]): Memory limit in MB, None for no limit
+  Returns:
+      Optional[type]: First model of the fallback chain expected to fit the limit, None if none does
+  """
+  while model is not None and limit is not None and expected_memory(model, n, width, height) > limit:
+    fallback = getattr(model, "FALLBACK", None)
+    print(f"{model.__name__} expected to take {expected_memory(model, n, width, height):.0f}MB, over the {limit:.0f}MB limit"
+          + (f", falling back to {fallback.__name__}" if fallback is not None else ""))
+    model = fallback
+  return model
+
+def address_space() -> int:
+  """
+  Returns:
+      int: Virtual memory of the process in bytes, 0 if it cannot be read
+  """
+  try:
+    with open("/proc/self/status") as f:
+      for line in f:
+        if line.startswith("VmSize:"):
+          return int(line.split()[1]) * 1024
+  except OSError:
+    pass
+  return 0
+
+def out_of_memory(e: Exception) -> bool:
+  """
+  Args:
+      e (Exception): Exception raised building or solving a model
+  Returns:
+      bool: The exception has been raised because memory ran out
+  """
+  return isinstance(e, MemoryError) or (isinstance(e, z3.Z3Exception) and "memory" in str(e))
+
+def oom_result() -> Dict[str, Any]:
+  """
+  Returns:
+      Dict[str, Any]: Result of an instance memory ran out on, with the keys of a search_height result
+  """
+  return {"x": [], "y": [], "rotations": None, "height": None, "status": Status.OOM, "optimal": False}
+
+@contextmanager
+def memory_limit(limit: Optional[float]):
+  """
+  Limits the memory taken from here on. z3 fails cleanly past its memory_max_size, allocations of the
+  process fail past the address space it has plus the limit, since Linux does not enforce a limit on the RSS.
+
+  Args:
+      limit (Optional[float]): Memory limit in MB, None for no limit
+  """
+  if limit is None:
+    yield
+    return
+
+  soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+  z3.set_param("memory_max_size", int(limit))
+  # only z3 is limited if the address space of the process is not known
+  if address_space() > 0:
+    cap = address_space() + int(limit * 2 ** 20)
+    resource.setrlimit(resource.RLIMIT_AS, (cap if hard == resource.RLIM_INFINITY else min(cap, hard), hard))
+  try:
+    yield
+  finally:
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+    z3.set_param("memory_max_size", 0)
+
+def run_limited(fn: Callable[[], Any], limit: Optional[float]) -> Any:
+  """
+  Runs a job under a memory limit, in a child process so that every byte it took is given back when it ends
+
+  Args:
+      fn (Callable[[], Any]): Job, its outcome must be picklable if a limit is given
+      limit (Optional[float]): Memory limit in MB, None to run the job in this process without limit
+  Raises:
+      MemoryError: Memory ran out
+  Returns:
+      Any: Outcome of the job
+  """
+  if limit is None:
+    try:
+      return fn()
+    except Exception as e:
+      if out_of_memory(e):
+        raise MemoryError(str(e)) from e
+      raise
+
+  # the child is forked so that the job needs not be picklable
+  context = multiprocessing.get_context("fork")
+  receiver, sender = context.Pipe(duplex=False)
+
+  def child():
+    try:
+      with memory_limit(limit):
+        sender.send(("ok", fn()))
+    except Exception as e:
+      sender.send(("oom", str(e)) if out_of_memory(e) else ("error", e))
+
+  process = context.Process(target=child)
+  process.start()
+  sender.close()
+  try:
+    kind, value = receiver.recv()
+  except EOFError:
+    kind, value = None, None
+  process.join()
+
+  if kind == "ok":
+    return value
+  elif kind == "error":
+    raise value
+  elif kind == "oom" or process.exitcode < 0:
+    # a child killed by a signal has been taken down by the kernel running out of memory
+    raise MemoryError(value if value is not None else f"job killed by signal {-process.exitcode}")
+  raise RuntimeError(f"job ended with exit code {process.exitcode}")
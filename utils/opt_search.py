@@ -0,0 +1,166 @@
+"""
+Alternative ways of minimizing the height of SMT models, compared with the height probes of utils.search.
+
+* probe - heights tried one at a time in the order of a schedule, see search_height
+* optimize - z3.Optimize minimizing the height of the model
+* linear, binary - OptSMT linear and binary search, same as probe with the linear and binary schedules
+* core - heights tried from the lower bound upwards, the circuits in the unsat core of a failed height raise the
+  lower bound alone
+
+Every mode records a trace of the lower and upper bounds over time, so that modes can be compared per instance,
+and stops once the best height is within the accepted gap of the lower bound.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import z3
+from utils.budget import Budget, Status
+from utils.profile import profile_phase
+from utils.search import search_height, solve_height, within_gap, SCHEDULES
+from utils.compaction import compact
+
+OPT_MODES = ["probe", "optimize", "linear", "binary", "core"]
+
+def core_search(solver, lower_bound: int, upper_bound: int, budget: Budget, profiler=None,
+                assumptions: List = [], gap: Optional[float] = None) -> Dict[str, Any]:
+  """
+  Core-guided search of the minimum height: heights are tried upwards from the lower bound with each circuit kept
+  below the height by its own literal. The unsat core of a failed height names circuits that cannot be packed below it
+  together, the lower bound is then raised by packing those circuits alone, a smaller problem than the whole instance,
+  until they fit. The first height the whole instance fits is optimal, so the gap has no effect.
+
+  Args:
+      solver (SmtModel): Model built for the instance
+      lower_bound (int): Height lower bound
+      upper_bound (int): Height upper bound
+      budget (Budget): Time budget of the instance
+      profiler (Profiler, optional): Profiler of solve and decode phases. Defaults to None.
+      assumptions (List, optional): Constraints holding in every check, e.g. fixed positions. Defaults to [].
+      gap (Optional[float], optional): Relative gap accepted between the best height and the lower bound. Defaults to None.
+  Returns:
+      Dict[str, Any]: Same as search_height
+  """
+  best = {"x": [], "y": [], "rotations": None, "height": None}
+  trace = list()
+  low = lower_bound
+  everyone = list(range(solver.N))
+  # the search stops early when time runs out or a check gives no answer, e.g. memory ran out
+  interrupted = None
+
+  def check(h: int, circuits: List[int]) -> Tuple[Status, Optional[List[int]]]:
+    # packings of some of the circuits are not solutions of the instance
+    status = solve_height(solver, h, budget, best if circuits == everyone else dict(best), profiler=profiler,
+                          assumptions=assumptions, circuits=circuits)
+    if status != Status.UNSAT:
+      return status, None
+    # solvers giving no core leave every circuit to blame, a core without circuits blames the assumptions alone
+    if len(solver.core) == 0:
+      return status, circuits
+    return status, [c for c in circuits if any(l.eq(solver.circuit_literal(c, h)) for l in solver.core)]
+
+  while low <= upper_bound:
+    if budget.expired:
+      interrupted = Status.UNKNOWN
+      break
+
+    status, core = check(low, everyone)
+    if status == Status.SAT:
+      trace.append({"time": budget.elapsed, "lower": low, "upper": best["height"]})
+      break
+    elif status != Status.UNSAT:
+      interrupted = status
+      break
+    elif len(core) == 0:
+      # the assumptions alone have no solution
+      break
+
+    low += 1
+    trace.append({"time": budget.elapsed, "lower": low, "upper": None})
+
+    # circuits of the core cannot be packed below the next heights either until they fit alone
+    if len(core) < solver.N:
+      print(f"\tCore of {len(core)} circuits")
+    while len(core) < solver.N and low <= upper_bound and not budget.expired:
+      status, smaller = check(low, core)
+      if status != Status.UNSAT or len(smaller) == 0:
+        break
+      core = smaller
+      low += 1
+      trace.append({"time": budget.elapsed, "lower": low, "upper": None})
+
+  if best["height"] is not None:
+    return {**best, "status": Status.SAT, "optimal": True, "lower_bound": best["height"], "trace": trace}
+  else:
+    status = interrupted if interrupted is not None else Status.UNSAT
+    return {**best, "height": None, "status": status, "optimal": False, "lower_bound": low, "trace": trace}
+
+def optimize_search(solver, lower_bound: int, upper_bound: int, budget: Budget, profiler=None,
+                    assumptions: List = [], gap: Optional[float] = None) -> Dict[str, Any]:
+  """
+  Minimize the height with z3.Optimize, recording the height of each model found
+
+  Args:
+      solver (SmtModel): Model built for the instance
+      lower_bound (int): Height lower bound
+      upper_bound (int): Height upper bound
+      budget (Budget): Time budget of the instance
+      profiler (Profiler, optional): Profiler of solve and decode phases. Defaults to None.
+      assumptions (List, optional): Constraints holding in the check, e.g. fixed positions. Defaults to [].
+      gap (Optional[float], optional): Relative gap accepted between the best height and the lower bound. Defaults to None.
+  Returns:
+      Dict[str, Any]: Same as search_height
+  """
+  best = {"x": [], "y": [], "rotations": None, "height": None}
+  trace = list()
+
+  def improved(h: int):
+    print(f"SAT\tHeight = {h:3} [after: {budget.elapsed:04f}s]")
+    trace.append({"time": budget.elapsed, "lower": lower_bound, "upper": h})
+    # z3 keeps the last model when interrupted
+    if within_gap(h, lower_bound, gap):
+      z3.main_ctx().interrupt()
+
+  solver.remaining_time = budget.remaining
+  with budget.phase("solve"), profile_phase(profiler, "optimize"):
+    optimal = solver.optimize(assumptions=assumptions, on_height=improved)
+
+  if solver.status != Status.SAT:
+    return {**best, "height": None, "status": solver.status, "optimal": False, "lower_bound": lower_bound, "trace": trace}
+
+  with budget.phase("decode"), profile_phase(profiler, "decode"):
+    x, y = solver.x, solver.y
+    best["rotations"] = solver.rotations if solver.ROTATIONS else None
+  with budget.phase("compact"), profile_phase(profiler, "compact"):
+    best["x"], best["y"], height = compact(solver.cwidth, solver.cheight, x, y, best["rotations"])
+
+  if optimal:
+    trace.append({"time": budget.elapsed, "lower": height, "upper": height})
+  return {**best, "height": height, "status": Status.SAT, "optimal": optimal,
+          "lower_bound": height if optimal else lower_bound, "trace": trace}
+
+def minimize_height(solver, lower_bound: int, upper_bound: int, budget: Budget, mode: str = "probe", profiler=None,
+                    schedule: str = "linear", assumptions: List = [], gap: Optional[float] = None) -> Dict[str, Any]:
+  """
+  Search the minimum height of a model with one of OPT_MODES
+
+  Args:
+      solver (SatModel | SmtModel): Model built for the instance, optimize needs an SmtModel
+      lower_bound (int): Height lower bound
+      upper_bound (int): Height upper bound
+      budget (Budget): Time budget of the instance
+      mode (str, optional): One of OPT_MODES. Defaults to "probe".
+      profiler (Profiler, optional): Profiler of solve and decode phases. Defaults to None.
+      schedule (str, optional): Order in which heights are tried by probe, one of SCHEDULES. Defaults to "linear".
+      assumptions (List, optional): Constraints holding in every check, e.g. fixed positions. Defaults to [].
+      gap (Optional[float], optional): Relative gap accepted between the best height and the lower bound. Defaults to None.
+  Returns:
+      Dict[str, Any]: Same as search_height
+  """
+  if mode == "probe" or mode in SCHEDULES:
+    # linear and binary name the schedule of the probes
+    schedule = schedule if mode == "probe" else mode
+    return search_height(solver, lower_bound, upper_bound, budget, profiler=profiler, schedule=schedule, assumptions=assumptions, gap=gap)
+  elif mode == "optimize":
+    return optimize_search(solver, lower_bound, upper_bound, budget, profiler=profiler, assumptions=assumptions, gap=gap)
+  elif mode == "core":
+    return core_search(solver, lower_bound, upper_bound, budget, profiler=profiler, assumptions=assumptions, gap=gap)
+  else:
+    raise ValueError(f"Unknown optimization mode {mode}")
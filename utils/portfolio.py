@@ -0,0 +1,295 @@
+"""
+Portfolio of diversified copies of a SAT/SMT model.
+
+Each copy is built in its own process with a different random seed and phase selection. Every height
+probe is sent to all of them, the first definitive answer (SAT or UNSAT) is taken and the other copies
+are interrupted, so that an unlucky seed does not decide the solving time.
+"""
+from typing import Dict, Any, List, Tuple
+from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
+import threading
+import weakref
+import time
+import sys
+import z3
+from utils.budget import Status
+
+# phase selections tried by the copies after the first one, which keeps z3 defaults
+PHASE_SELECTIONS = [0, 1, 2, 4, 5, 3]
+SAT_PHASES = ["always_false", "always_true", "random", "caching"]
+
+def diversity(model, k: int) -> Dict[str, Any]:
+  """
+  Parameters of the k-th copy of a model
+
+  Args:
+      model (type): SatModel or SmtModel class
+      k (int): Copy index
+  Returns:
+      Dict[str, Any]: z3 parameters, none for the first copy
+  """
+  if k == 0:
+    return dict()
+
+  params = {"random_seed": k, "phase_selection": PHASE_SELECTIONS[(k - 1) % len(PHASE_SELECTIONS)]}
+  if model.__module__.split(".")[0] == "sat":
+    params["sat.random_seed"] = k
+    params["sat.phase"] = SAT_PHASES[(k - 1) % len(SAT_PHASES)]
+  return params
+
+def _check(solver, height: int, assumptions: List, result: Dict[str, Any]):
+  """
+  Solve a probe and decode its solution, in the thread of a copy
+  """
+  try:
+    solver.solve(height=height, assumptions=assumptions)
+    result["status"] = solver.status
+    if solver.status == Status.SAT:
+      result["solution"] = (solver.x, solver.y, solver.rotations if solver.ROTATIONS else None)
+  except z3.Z3Exception:
+    # interrupted while decoding, another copy has already answered
+    result["status"] = Status.UNKNOWN
+
+def _serve(model, k: int, data: Tuple, conn):
+  """
+  Process of a copy: builds the model and answers probes until it is told to stop.
+  Checks run in a thread so that a cancel message can interrupt them.
+  """
+  sys.setrecursionlimit(3000)
+  solver = model(*data, timeout=float("inf"))
+  solver.configure(diversity(model, k))
+  conn.send(solver.time["init"])
+
+  while True:
+    message = conn.recv()
+    if message[0] == "stop":
+      break
+    elif message[0] == "configure":
+      # copies keep their own seed and phase on top of the given parameters
+      solver.configure({**message[1], **diversity(model, k)})
+    elif message[0] == "solve":
+      _, height, fixed, time_limit = message
+      assumptions = [l for c, x, y in fixed for l in solver.fix_position(c, x, y)]
+      solver.remaining_time = time_limit
+
+      result = dict()
+      check = threading.Thread(target=_check, args=(solver, height, assumptions, result))
+      check.start()
+      while check.is_alive():
+        if conn.poll(0.01) and conn.recv()[0] == "cancel" and check.is_alive():
+          z3.main_ctx().interrupt()
+      check.join()
+
+      conn.send((result["status"], result.get("solution"), solver.time["solve"],
+                 solver.solver_stats[-1]["statistics"] if solver.solver_stats else dict()))
+    # a cancel received after the check ended is ignored
+
+def _shutdown(processes: List[Process], conns: List):
+  """
+  Stop the processes of a portfolio
+  """
+  for conn in conns:
+    try:
+      conn.send(("stop",))
+    except (BrokenPipeError, OSError):
+      pass
+  for p in processes:
+    p.join(timeout=1)
+    if p.is_alive():
+      p.terminate()
+
+class PortfolioModel(object):
+  """
+  Model running K copies of MODEL, with the same interface as the model itself.
+  Subclasses are made by portfolio_model.
+  """
+  MODEL = None
+  K = 1
+  ROTATIONS = False
+
+  @classmethod
+  def expected_size(cls, n: int, width: int, height: int) -> Tuple[int, int]:
+    """
+    Args:
+        n (int): Number of circuits
+        width (int): Boards width
+        height (int): Height upper bound
+    Returns:
+        Tuple[int, int]: Number of variables and clauses of the K copies together
+    """
+    variables, clauses = cls.MODEL.expected_size(n, width, height)
+    return cls.K * variables, cls.K * clauses
+
+  def __init__(self, width: int, cwidth: List[int], cheight: List[int], lb: int, ub: int, timeout: float = 300, stats: bool = False, profiler=None):
+    """Starts a process for each copy and waits for all of them to be built
+
+    Args:
+        width (int): Boards width
+        cwidth (List[int]): Width of each circuit
+        cheight (List[int]): Height of each circuit
+        lb (int): Height lower bound
+        ub (int): Height upper bound
+        timeout (float, optional): Time limit in seconds, building the copies is charged too. Defaults to 300.
+        stats (bool, optional): Unused, constraint families are not collected by the copies. Defaults to False.
+        profiler (Profiler, optional): Unused, copies run in other processes. Defaults to None.
+    """
+    self.N = len(cwidth)
+    self.WIDTH = width
+    self.cwidth = cwidth
+    self.cheight = cheight
+    self.HEIGHT_LB = lb
+    self.HEIGHT_UB = ub
+
+    build_start = time.perf_counter()
+    self.conns, self.processes = list(), list()
+    for k in range(self.K):
+      parent, child = Pipe()
+      p = Process(target=_serve, args=(self.MODEL, k, (width, cwidth, cheight, lb, ub), child), daemon=True)
+      p.start()
+      self.conns.append(parent)
+      self.processes.append(p)
+    # copies are stopped as soon as the portfolio is not used anymore
+    weakref.finalize(self, _shutdown, self.processes, self.conns)
+
+    for conn in self.conns:
+      conn.recv()
+    self.init_time = time.perf_counter() - build_start
+
+    self.status = Status.UNKNOWN
+    self.solution = None
+    self.family_stats = dict()
+    self.solver_stats = list()
+    self.remaining_time = timeout - self.init_time
+    self.solved_time = -1
+    self.setup_time = 0
+
+  def configure(self, params: Dict[str, Any]):
+    """
+    Set z3 parameters of every copy, copies keep their own seed and phase
+
+    Args:
+        params (Dict[str, Any]): Parameter name and value
+    """
+    for conn in self.conns:
+      conn.send(("configure", params))
+
+  def fix_position(self, c: int, x: int, y: int) -> List[Tuple[int, int, int]]:
+    """
+    Fixed position of a circuit, turned into literals of its own model by each copy
+
+    Args:
+        c (int): Circuit index
+        x (int): Left-bottom x position
+        y (int): Left-bottom y position
+    Returns:
+        List[Tuple[int, int, int]]: Fixed position
+    """
+    return [(c, x, y)]
+
+  def solve(self, height: int, assumptions: List[Tuple[int, int, int]] = []):
+    """
+    Solve the model with every copy, the first definitive answer is taken
+
+    Args:
+        height (int): Height of the board
+        assumptions (List[Tuple[int, int, int]], optional): Fixed positions given by fix_position. Defaults to [].
+    """
+    if self.remaining_time <= 0:
+      self.status = Status.UNKNOWN
+      self.solved_time = 0
+      return
+
+    self.solved_time = time.perf_counter()
+    for conn in self.conns:
+      conn.send(("solve", height, list(assumptions), self.remaining_time))
+
+    self.status, winner = Status.UNKNOWN, None
+    pending = list(self.conns)
+    while len(pending) > 0:
+      for conn in wait(pending):
+        pending.remove(conn)
+        status, solution, solve_time, statistics = conn.recv()
+
+        if winner is None and status != Status.UNKNOWN:
+          self.status, winner = status, self.conns.index(conn)
+          self.solution = solution
+          self.solver_stats.append({"height": height, "result": str(status).lower(), "time": solve_time,
+                                    "statistics": {**statistics, "winner": winner}})
+          # the other copies are interrupted, their answers are still read to keep pipes in sync
+          for other in pending:
+            other.send(("cancel",))
+
+    self.solved_time = time.perf_counter() - self.solved_time
+    if winner is None:
+      self.solver_stats.append({"height": height, "result": "unknown", "time": self.solved_time, "statistics": dict()})
+    self.remaining_time -= self.solved_time
+
+  @property
+  def solved(self) -> bool:
+    """
+    Returns:
+        bool: instance has been solved or not
+    """
+    return self.status == Status.SAT
+
+  @property
+  def x(self) -> List[int]:
+    """
+    Returns:
+        List[int]: Rectangles left bottom index x-positions
+    """
+    if not self.solved:
+      raise RuntimeError("Model not solved!")
+    return self.solution[0]
+
+  @property
+  def y(self) -> List[int]:
+    """
+    Returns:
+        List[int]: Rectangles left bottom index y-positions
+    """
+    if not self.solved:
+      raise RuntimeError("Model not solved!")
+    return self.solution[1]
+
+  @property
+  def positions(self) -> Tuple[List[int], List[int]]:
+    """
+    Returns:
+        Tuple[List[int], List[int]]: Rectangles left-bottom x and y positions
+    """
+    return self.x, self.y
+
+  @property
+  def rotations(self) -> List[bool]:
+    """
+    Returns:
+      List[bool]: Wether a circuit has been rotated
+    """
+    if not self.solved:
+      raise RuntimeError("Model not solved!")
+    return self.solution[2]
+
+  @property
+  def time(self) -> Dict:
+    """
+    Returns:
+      Dict: Time taken to build the copies and to solve the last probe
+    """
+    return {
+      "init": self.init_time,
+      "solve": self.solved_time,
+      "setup": self.setup_time
+    }
+
+def portfolio_model(model, k: int) -> type:
+  """
+  Args:
+      model (type): SatModel or SmtModel class
+      k (int): Number of copies
+  Returns:
+      type: Portfolio model class, named after the model e.g. NaiveModelPortfolio4
+  """
+  return type(f"{model.__name__}Portfolio{k}", (PortfolioModel,),
+              {"MODEL": model, "K": k, "ROTATIONS": model.ROTATIONS, "__module__": model.__module__})
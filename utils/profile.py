@@ -0,0 +1,115 @@
+from typing import Dict, Tuple, List, Optional
+from contextlib import contextmanager, nullcontext
+import cProfile
+import pstats
+import os
+
+# deepest stack written in collapsed stack files, recursion would make them explode
+MAX_STACK_DEPTH = 64
+
+def _label(func: Tuple[str, int, str]) -> str:
+  """
+  Label of a function in a collapsed stack
+
+  Args:
+      func (Tuple[str, int, str]): pstats function key (file, line, name)
+  Returns:
+      str: name:file:line without the stack separator
+  """
+  filename, line, name = func
+  return ("%s:%s:%d" % (name, os.path.basename(filename), line)).replace(";", ",").replace(" ", "_")
+
+def collapsed_stacks(stats: pstats.Stats) -> List[str]:
+  """
+  Converts profiling statistics to collapsed stacks (flamegraph.pl / speedscope format).
+  cProfile only records caller-callee edges, stacks are rebuilt walking the call graph from the roots
+  and splitting the time of each function between its callers proportionally.
+
+  Args:
+      stats (pstats.Stats): Profiling statistics
+  Returns:
+      List[str]: Lines formatted as "root;caller;function microseconds"
+  """
+  callees = dict()
+  for func, (_, _, _, _, callers) in stats.stats.items():
+    for caller, edge in callers.items():
+      callees.setdefault(caller, dict())[func] = edge
+
+  totals = dict()
+  roots = [func for func, (_, _, _, _, callers) in stats.stats.items() if len(callers) == 0]
+
+  def visit(func, stack: List[str], on_stack: set, time: float):
+    _, _, tt, ct, _ = stats.stats[func]
+    # fraction of the function cumulative time spent on this path
+    ratio = time / ct if ct > 0 else 0
+    stack = stack + [_label(func)]
+
+    self_time = tt * ratio
+    if self_time > 0:
+      key = ";".join(stack)
+      totals[key] = totals.get(key, 0) + self_time
+
+    if len(stack) >= MAX_STACK_DEPTH:
+      return
+
+    for callee, (_, _, _, edge_ct) in callees.get(func, dict()).items():
+      if callee not in on_stack and edge_ct * ratio > 0:
+        visit(callee, stack, on_stack | {callee}, edge_ct * ratio)
+
+  for root in roots:
+    visit(root, [], {root}, stats.stats[root][3])
+
+  return ["%s %d" % (stack, round(t * 1e6)) for stack, t in totals.items() if round(t * 1e6) > 0]
+
+class Profiler(object):
+  """
+  Profiles execution phases separately.
+  Each phase is written to <directory>/<phase>.pstats and <directory>/<phase>.collapsed
+  """
+  def __init__(self, directory: str):
+    """
+    Args:
+        directory (str): Directory where profiles are written
+    """
+    self.directory = directory
+    os.makedirs(directory, exist_ok=True)
+
+  @contextmanager
+  def phase(self, name: str):
+    """
+    Profile the code executed in the context
+
+    Args:
+        name (str): Name of the phase, used as file name
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+      yield
+    finally:
+      profile.disable()
+      self.dump(name, profile)
+
+  def dump(self, name: str, profile: cProfile.Profile):
+    """
+    Write pstats and collapsed stack files of a phase
+
+    Args:
+        name (str): Name of the phase
+        profile (cProfile.Profile): Profile of the phase
+    """
+    path = os.path.join(self.directory, name)
+    profile.dump_stats(path + ".pstats")
+
+    with open(path + ".collapsed", "w") as f:
+      f.write("\n".join(collapsed_stacks(pstats.Stats(profile))) + "\n")
+
+def profile_phase(profiler: Optional[Profiler], name: str):
+  """
+  Context profiling a phase, it does nothing if profiling is disabled
+
+  Args:
+      profiler (Optional[Profiler]): Profiler in use, None when profiling is disabled
+      name (str): Name of the phase
+  """
+  return nullcontext() if profiler is None else profiler.phase(name)
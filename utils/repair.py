@@ -0,0 +1,144 @@
+from typing import Dict, Union, List, Any, Optional
+from utils.budget import Budget, Status
+from utils.search import search_height, within_gap
+from utils.determine_hbound import greedy_height
+import os
+
+def read_solution(path: str) -> Dict[str, Union[int, List[int]]]:
+  """
+  Reads a solution written by save_solution
+
+  Args:
+      path (str): Solution file
+  Returns:
+      Dict[str, Union[int, List[int]]]: WIDTH, height, N and dimensions and positions of each circuit
+  """
+  with open(path) as f:
+    lines = [l.split() for l in f.read().splitlines() if l.strip() != ""]
+
+  width, height = map(int, lines[0])
+  circuits = [list(map(int, l)) for l in lines[2:]]
+
+  return {
+    "WIDTH": width,
+    "height": height,
+    "N": int(lines[1][0]),
+    "cwidth": [c[0] for c in circuits],
+    "cheight": [c[1] for c in circuits],
+    "x": [c[2] for c in circuits],
+    "y": [c[3] for c in circuits]
+  }
+
+def previous_solution(path: str, instance_num: str) -> Optional[Dict[str, Union[int, List[int]]]]:
+  """
+  Previous solution of an instance
+
+  Args:
+      path (str): Solution file, or directory of solutions named ins-N.txt as written by --output
+      instance_num (str): Number of the instance
+  Returns:
+      Optional[Dict[str, Union[int, List[int]]]]: Solution, None if there is no solution for the instance
+  """
+  if os.path.isdir(path):
+    path = os.path.join(path, f"ins-{instance_num}.txt")
+
+  return read_solution(path) if os.path.isfile(path) else None
+
+def match_circuits(previous: Dict[str, Union[int, List[int]]], data: Dict[str, Union[int, List[int]]]) -> Dict[int, int]:
+  """
+  Matches circuits of the edited instance with circuits of the previous solution having the same dimensions.
+  Circuits left unmatched have been added or resized.
+
+  Args:
+      previous (Dict[str, Union[int, List[int]]]): Previous solution
+      data (Dict[str, Union[int, List[int]]]): Edited instance
+  Returns:
+      Dict[int, int]: Circuit of the previous solution of each matched circuit
+  """
+  available = dict()
+  for p, dims in enumerate(zip(previous["cwidth"], previous["cheight"])):
+    available.setdefault(dims, []).append(p)
+
+  matched = dict()
+  for c, dims in enumerate(zip(data["cwidth"], data["cheight"])):
+    if len(available.get(dims, [])) > 0:
+      matched[c] = available[dims].pop(0)
+
+  return matched
+
+def repair_upper_bound(previous: Dict[str, Union[int, List[int]]], data: Dict[str, Union[int, List[int]]],
+                       matched: Dict[int, int]) -> Optional[int]:
+  """
+  Height of a packing keeping matched circuits where they were and stacking the other ones on top in shelves
+
+  Args:
+      previous (Dict[str, Union[int, List[int]]]): Previous solution
+      data (Dict[str, Union[int, List[int]]]): Edited instance
+      matched (Dict[int, int]): Circuit of the previous solution of each matched circuit
+  Returns:
+      Optional[int]: Height of the packing, None if matched circuits do not fit the board anymore
+  """
+  for c, p in matched.items():
+    if previous["x"][p] + data["cwidth"][c] > data["WIDTH"]:
+      return None
+
+  kept = max([previous["y"][p] + data["cheight"][c] for c, p in matched.items()], default=0)
+  others = [c for c in range(data["N"]) if c not in matched]
+  if len(others) == 0:
+    return kept
+
+  if max(data["cwidth"][c] for c in others) > data["WIDTH"]:
+    return None
+
+  # same shelf packing as the drivers upper bound
+  others = sorted(others, key=lambda c: data["cheight"][c], reverse=True)
+  return kept + greedy_height(len(others), data["WIDTH"], [data["cwidth"][c] for c in others], [data["cheight"][c] for c in others])
+
+def repair(solver, previous: Dict[str, Union[int, List[int]]], matched: Dict[int, int], lower_bound: int,
+           upper_bound: int, budget: Budget, profiler=None, schedule: str = "linear", gap: Optional[float] = None) -> Dict[str, Any]:
+  """
+  Solves an edited instance starting from the solution of the previous one.
+  Matched circuits are first fixed where they were, as assumptions of every check, and only the other circuits are placed.
+  The full model is then searched below the repaired height, to improve it or to prove it optimal, while time is left.
+
+  Args:
+      solver (SatModel | SmtModel): Model built for the edited instance
+      previous (Dict[str, Union[int, List[int]]]): Previous solution
+      matched (Dict[int, int]): Circuit of the previous solution of each matched circuit
+      lower_bound (int): Height lower bound
+      upper_bound (int): Height upper bound
+      budget (Budget): Time budget of the instance
+      profiler (Profiler, optional): Profiler of solve and decode phases. Defaults to None.
+      schedule (str, optional): Order in which heights are tried. Defaults to "linear".
+      gap (Optional[float], optional): Relative gap accepted between the best height and the lower bound. Defaults to None.
+  Returns:
+      Dict[str, Any]: Same as search_height, with whether the local repair found the returned solution
+  """
+  fixings = list()
+  for c, p in matched.items():
+    fixings.extend(solver.fix_position(c, previous["x"][p], previous["y"][p]))
+
+  print(f"Repairing with {len(matched)} of {solver.N} circuits fixed")
+  repaired = search_height(solver, lower_bound, upper_bound, budget, profiler=profiler, schedule=schedule, assumptions=fixings, gap=gap)
+
+  if repaired["height"] is not None and repaired["height"] == lower_bound:
+    return {**repaired, "optimal": True, "repaired": True}
+  # fixings may exclude lower heights, only the area bound holds for the full model
+  if repaired["height"] is not None and within_gap(repaired["height"], lower_bound, gap):
+    return {**repaired, "optimal": False, "lower_bound": lower_bound, "repaired": True}
+
+  # fixings may exclude lower heights, the repaired solution is optimal only if the full model proves it
+  below = repaired["height"] - 1 if repaired["height"] is not None else upper_bound
+  if below < lower_bound or budget.expired:
+    return {**repaired, "optimal": False, "lower_bound": lower_bound, "repaired": repaired["height"] is not None}
+
+  print("Falling back to a full solve" + (f" below h={repaired['height']}" if repaired["height"] is not None else ""))
+  full = search_height(solver, lower_bound, below, budget, profiler=profiler, schedule=schedule, gap=gap)
+
+  if full["height"] is not None:
+    return {**full, "repaired": False}
+  elif repaired["height"] is not None:
+    # no solution below the repaired height means it is optimal, the full model alone bounds it from below
+    return {**repaired, "optimal": full["status"] == Status.UNSAT, "lower_bound": full["lower_bound"], "repaired": True}
+  else:
+    return {**full, "repaired": False}
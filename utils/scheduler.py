@@ -0,0 +1,179 @@
+from typing import Tuple, Dict, List, Any, Callable, Hashable
+from concurrent.futures import Executor, wait, FIRST_COMPLETED
+import os
+import time
+from utils.selector import ModelSelector
+from utils.store import load_instance
+
+def available_cores() -> int:
+  """
+  Returns:
+      int: Number of cores the process is allowed to run on
+  """
+  if hasattr(os, "sched_getaffinity"):
+    return len(os.sched_getaffinity(0))
+  return os.cpu_count() or 1
+
+def plan_cores(cores: int, jobs: int, threads: int, parallel_solver: bool) -> Tuple[int, int]:
+  """
+  Splits cores between instances solved at the same time (workers) and threads of each solver,
+  workers * threads never exceeds the available cores.
+
+  Args:
+      cores (int): Cores that can be used
+      jobs (int): Number of instances that can be solved at the same time
+      threads (int): Threads requested for each solver, 0 gives each solver the cores left by the workers
+      parallel_solver (bool): Solver supports parallel search
+  Returns:
+      Tuple[int, int]: Number of workers and threads of each solver
+  """
+  cores = max(1, cores)
+  jobs = max(1, jobs)
+
+  if not parallel_solver:
+    threads = 1
+  elif threads <= 0:
+    # instances are parallelized first, cores left are split among their solvers
+    threads = max(1, cores // min(jobs, cores))
+
+  threads = min(threads, cores)
+  workers = max(1, min(jobs, cores // threads))
+  return workers, threads
+
+def expected_runtimes(backend: str, jobs: List[Tuple[str, str]], directory: str, timeout: float) -> Dict[Tuple[str, str], float]:
+  """
+  Args:
+      backend (str): One of utils.selector.BACKENDS
+      jobs (List[Tuple[str, str]]): Model and path of the instance of each job
+      directory (str): Directory with the result csv files of each backend
+      timeout (float): Time limit of each job
+  Returns:
+      Dict[Tuple[str, str], float]: Runtime expected of each job from past results,
+      number of circuits if there are none so that larger instances still go first
+  """
+  try:
+    selector = ModelSelector(directory, backend, timeout=timeout)
+  except ValueError:
+    return {(m, i): float(load_instance(i)["N"]) for m, i in jobs}
+  return {(m, i): selector.runtime(m, i) for m, i in jobs}
+
+class LptScheduler(object):
+  """
+  Longest processing time first: the job expected to run longest is dispatched first, so that the shortest jobs
+  fill the workers at the end of the sweep instead of a long one running alone.
+  Expected runtimes of a group of jobs, e.g. of a model, are corrected online by the ratio between the runtime
+  and the expected runtime of its finished jobs.
+  """
+
+  def __init__(self, estimates: Dict[Hashable, float], group: Callable[[Hashable], Hashable] = lambda job: None):
+    """
+    Args:
+        estimates (Dict[Hashable, float]): Expected runtime of each job
+        group (Callable[[Hashable], Hashable], optional): Group of a job, corrected together. Defaults to a single group.
+    """
+    self.estimates = dict(estimates)
+    self.group = group
+    self.pending = list(estimates.keys())
+
+    # runtime and expected runtime of the finished jobs of each group
+    self.observed: Dict[Hashable, List[float]] = dict()
+    self.runtimes: Dict[Hashable, float] = dict()
+    self.makespan = 0
+    self.workers = 1
+
+  def correction(self, job: Hashable) -> float:
+    """
+    Args:
+        job (Hashable): Job
+    Returns:
+        float: Ratio between runtimes and expected runtimes of the finished jobs of its group, 1 if none has finished
+    """
+    runtime, expected = self.observed.get(self.group(job), [0, 0])
+    return runtime / expected if expected > 0 else 1
+
+  def expected(self, job: Hashable) -> float:
+    """
+    Args:
+        job (Hashable): Job
+    Returns:
+        float: Expected runtime, corrected by the jobs of its group finished so far
+    """
+    return self.estimates[job] * self.correction(job)
+
+  def next(self) -> Hashable:
+    """
+    Returns:
+        Hashable: Pending job expected to run longest, removed from the pending ones
+    """
+    job = max(self.pending, key=self.expected)
+    self.pending.remove(job)
+    return job
+
+  def done(self, job: Hashable, runtime: float):
+    """
+    Args:
+        job (Hashable): Finished job
+        runtime (float): Time it took in seconds
+    """
+    self.runtimes[job] = runtime
+    observed = self.observed.setdefault(self.group(job), [0, 0])
+    observed[0] += runtime
+    observed[1] += self.estimates[job]
+
+  @property
+  def utilization(self) -> float:
+    """
+    Returns:
+        float: Time the workers spent on jobs over the time they have been available
+    """
+    return sum(self.runtimes.values()) / (self.workers * self.makespan) if self.makespan > 0 else 0
+
+  def report(self) -> str:
+    """
+    Returns:
+        str: Makespan and utilization of the workers
+    """
+    return (f"{len(self.runtimes)} job(s) on {self.workers} worker(s) in {self.makespan:04f}s, "
+            f"busy {sum(self.runtimes.values()):04f}s, utilization {self.utilization:.1%}")
+
+def timed(fn: Callable[..., Any], job: Tuple) -> Tuple[Any, float]:
+  """
+  Args:
+      fn (Callable[..., Any]): Function running a job, given the job unpacked
+      job (Tuple): Job
+  Returns:
+      Tuple[Any, float]: Outcome of the job and time it took in seconds
+  """
+  start = time.perf_counter()
+  return fn(*job), time.perf_counter() - start
+
+def run_jobs(pool: Executor, fn: Callable[..., Any], scheduler: LptScheduler, workers: int) -> Dict[Hashable, Any]:
+  """
+  Runs the jobs of a scheduler, a job is handed to the pool only when a worker is free so that
+  each dispatch uses the estimates corrected by the jobs finished so far
+
+  Args:
+      pool (Executor): Thread or process pool, fn must be picklable for a process pool
+      fn (Callable[..., Any]): Function running a job, given the job unpacked
+      scheduler (LptScheduler): Scheduler of the jobs
+      workers (int): Jobs run at the same time
+  Returns:
+      Dict[Hashable, Any]: Outcome of each job
+  """
+  scheduler.workers = workers
+  results, running = dict(), dict()
+  start = time.perf_counter()
+
+  while len(scheduler.pending) > 0 or len(running) > 0:
+    while len(scheduler.pending) > 0 and len(running) < workers:
+      job = scheduler.next()
+      running[pool.submit(timed, fn, job)] = job
+
+    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+    for future in finished:
+      job = running.pop(future)
+      results[job], runtime = future.result()
+      scheduler.done(job, runtime)
+
+  scheduler.makespan = time.perf_counter() - start
+  return results
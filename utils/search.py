@@ -0,0 +1,190 @@
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from utils.budget import Budget, Status
+from utils.profile import profile_phase
+from utils.compaction import compact
+
+# order in which heights are tried:
+# linear goes from the upper bound downwards, binary halves the interval of candidate heights
+SCHEDULES = ["linear", "binary"]
+
+def next_height(schedule: str, low: int, high: int) -> int:
+  """
+  Next height to try among the candidate heights
+
+  Args:
+      schedule (str): One of SCHEDULES
+      low (int): Lowest candidate height
+      high (int): Highest candidate height
+  Returns:
+      int: Height to try
+  """
+  if schedule == "linear":
+    return high
+  elif schedule == "binary":
+    return (low + high) // 2
+  else:
+    raise ValueError(f"Unknown height schedule {schedule}")
+
+def within_gap(height: int, lower_bound: int, gap: Optional[float]) -> bool:
+  """
+  Args:
+      height (int): Height of a solution
+      lower_bound (int): Height lower bound
+      gap (Optional[float]): Relative gap accepted between the height and the lower bound, None to accept none
+  Returns:
+      bool: (height - lower_bound) / lower_bound is within the gap
+  """
+  if gap is None:
+    return False
+  return height - lower_bound <= gap * lower_bound
+
+def result_quality(height: Optional[int], optimal: bool, lower_bound: int, gap: Optional[float]) -> str:
+  """
+  Args:
+      height (Optional[int]): Best height found, None if no solution has been found
+      optimal (bool): The height is proven optimal
+      lower_bound (int): Best lower bound proven by the search
+      gap (Optional[float]): Relative gap accepted, None to accept none
+  Returns:
+      str: optimal, gap if the height is within the gap of the lower bound, feasible if it is only a solution, none otherwise
+  """
+  if height is None:
+    return "none"
+  elif optimal:
+    return "optimal"
+  elif within_gap(height, lower_bound, gap):
+    return "gap"
+  else:
+    return "feasible"
+
+def schedule_heights(probe: Callable[[int], Tuple[Status, Optional[int]]], lower_bound: int, upper_bound: int, budget: Budget,
+                     schedule: str = "linear", gap: Optional[float] = None) -> Dict[str, Any]:
+  """
+  Search the minimum height trying heights in the order given by a schedule.
+  A height is satisfiable only if every higher one is, so after a SAT probe only lower heights
+  are candidates and after an UNSAT probe only higher ones are.
+  A SAT probe may find a solution lower than the height tried, every height in between is skipped.
+  The search stops early once the best height is within the gap of the lowest candidate height.
+
+  Args:
+      probe (Callable[[int], Tuple[Status, Optional[int]]]): Solves the instance with a given height,
+        returns the outcome and the height used by the solution found
+      lower_bound (int): Height lower bound
+      upper_bound (int): Height upper bound
+      budget (Budget): Time budget of the instance
+      schedule (str, optional): One of SCHEDULES. Defaults to "linear".
+      gap (Optional[float], optional): Relative gap accepted between the best height and the lower bound. Defaults to None.
+  Returns:
+      Dict[str, Any]: Best height found, status of the search, whether the height is proven optimal
+      and lower bound proven by the search
+  """
+  low, high = lower_bound, upper_bound
+  best = None
+  # search stops early when time runs out or a probe gives no answer, e.g. memory ran out
+  interrupted = None
+
+  while low <= high:
+    if budget.expired:
+      interrupted = Status.UNKNOWN
+      break
+    if best is not None and within_gap(best, low, gap):
+      break
+
+    h = next_height(schedule, low, high)
+    status, found = probe(h)
+
+    if status == Status.SAT:
+      best = min(h, found) if found is not None else h
+      high = best - 1
+    elif status == Status.UNSAT:
+      low = h + 1
+    else:
+      interrupted = status
+      break
+
+  if best is not None:
+    # the height is optimal once every height below it has been excluded
+    return {"height": best, "status": Status.SAT, "optimal": low > high, "lower_bound": low}
+  else:
+    return {"height": None, "status": interrupted if interrupted is not None else Status.UNSAT, "optimal": False, "lower_bound": low}
+
+def solve_height(solver, h: int, budget: Budget, best: Dict[str, Any], profiler=None, assumptions: List = [],
+                 circuits: Optional[List[int]] = None) -> Status:
+  """
+  Solve a SAT/SMT model with a given height, decoding the solution into best if one is found.
+  The solution is compacted, best holds its positions and the height they use.
+
+  Args:
+      solver (SatModel | SmtModel): Model built for the instance
+      h (int): Height to try
+      budget (Budget): Time budget of the instance
+      best (Dict[str, Any]): Positions, rotations and height of the best solution, updated in place
+      profiler (Profiler, optional): Profiler of solve and decode phases. Defaults to None.
+      assumptions (List, optional): Constraints holding in the check, e.g. fixed positions. Defaults to [].
+      circuits (Optional[List[int]], optional): Circuits kept below the height by an SmtModel, see SmtModel.solve.
+        Defaults to None, bounding the height of the board.
+  Returns:
+      Status: Outcome of the check
+  """
+  # every probe gets the time left in the instance budget
+  solver.remaining_time = budget.remaining
+
+  with budget.phase("solve"), profile_phase(profiler, f"solve_{h}"):
+    if circuits is None:
+      solver.solve(height=h, assumptions=assumptions)
+    else:
+      solver.solve(height=h, assumptions=assumptions, circuits=circuits)
+
+  print(f"{solver.status}\tHeight = {h:3} [solving: {solver.time['solve']:04f}s setup: {solver.time['setup']:04f}s]")
+
+  if solver.status == Status.SAT:
+    with budget.phase("decode"), profile_phase(profiler, f"decode_{h}"):
+      x, y = solver.x, solver.y
+      best["rotations"] = solver.rotations if solver.ROTATIONS else None
+    with budget.phase("compact"), profile_phase(profiler, f"compact_{h}"):
+      best["x"], best["y"], best["height"] = compact(solver.cwidth, solver.cheight, x, y, best["rotations"])
+
+    if best["height"] < h:
+      print(f"\tCompacted to height = {best['height']:3}")
+
+  return solver.status
+
+def search_height(solver, lower_bound: int, upper_bound: int, budget: Budget, profiler=None,
+                  schedule: str = "linear", assumptions: List = [], gap: Optional[float] = None) -> Dict[str, Any]:
+  """
+  Search the minimum height of a SAT/SMT model until the candidate heights are exhausted
+  or the budget runs out.
+
+  Args:
+      solver (SatModel | SmtModel): Model built for the instance
+      lower_bound (int): Height lower bound
+      upper_bound (int): Height upper bound
+      budget (Budget): Time budget of the instance
+      profiler (Profiler, optional): Profiler of solve and decode phases. Defaults to None.
+      schedule (str, optional): Order in which heights are tried, one of SCHEDULES. Defaults to "linear".
+      assumptions (List, optional): Constraints holding in every probe, e.g. fixed positions. Defaults to [].
+      gap (Optional[float], optional): Relative gap accepted between the best height and the lower bound. Defaults to None.
+  Returns:
+      Dict[str, Any]: Best height with positions and rotations, status of the search
+      (SAT: solution found, UNSAT: no solution within bounds, UNKNOWN: no solution within budget),
+      whether the height is proven optimal, lower bound proven by the search and trace of the bounds over time
+  """
+  best = {"x": [], "y": [], "rotations": None, "height": None}
+  trace = list()
+  bounds = {"lower": lower_bound, "upper": None}
+
+  def probe(h: int) -> Status:
+    status = solve_height(solver, h, budget, best, profiler=profiler, assumptions=assumptions)
+
+    # heights are proven feasible or infeasible one probe at a time
+    if status == Status.SAT:
+      bounds["upper"] = best["height"]
+    elif status == Status.UNSAT:
+      bounds["lower"] = max(bounds["lower"], h + 1)
+    if status in (Status.SAT, Status.UNSAT):
+      trace.append({"time": budget.elapsed, **bounds})
+
+    return status, best["height"] if status == Status.SAT else None
+
+  result = schedule_heights(probe, lower_bound, upper_bound, budget, schedule=schedule, gap=gap)
+  return {**best, **result, "trace": trace}
@@ -0,0 +1,86 @@
+from typing import Dict, List, Union
+from itertools import product
+import re
+
+# same order as the annotation arrays of cp/configurable_search.mzn
+VAR_HEURISTICS = ["input_order", "first_fail", "anti_first_fail", "smallest", "largest",
+                  "occurrence", "most_constrained", "max_regret", "dom_w_deg"]
+VAL_CHOICES = ["indomain_min", "indomain_max", "indomain_median", "indomain_random",
+               "indomain_split", "indomain_reverse_split"]
+RESTARTS = ["none", "luby", "geometric"]
+
+# annotations each solver honours, the others are ignored by its FlatZinc interface which falls back to its default search.
+# gecode implements every annotation above. chuffed has no dom_w_deg, occurrence, most_constrained,
+# indomain_median and indomain_random, and takes its restart policy from command line flags instead of annotations
+SOLVER_STRATEGIES = {
+  "gecode": {"var_heuristic": VAR_HEURISTICS, "val_choice": VAL_CHOICES, "restart": RESTARTS},
+  "chuffed": {"var_heuristic": ["input_order", "first_fail", "anti_first_fail", "smallest", "largest", "max_regret"],
+              "val_choice": ["indomain_min", "indomain_max", "indomain_split", "indomain_reverse_split"],
+              "restart": ["none"]}
+}
+
+# parameters a model declares to have its search strategy chosen from the command line
+PARAMETERS = ["var_heuristic", "val_choice", "restart", "restart_scale", "restart_base"]
+
+def declares_search(path: str) -> bool:
+  """
+  Args:
+      path (str): Path of the .mzn model
+  Returns:
+      bool: The model takes its search strategy as data
+  """
+  with open(path) as f:
+    text = f.read()
+
+  return all(re.search(r"\b(int|float)\s*:\s*%s\s*;" % p, text) is not None for p in PARAMETERS)
+
+def search_data(var_heuristic: str, val_choice: str, restart: str, restart_scale: int = 100,
+                restart_base: float = 1.5) -> Dict[str, Union[int, float]]:
+  """
+  Data selecting a search strategy in a model declaring PARAMETERS
+
+  Args:
+      var_heuristic (str): Variable selection, one of VAR_HEURISTICS
+      val_choice (str): Value choice, one of VAL_CHOICES
+      restart (str): Restart policy, one of RESTARTS
+      restart_scale (int, optional): Restart limit scale. Defaults to 100.
+      restart_base (float, optional): Growth of geometric restarts. Defaults to 1.5.
+  Returns:
+      Dict[str, Union[int, float]]: Parameter name and value, strategies are 1-based indices
+  """
+  return {
+    "var_heuristic": VAR_HEURISTICS.index(var_heuristic) + 1,
+    "val_choice": VAL_CHOICES.index(val_choice) + 1,
+    "restart": RESTARTS.index(restart) + 1,
+    "restart_scale": restart_scale,
+    "restart_base": float(restart_base)
+  }
+
+def unsupported(solver: str, var_heuristic: str, val_choice: str, restart: str) -> List[str]:
+  """
+  Args:
+      solver (str): Solver name, one of SOLVER_STRATEGIES
+      var_heuristic (str): Variable selection, one of VAR_HEURISTICS
+      val_choice (str): Value choice, one of VAL_CHOICES
+      restart (str): Restart policy, one of RESTARTS
+  Returns:
+      List[str]: Choices the solver does not honour, empty if it follows the whole strategy
+  """
+  choices = {"var_heuristic": var_heuristic, "val_choice": val_choice, "restart": restart}
+  return [v for k, v in choices.items() if v not in SOLVER_STRATEGIES[solver][k]]
+
+def strategy_name(var_heuristic: str, val_choice: str, restart: str) -> str:
+  """
+  Returns:
+      str: Name of a search strategy e.g. first_fail/indomain_min/luby
+  """
+  return "/".join([var_heuristic, val_choice, restart])
+
+def strategies(var_heuristics: List[str], val_choices: List[str], restarts: List[str]) -> List[List[str]]:
+  """
+  Every combination of variable selection, value choice and restart policy
+
+  Returns:
+      List[List[str]]: Combinations as [var_heuristic, val_choice, restart]
+  """
+  return [list(s) for s in product(var_heuristics, val_choices, restarts)]
@@ -0,0 +1,281 @@
+"""
+Model selection from past results: the model run on an instance is the one that did best on the most similar
+instances solved before.
+
+Past results are the csv files written by the drivers, one directory per backend e.g. csv/sat/NaiveModel.csv or
+csv/cp/rotations.csv. Each run is scored by PAR2: solving time if the instance has been solved within the timeout,
+twice the timeout otherwise. Instances are compared by cheap features computed without solving them, the k nearest
+ones pick the model with the lowest mean PAR2. Only models of the same problem variant compete, either the models
+rotating circuits or the ones that do not.
+
+usage: python -m utils.selector [-i INSTANCES ...] [--backends BACKEND ...] [--history HISTORY] [-t TIMEOUT] [-k K]
+                                [--rotations]
+"""
+from typing import Dict, Any, List, Optional
+from importlib import import_module
+from glob import glob
+import argparse
+import csv
+import os
+import re
+import numpy as np
+from natsort import natsorted
+from utils.store import expand_instances, load_instance
+from utils.determine_hbound import height_bounds
+
+BACKENDS = ["cp", "sat", "smt"]
+# files written next to the results of each model
+STATISTICS = [".families.csv", ".solver.csv", ".trace.csv"]
+
+def instance_features(data: Dict[str, Any]) -> Dict[str, float]:
+  """
+  Args:
+      data (Dict[str, Any]): Instance
+  Returns:
+      Dict[str, float]: Number of circuits, board width, area of the circuits over area of the greedy packing,
+      circuits wider than half the board, circuits taller than half the lower bound, circuits with the same
+      dimensions as another one and gap between the height bounds
+  """
+  lower_bound, upper_bound = height_bounds(data, data["WIDTH"])
+  area = sum(w * h for w, h in zip(data["cwidth"], data["cheight"]))
+
+  return {
+    "N": data["N"],
+    "width": data["WIDTH"],
+    "area_ratio": area / (data["WIDTH"] * upper_bound),
+    "wide": sum(w > data["WIDTH"] / 2 for w in data["cwidth"]),
+    "tall": sum(h > lower_bound / 2 for h in data["cheight"]),
+    "identical": data["N"] - len(set(zip(data["cwidth"], data["cheight"]))),
+    "gap": (upper_bound - lower_bound) / lower_bound
+  }
+
+def model_name(backend: str, path: str) -> Optional[str]:
+  """
+  Args:
+      backend (str): One of BACKENDS
+      path (str): Result csv file
+  Returns:
+      Optional[str]: Model as given to the driver of the backend, None if the file holds statistics
+  """
+  if any(path.endswith(s) for s in STATISTICS):
+    return None
+  name = os.path.basename(path)[:-len(".csv")]
+  if backend == "cp":
+    return f"cp/{name[:-len('.mzn')] if name.endswith('.mzn') else name}.mzn"
+  return name
+
+def model_rotations(backend: str, name: str) -> Optional[bool]:
+  """
+  Args:
+      backend (str): One of BACKENDS
+      name (str): Model as given to the driver of the backend
+  Returns:
+      Optional[bool]: Whether the model rotates circuits, None if the backend has no such model
+  """
+  if backend == "cp":
+    if not os.path.isfile(name):
+      return None
+    # same test as cp.allows_rotation: rotating models output the rotation of each circuit
+    with open(name) as f:
+      return re.search(r"\brotated\b", f.read()) is not None
+
+  model = getattr(import_module(backend), name, None)
+  return model.ROTATIONS if isinstance(model, type) else None
+
+def read_results(path: str, timeout: float, model: Optional[str] = None) -> Dict[int, float]:
+  """
+  Args:
+      path (str): Result csv file
+      timeout (float): Time limit the runs are scored with
+      model (Optional[str], optional): Model of the file, runs of another model are left out. Defaults to None.
+  Returns:
+      Dict[int, float]: PAR2 score of each instance number
+  """
+  scores = dict()
+  with open(path) as f:
+    for row in csv.DictReader(f):
+      # a fallback run instead of the model of the file, e.g. under a memory limit, says nothing of the model
+      if model is not None and row.get("model") not in (None, "", model):
+        continue
+      t = float(row["time"] if "time" in row else row["total_time"])
+      # older results have no optimal column, runs reaching the timeout are the unsolved ones
+      solved = row["optimal"] == "True" if "optimal" in row else t < timeout
+      scores[int(re.findall(r"(\d+)", os.path.basename(row["instance nr"]))[0])] = t if solved and t <= timeout else 2 * timeout
+  return scores
+
+class ModelSelector(object):
+  """
+  k nearest neighbours over the features of the instances of past results, standardized so that each feature weights the same
+  """
+
+  def __init__(self, directory: str, backend: str, timeout: float = 300, k: int = 3, instances_dir: str = "instances",
+               rotations: bool = False):
+    """
+    Args:
+        directory (str): Directory with the result csv files of each backend
+        backend (str): One of BACKENDS
+        timeout (float, optional): Time limit runs are scored with. Defaults to 300.
+        k (int, optional): Instances voting for the model. Defaults to 3.
+        instances_dir (str, optional): Directory of the instances of past results. Defaults to "instances".
+        rotations (bool, optional): Choose among the models rotating circuits. Defaults to False.
+    """
+    self.timeout = timeout
+    self.k = k
+    self.instances_dir = instances_dir
+    self.rotations = rotations
+
+    # PAR2 of each model on each instance
+    self.scores: Dict[str, Dict[int, float]] = dict()
+    # whether each model rotates circuits, None for models the backend does not know e.g. portfolios
+    self.rotating: Dict[str, Optional[bool]] = dict()
+    for path in natsorted(glob(os.path.join(directory, backend, "*.csv"))):
+      name = model_name(backend, path)
+      # cp models that no longer exist cannot be run
+      if name is None or (backend == "cp" and not os.path.isfile(name)):
+        continue
+      self.scores[name] = read_results(path, timeout, model=name)
+      self.rotating[name] = model_rotations(backend, name)
+
+    self.instances = natsorted({n for s in self.scores.values() for n in s
+                                if os.path.isfile(os.path.join(instances_dir, f"ins-{n}.txt"))})
+    if len(self.scores) == 0 or len(self.instances) == 0:
+      raise ValueError(f"No past results of {backend} models in {directory}")
+
+    self.features = np.array([list(instance_features(load_instance(os.path.join(instances_dir, f"ins-{n}.txt"))).values())
+                              for n in self.instances], dtype=float)
+    self.mean = self.features.mean(axis=0)
+    # constant features do not tell instances apart
+    self.std = np.where(self.features.std(axis=0) > 0, self.features.std(axis=0), 1)
+
+  @property
+  def models(self) -> List[str]:
+    """
+    Returns:
+        List[str]: Models with past results
+    """
+    return list(self.scores.keys())
+
+  @property
+  def candidates(self) -> List[str]:
+    """
+    Returns:
+        List[str]: Models with past results that can be chosen, those of the requested variant known by the backend
+    """
+    return [m for m in self.models if self.rotating[m] == self.rotations]
+
+  def score(self, model: str, instance: int) -> float:
+    """
+    Args:
+        model (str): Model with past results
+        instance (int): Instance number
+    Returns:
+        float: PAR2 of the model on the instance, as unsolved if the model has not been run on it
+    """
+    return self.scores[model].get(instance, 2 * self.timeout)
+
+  def neighbours(self, data: Dict[str, Any], exclude: Optional[int] = None) -> List[int]:
+    """
+    Args:
+        data (Dict[str, Any]): Instance
+        exclude (Optional[int], optional): Instance number left out of past results. Defaults to None.
+    Returns:
+        List[int]: Numbers of the k instances of past results nearest to the instance
+    """
+    features = (np.array(list(instance_features(data).values()), dtype=float) - self.mean) / self.std
+    distances = np.linalg.norm((self.features - self.mean) / self.std - features, axis=1)
+    order = [self.instances[i] for i in np.argsort(distances, kind="stable")]
+    return [n for n in order if n != exclude][:self.k]
+
+  def runtime(self, model: str, path: str) -> float:
+    """
+    Runtime expected of a model on an instance, unsolved runs take the whole timeout
+
+    Args:
+        model (str): Model as given to the driver of the backend
+        path (str): Path of the instance
+    Returns:
+        float: Past runtime of the model on the instance, mean runtime on the nearest instances if there is none
+    """
+    # cp models are paths, e.g. ./cp/rotations.mzn is cp/rotations.mzn
+    model = os.path.normpath(model)
+    match = re.fullmatch(r"ins-(\d+)\.txt", os.path.basename(path))
+    # the instance is one of past results only if it is read from the same directory
+    if match is not None and os.path.abspath(os.path.dirname(path)) == os.path.abspath(self.instances_dir):
+      if int(match[1]) in self.scores.get(model, dict()):
+        return min(self.scores[model][int(match[1])], self.timeout)
+
+    # models without past results are expected to behave as the average model
+    models = [model] if model in self.scores else self.models
+    neighbours = self.neighbours(load_instance(path))
+    return float(np.mean([min(self.score(m, n), self.timeout) for m in models for n in neighbours]))
+
+  def select(self, data: Dict[str, Any], exclude: Optional[int] = None) -> str:
+    """
+    Args:
+        data (Dict[str, Any]): Instance
+        exclude (Optional[int], optional): Instance number left out of past results. Defaults to None.
+    Returns:
+        str: Model with the lowest mean PAR2 on the nearest instances, ties go to the best model on every instance
+    """
+    if len(self.candidates) == 0:
+      raise ValueError(f"No past results of models {'' if self.rotations else 'not '}rotating circuits")
+    neighbours = self.neighbours(data, exclude=exclude)
+    return min(self.candidates, key=lambda m: (np.mean([self.score(m, n) for n in neighbours]),
+                                           sum(self.score(m, n) for n in self.instances if n != exclude)))
+
+def select_models(instances: List[str], backend: str, directory: str, timeout: float = 300, k: int = 3,
+                  rotations: bool = False) -> Dict[str, List[str]]:
+  """
+  Model of each instance, chosen from past results
+
+  Args:
+      instances (List[str]): Paths of the instances
+      backend (str): One of BACKENDS
+      directory (str): Directory with the result csv files of each backend
+      timeout (float, optional): Time limit runs are scored with. Defaults to 300.
+      k (int, optional): Instances voting for the model. Defaults to 3.
+      rotations (bool, optional): Choose among the models rotating circuits. Defaults to False.
+  Returns:
+      Dict[str, List[str]]: Instances each chosen model is run on
+  """
+  selector = ModelSelector(directory, backend, timeout=timeout, k=k, rotations=rotations)
+  plan = dict()
+  for i in instances:
+    model = selector.select(load_instance(i))
+    print(f"{i}: {model}")
+    plan.setdefault(model, list()).append(i)
+  return plan
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Choose the model of each instance from past results")
+  parser.add_argument("--instances", "-i", nargs="*", type=str, default=[],
+                      help="Instances(s) to choose a model for. Leave empty to evaluate the selector on past results.")
+  parser.add_argument("--backends", nargs="*", type=str, default=BACKENDS, choices=BACKENDS,
+                      help="Backends to choose a model of. Defaults to all.")
+  parser.add_argument("--history", type=str, default="csv", help="Directory with the result csv files of each backend. Defaults to csv.")
+  parser.add_argument("--timeout", "-t", type=float, default=300, help="Time limit runs are scored with. Defaults to 300s.")
+  parser.add_argument("-k", type=int, default=3, help="Instances voting for the model. Defaults to 3.")
+  parser.add_argument("--rotations", action="store_true", help="Choose among the models rotating circuits. Defaults to false.")
+  args = parser.parse_args()
+
+  for backend in args.backends:
+    selector = ModelSelector(args.history, backend, timeout=args.timeout, k=args.k, rotations=args.rotations)
+    print(f"{'-' * 5} {backend} {'-' * 5}")
+
+    if len(args.instances) > 0:
+      for i in expand_instances(args.instances):
+        print(f"{i}: {selector.select(load_instance(i))}")
+      continue
+
+    # leave one out: each instance of past results is given the model chosen from the other ones
+    chosen = {n: selector.select(load_instance(f"instances/ins-{n}.txt"), exclude=n) for n in selector.instances}
+    single_best = min(selector.candidates, key=lambda m: sum(selector.score(m, n) for n in selector.instances))
+
+    print("%-32s %8s %10s" % ("", "solved", "mean par2"))
+    rows = {
+      "selector": [selector.score(chosen[n], n) for n in selector.instances],
+      f"single best ({single_best})": [selector.score(single_best, n) for n in selector.instances],
+      "virtual best": [min(selector.score(m, n) for m in selector.candidates) for n in selector.instances]
+    }
+    for name, scores in rows.items():
+      print("%-32s %8d %10.2f" % (name, sum(s < 2 * args.timeout for s in scores), np.mean(scores)))
@@ -0,0 +1,156 @@
+from typing import Dict, Union, List, Tuple, Optional, Any
+import numpy as np
+import tempfile
+import threading
+import hashlib
+import json
+import os
+
+def canonical(data: Dict[str, Union[int, List[int]]], rotations: bool = False) -> Tuple[str, List[int], List[Tuple[int, int]]]:
+  """
+  Canonical form of an instance: board width and sorted multiset of circuits dimensions.
+  Instances listing the same circuits in a different order have the same canonical form.
+
+  Args:
+      data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+      rotations (bool, optional): Circuits can be rotated, dimensions are normalized as (short, long) side. Defaults to False.
+  Returns:
+      Tuple[str, List[int], List[Tuple[int, int]]]: Hash of the canonical form, circuit of the instance
+      at each canonical position and canonical dimensions
+  """
+  dims = list(zip(data["cwidth"], data["cheight"]))
+  if rotations:
+    dims = [(min(w, h), max(w, h)) for w, h in dims]
+
+  order = sorted(range(len(dims)), key=lambda c: dims[c])
+  sorted_dims = [dims[c] for c in order]
+
+  text = json.dumps({"WIDTH": data["WIDTH"], "rotations": rotations, "circuits": sorted_dims})
+  return hashlib.sha256(text.encode()).hexdigest(), order, sorted_dims
+
+def validate(data: Dict[str, Union[int, List[int]]], x: List[int], y: List[int], height: int,
+             rotations: Optional[List[bool]] = None) -> bool:
+  """
+  Check that circuits are placed inside the board without overlapping
+
+  Args:
+      data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+      x (List[int]): Circuits left-bottom x positions
+      y (List[int]): Circuits left-bottom y positions
+      height (int): Height of the board
+      rotations (Optional[List[bool]], optional): Whether each circuit is rotated. Defaults to None.
+  Returns:
+      bool: Placement is valid
+  """
+  rotated = np.array(rotations if rotations is not None else [False] * data["N"], dtype=bool)
+  w = np.where(rotated, data["cheight"], data["cwidth"])
+  h = np.where(rotated, data["cwidth"], data["cheight"])
+  x, y = np.array(x), np.array(y)
+
+  if len(x) != data["N"] or len(y) != data["N"]:
+    return False
+  if np.any(x < 0) or np.any(y < 0) or np.any(x + w > data["WIDTH"]) or np.any(y + h > height):
+    return False
+
+  # two rectangles overlap if they overlap on both axes
+  overlap_x = (x[:, None] < x[None, :] + w[None, :]) & (x[None, :] < x[:, None] + w[:, None])
+  overlap_y = (y[:, None] < y[None, :] + h[None, :]) & (y[None, :] < y[:, None] + h[:, None])
+  overlap = overlap_x & overlap_y
+  np.fill_diagonal(overlap, False)
+  return not np.any(overlap)
+
+class SolutionCache(object):
+  """
+  Persistent cache of proven optimal packings, one json file per canonical instance.
+  Packings are stored in canonical circuit order and mapped back to the order of the instance on lookup.
+  The cache can be shared by threads.
+  """
+  def __init__(self, directory: str):
+    """
+    Args:
+        directory (str): Directory of the cache
+    """
+    self.directory = directory
+    self.hits = 0
+    self.misses = 0
+    # guards the counters
+    self.lock = threading.Lock()
+    os.makedirs(directory, exist_ok=True)
+
+  def _path(self, key: str) -> str:
+    return os.path.join(self.directory, key + ".json")
+
+  def lookup(self, data: Dict[str, Union[int, List[int]]], rotations: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Optimal packing of an instance, if an equivalent instance has been solved before
+
+    Args:
+        data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+        rotations (bool, optional): Circuits can be rotated. Defaults to False.
+    Returns:
+        Optional[Dict[str, Any]]: height, x, y and rotations in the order of the instance, None if not cached or
+        if the cached packing is not valid for the instance
+    """
+    key, order, _ = canonical(data, rotations)
+    path = self._path(key)
+
+    if not os.path.exists(path):
+      with self.lock:
+        self.misses += 1
+      return None
+
+    with open(path) as f:
+      entry = json.load(f)
+
+    x, y = [0] * data["N"], [0] * data["N"]
+    rotated = [False] * data["N"]
+    for k, c in enumerate(order):
+      x[c], y[c] = entry["x"][k], entry["y"][k]
+      # a circuit is rotated if it is placed with swapped sides
+      rotated[c] = rotations and data["cwidth"][c] != data["cheight"][c] and entry["width"][k] != data["cwidth"][c]
+
+    if not validate(data, x, y, entry["height"], rotated):
+      with self.lock:
+        self.misses += 1
+      return None
+
+    with self.lock:
+      self.hits += 1
+    return {"height": entry["height"], "x": x, "y": y, "rotations": rotated if rotations else None}
+
+  def add(self, data: Dict[str, Union[int, List[int]]], height: int, x: List[int], y: List[int],
+          rotations: Optional[List[bool]] = None):
+    """
+    Store a proven optimal packing of an instance
+
+    Args:
+        data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+        height (int): Optimal height
+        x (List[int]): Circuits left-bottom x positions
+        y (List[int]): Circuits left-bottom y positions
+        rotations (Optional[List[bool]], optional): Whether each circuit is rotated, None if rotation is not allowed. Defaults to None.
+    """
+    key, order, _ = canonical(data, rotations is not None)
+    rotated = rotations if rotations is not None else [False] * data["N"]
+
+    entry = {
+      "WIDTH": data["WIDTH"],
+      "height": height,
+      "x": [int(x[c]) for c in order],
+      "y": [int(y[c]) for c in order],
+      # placed width of each circuit
+      "width": [int(data["cheight"][c] if rotated[c] else data["cwidth"][c]) for c in order]
+    }
+
+    # written to a temporary file of its own first so that a concurrent lookup never reads a partial entry
+    # and concurrent additions of the same entry do not write the same file
+    with tempfile.NamedTemporaryFile("w", dir=self.directory, suffix=".tmp", delete=False) as f:
+      json.dump(entry, f)
+    os.replace(f.name, self._path(key))
+
+  def report(self) -> str:
+    """
+    Returns:
+        str: Hits and misses
+    """
+    return "Solution cache: %d hits, %d misses" % (self.hits, self.misses)
@@ -0,0 +1,113 @@
+from typing import Dict, List, Union, Callable
+import functools
+import time
+import z3
+
+# solver statistics that are reported for each check, remaining ones are kept in the raw dump
+SOLVER_STATISTICS = ["conflicts", "decisions", "propagations", "memory", "max memory"]
+
+def encoding_size(constraint: z3.ExprRef) -> Dict[str, int]:
+  """
+  Size of a constraint
+
+  Args:
+      constraint (z3.ExprRef): Constraint built by a constraint family method
+  Returns:
+      Dict[str, int]: Number of top-level clauses (conjuncts), number of distinct terms and number of variables
+  """
+  clauses = 0
+  visited = set()
+  variables = set()
+
+  # count conjuncts by flattening nested conjunctions
+  stack = [constraint]
+  while len(stack) > 0:
+    e = stack.pop()
+    if z3.is_and(e):
+      stack.extend(e.children())
+    else:
+      clauses += 1
+
+  # count distinct terms and variables of the formula DAG
+  stack = [constraint]
+  while len(stack) > 0:
+    e = stack.pop()
+    if e.get_id() in visited:
+      continue
+    visited.add(e.get_id())
+
+    if z3.is_const(e) and e.decl().kind() == z3.Z3_OP_UNINTERPRETED:
+      variables.add(e.get_id())
+    else:
+      stack.extend(e.children())
+
+  return {
+    "clauses": clauses,
+    "terms": len(visited),
+    "variables": len(variables)
+  }
+
+def constraint_family(method: Callable) -> Callable:
+  """
+  Decorator for constraint family methods of a model.
+  Records the time spent building the constraint in model.family_stats and,
+  when the model collects statistics, the size of the resulting encoding.
+
+  Args:
+      method (Callable): Constraint family method returning a z3 expression
+  Returns:
+      Callable: Wrapped method
+  """
+  @functools.wraps(method)
+  def wrapper(self, *args, **kwargs):
+    start = time.perf_counter()
+    constraint = method(self, *args, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    stats = {"time": elapsed}
+    if self.collect_stats:
+      stats.update(encoding_size(constraint))
+
+    self.family_stats[method.__name__] = stats
+    return constraint
+
+  return wrapper
+
+def solver_statistics(solver: z3.Solver) -> Dict[str, Union[int, float]]:
+  """
+  Statistics of the last check of a z3 solver
+
+  Args:
+      solver (z3.Solver): Solver that has been checked
+  Returns:
+      Dict[str, Union[int, float]]: Statistics name and value
+  """
+  stats = solver.statistics()
+  return {k: stats.get_key_value(k) for k in stats.keys()}
+
+def family_rows(instance: str, family_stats: Dict[str, Dict]) -> List[List]:
+  """
+  Rows of the constraint families statistics csv
+
+  Args:
+      instance (str): Instance the model has been built for
+      family_stats (Dict[str, Dict]): Statistics of each constraint family
+  Returns:
+      List[List]: instance, family, time, clauses, terms, variables
+  """
+  return [[instance, f, s["time"], s.get("clauses"), s.get("terms"), s.get("variables")] for f, s in family_stats.items()]
+
+def solver_rows(instance: str, solver_stats: List[Dict]) -> List[List]:
+  """
+  Rows of the solver statistics csv
+
+  Args:
+      instance (str): Instance that has been solved
+      solver_stats (List[Dict]): Statistics of each check
+  Returns:
+      List[List]: instance, height, result, time followed by SOLVER_STATISTICS
+  """
+  return [[instance, s["height"], s["result"], s["time"]] + [s["statistics"].get(k) for k in SOLVER_STATISTICS] for s in solver_stats]
+
+FAMILY_HEADER = ["instance nr", "family", "time", "clauses", "terms", "variables"]
+SOLVER_HEADER = ["instance nr", "height", "result", "time"] + SOLVER_STATISTICS
@@ -0,0 +1,283 @@
+"""
+Packed instance and solution stores.
+
+A store is a directory of NumPy arrays: circuits dimensions of every instance are concatenated
+in a single array and an index gives the offset of each instance, so that an instance is read
+from memory-mapped arrays without parsing text.
+
+usage: python -m utils.store import INSTANCES ... -o STORE
+       python -m utils.store export STORE -o DIRECTORY
+       python -m utils.store export-solutions STORE -o DIRECTORY
+"""
+from typing import Dict, Union, List, Tuple, Optional
+from functools import lru_cache
+from threading import Lock
+import numpy as np
+import argparse
+import json
+import os
+from utils.io import txt2dict, save_solution
+
+INDEX = "index.npy"
+NAMES = "names.json"
+
+def is_store(path: str) -> bool:
+  """
+  Args:
+      path (str): Path of a file or directory
+  Returns:
+      bool: The path is an instance or solution store
+  """
+  return os.path.isdir(path) and os.path.exists(os.path.join(path, INDEX)) and os.path.exists(os.path.join(path, NAMES))
+
+def _save(directory: str, names: List[str], index: np.ndarray, arrays: Dict[str, np.ndarray]):
+  """
+  Write index, names and arrays of a store
+  """
+  os.makedirs(directory, exist_ok=True)
+  np.save(os.path.join(directory, INDEX), index)
+  for name, array in arrays.items():
+    np.save(os.path.join(directory, name + ".npy"), array)
+
+  # names are written last, a store is complete only once they exist
+  with open(os.path.join(directory, NAMES), "w") as f:
+    json.dump(names, f)
+
+class InstanceStore(object):
+  """
+  Read-only store of instances.
+  The index has a row (offset, N, WIDTH) for each instance, cwidth and cheight hold circuit dimensions
+  of all instances one after the other.
+  """
+  def __init__(self, directory: str):
+    """
+    Args:
+        directory (str): Directory of the store
+    """
+    self.directory = directory
+    self.index = np.load(os.path.join(directory, INDEX), mmap_mode="r")
+    self.cwidth = np.load(os.path.join(directory, "cwidth.npy"), mmap_mode="r")
+    self.cheight = np.load(os.path.join(directory, "cheight.npy"), mmap_mode="r")
+
+    with open(os.path.join(directory, NAMES)) as f:
+      self.names = json.load(f)
+    self.positions = {name: k for k, name in enumerate(self.names)}
+
+  def __len__(self) -> int:
+    return len(self.names)
+
+  def arrays(self, key: Union[int, str]) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Instance as memory-mapped arrays, nothing is copied
+
+    Args:
+        key (Union[int, str]): Position or name of the instance
+    Returns:
+        Tuple[int, np.ndarray, np.ndarray]: Board width, width and height of each circuit
+    """
+    k = self.positions[key] if isinstance(key, str) else key
+    offset, n, width = self.index[k]
+    return int(width), self.cwidth[offset:offset + n], self.cheight[offset:offset + n]
+
+  def __getitem__(self, key: Union[int, str]) -> Dict[str, Union[int, List[int]]]:
+    """
+    Args:
+        key (Union[int, str]): Position or name of the instance
+    Returns:
+        Dict[str, Union[int, List[int]]]: Instance in the same format as txt2dict
+    """
+    width, cwidth, cheight = self.arrays(key)
+    return {"WIDTH": width, "N": len(cwidth), "cwidth": cwidth.tolist(), "cheight": cheight.tolist()}
+
+  @staticmethod
+  def write(directory: str, names: List[str], instances: List[Dict[str, Union[int, List[int]]]]):
+    """
+    Write instances to a new store
+
+    Args:
+        directory (str): Directory of the store
+        names (List[str]): Name of each instance e.g. ins-1
+        instances (List[Dict[str, Union[int, List[int]]]]): Instances in the same format as txt2dict
+    """
+    sizes = np.array([d["N"] for d in instances], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    widths = np.array([d["WIDTH"] for d in instances], dtype=np.int64)
+
+    _save(directory, names, np.stack([offsets, sizes, widths], axis=1), {
+      "cwidth": np.concatenate([d["cwidth"] for d in instances]).astype(np.int32),
+      "cheight": np.concatenate([d["cheight"] for d in instances]).astype(np.int32)
+    })
+
+class SolutionStore(object):
+  """
+  Store of solutions, written in bulk.
+  The index has a row (offset, N, WIDTH, height) for each solution, circuits dimensions, positions and
+  rotations of all solutions are held one after the other so that solutions can be exported without instances.
+  """
+  ARRAYS = ["cwidth", "cheight", "x", "y", "rotated"]
+
+  def __init__(self, directory: str):
+    """
+    Solutions already in the directory are kept, new ones are added on flush
+
+    Args:
+        directory (str): Directory of the store
+    """
+    self.directory = directory
+    self.names = list()
+    self.solutions = list()
+    # position of each name in names and solutions
+    self.positions: Dict[str, int] = dict()
+    self.lock = Lock()
+
+    if is_store(directory):
+      stored = np.load(os.path.join(directory, INDEX))
+      arrays = {a: np.load(os.path.join(directory, a + ".npy")) for a in self.ARRAYS}
+      with open(os.path.join(directory, NAMES)) as f:
+        names = json.load(f)
+
+      for name, (offset, n, width, height) in zip(names, stored):
+        self.positions[name] = len(self.names)
+        self.names.append(name)
+        self.solutions.append([int(width), int(height)] + [arrays[a][offset:offset + n] for a in self.ARRAYS])
+
+  def __len__(self) -> int:
+    return len(self.names)
+
+  def add(self, name: str, data: Dict[str, Union[int, List[int]]], x: List[int], y: List[int],
+          rotations: Optional[List[bool]] = None):
+    """
+    Add the solution of an instance, a previous solution with the same name is replaced.
+    Circuits dimensions are stored as placed, i.e. swapped when rotated.
+
+    Args:
+        name (str): Name of the instance
+        data (Dict[str, Union[int, List[int]]]): Instance in the same format as txt2dict
+        x (List[int]): Circuits left-bottom x positions
+        y (List[int]): Circuits left-bottom y positions
+        rotations (Optional[List[bool]], optional): Whether each circuit is rotated. Defaults to None.
+    """
+    rotated = np.array(rotations if rotations is not None else [False] * data["N"], dtype=bool)
+    cwidth = np.where(rotated, data["cheight"], data["cwidth"])
+    cheight = np.where(rotated, data["cwidth"], data["cheight"])
+    height = int(max(np.array(y) + cheight))
+    solution = [data["WIDTH"], height, cwidth, cheight, np.array(x), np.array(y), rotated]
+
+    with self.lock:
+      if name in self.positions:
+        self.solutions[self.positions[name]] = solution
+      else:
+        self.positions[name] = len(self.names)
+        self.names.append(name)
+        self.solutions.append(solution)
+
+  def __getitem__(self, name: str) -> Dict[str, Union[int, List[int]]]:
+    """
+    Args:
+        name (str): Name of the instance
+    Returns:
+        Dict[str, Union[int, List[int]]]: WIDTH, height, circuits dimensions, positions and rotations
+    """
+    width, height, *arrays = self.solutions[self.positions[name]]
+    return {"WIDTH": width, "height": height, **{a: v.tolist() for a, v in zip(self.ARRAYS, arrays)}}
+
+  def flush(self):
+    """
+    Write all solutions to the directory
+    """
+    with self.lock:
+      if len(self.solutions) == 0:
+        return
+
+      sizes = np.array([len(s[2]) for s in self.solutions], dtype=np.int64)
+      offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+      index = np.stack([offsets, sizes, [s[0] for s in self.solutions], [s[1] for s in self.solutions]], axis=1)
+      arrays = {a: np.concatenate([s[2 + k] for s in self.solutions]) for k, a in enumerate(self.ARRAYS)}
+      arrays = {a: v.astype(bool if a == "rotated" else np.int32) for a, v in arrays.items()}
+
+      _save(self.directory, list(self.names), index.astype(np.int64), arrays)
+
+@lru_cache(maxsize=None)
+def open_store(directory: str) -> InstanceStore:
+  """
+  Instance store opened once for all the instances read from it
+  """
+  return InstanceStore(directory)
+
+def expand_instances(paths: List[str]) -> List[str]:
+  """
+  Replace instance stores with the paths of their instances, i.e. <store>/<name>
+
+  Args:
+      paths (List[str]): Instance files and instance stores
+  Returns:
+      List[str]: Paths of each instance
+  """
+  expanded = list()
+  for p in paths:
+    if is_store(p):
+      expanded.extend(os.path.join(p, name) for name in open_store(p).names)
+    else:
+      expanded.append(p)
+
+  return expanded
+
+def load_instance(path: str) -> Dict[str, Union[int, List[int]]]:
+  """
+  Load an instance from an ins-N.txt file or from a store path given by expand_instances
+
+  Args:
+      path (str): Path of the instance
+  Returns:
+      Dict[str, Union[int, List[int]]]: Key is the variable, value is the variable's value
+  """
+  if os.path.isfile(path):
+    return txt2dict(path)
+
+  return open_store(os.path.dirname(path))[os.path.basename(path)]
+
+def import_txt(paths: List[str], directory: str):
+  """
+  Pack ins-N.txt instances in a store, each instance is named after its file e.g. ins-1
+  """
+  names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+  InstanceStore.write(directory, names, [txt2dict(p) for p in paths])
+
+def export_txt(directory: str, output: str):
+  """
+  Write each instance of a store to <output>/<name>.txt
+  """
+  os.makedirs(output, exist_ok=True)
+  store = InstanceStore(directory)
+
+  for name in store.names:
+    width, cwidth, cheight = store.arrays(name)
+    with open(os.path.join(output, name + ".txt"), "w") as f:
+      f.write(f"{width}\n{len(cwidth)}\n")
+      f.writelines(f"{w} {h}\n" for w, h in zip(cwidth, cheight))
+
+def export_solutions(directory: str, output: str):
+  """
+  Write each solution of a store to <output>/<name>.txt, same format as save_solution
+  """
+  os.makedirs(output, exist_ok=True)
+  store = SolutionStore(directory)
+
+  for name in store.names:
+    s = store[name]
+    data = {"WIDTH": s["WIDTH"], "N": len(s["x"]), "cwidth": s["cwidth"], "cheight": s["cheight"]}
+    save_solution(os.path.join(output, name + ".txt"), data, list(zip(s["x"], s["y"])))
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Pack instances and solutions in NumPy stores")
+  parser.add_argument("command", type=str, choices=["import", "export", "export-solutions"])
+  parser.add_argument("paths", nargs="+", type=str, help="Instance files to import or store to export.")
+  parser.add_argument("--output", "-o", type=str, required=True, help="Store to create or directory of exported files.")
+  args = parser.parse_args()
+
+  if args.command == "import":
+    import_txt(args.paths, args.output)
+  elif args.command == "export":
+    export_txt(args.paths[0], args.output)
+  else:
+    export_solutions(args.paths[0], args.output)
@@ -0,0 +1,84 @@
+"""
+Benchmark combinations of variable selection, value choice and restart policy of a CP model
+taking its search strategy as data (e.g. cp/configurable_search.mzn) across instances.
+
+usage: python -m utils.sweep_search [-m MODEL] [-i INSTANCES ...] [--var-heuristics ...] [--val-choices ...]
+                                    [--restarts ...] [--restart-scale S] [--restart-base B] [-t TIMEOUT] [--csv CSV]
+"""
+import argparse
+import csv
+from glob import glob
+from natsort import natsorted
+from minizinc import Solver
+from cp import solve_instance
+from utils.budget import Budget, Status
+from utils.search_config import declares_search, strategies, strategy_name, unsupported, VAR_HEURISTICS, VAL_CHOICES, RESTARTS, SOLVER_STRATEGIES
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark CP search strategies")
+  parser.add_argument("--model", "-m", type=str, default="cp/configurable_search.mzn",
+                      help="Model taking the search strategy as data. Defaults to cp/configurable_search.mzn.")
+  parser.add_argument("--instances", "-i", nargs="*", type=str, default=[], help="Instances(s) to load. Leave empty to use all.")
+  parser.add_argument("--solver", "-s", type=str, default="chuffed", choices=["chuffed", "gecode"],
+                      help="Solver that Minizinc will use. Defaults to Chuffed.")
+  parser.add_argument("--var-heuristics", nargs="+", type=str, choices=VAR_HEURISTICS,
+                      help="Variable selections to try. Defaults to input_order, first_fail and dom_w_deg if the solver honours them.")
+  parser.add_argument("--val-choices", nargs="+", type=str, default=["indomain_min", "indomain_max"],
+                      choices=VAL_CHOICES, help="Value choices to try.")
+  parser.add_argument("--restarts", nargs="+", type=str, choices=RESTARTS,
+                      help="Restart policies to try. Defaults to those the solver honours.")
+  parser.add_argument("--restart-scale", type=int, default=100, help="Restart limit scale. Defaults to 100.")
+  parser.add_argument("--restart-base", type=float, default=1.5, help="Growth of geometric restarts limit. Defaults to 1.5.")
+  parser.add_argument("--timeout", "-t", type=int, default=300, help="Time limit of each run in seconds. Defaults to 300s (5m).")
+  parser.add_argument("--csv", "-csv", nargs=1, type=str, help="Save results of every run in specified csv file.")
+  args = parser.parse_args()
+
+  if not declares_search(args.model):
+    parser.error(f"{args.model} does not take its search strategy as data")
+
+  # defaults are restricted to the annotations the solver honours, explicit choices it would ignore are rejected
+  supported = SOLVER_STRATEGIES[args.solver]
+  if args.var_heuristics is None:
+    args.var_heuristics = [h for h in ["input_order", "first_fail", "dom_w_deg"] if h in supported["var_heuristic"]]
+  if args.restarts is None:
+    args.restarts = supported["restart"]
+  ignored = {c for s in strategies(args.var_heuristics, args.val_choices, args.restarts) for c in unsupported(args.solver, *s)}
+  if len(ignored) > 0:
+    parser.error(f"{args.solver} does not honour {', '.join(sorted(ignored))}")
+
+  instances = args.instances if len(args.instances) > 0 else natsorted(glob("instances/*.txt"))
+  solver = Solver.lookup(args.solver)
+
+  if args.csv is not None:
+    f = open(args.csv[0], "w")
+    csv_writer = csv.writer(f)
+    csv_writer.writerow(["strategy", "instance nr", "time", "solutions", "nodes", "failures", "status", "optimal", "threads", "quality"])
+
+  summary = dict()
+  for var_heuristic, val_choice, restart in strategies(args.var_heuristics, args.val_choices, args.restarts):
+    name = strategy_name(var_heuristic, val_choice, restart)
+    # options read by cp.solve_instance, a single optimization run without plots or outputs
+    run_args = argparse.Namespace(profile=None, schedule="optimize", free_search=False, plot=False, output=None,
+                                  var_heuristic=var_heuristic, val_choice=val_choice, restart=restart,
+                                  restart_scale=args.restart_scale, restart_base=args.restart_base, gap=None)
+    summary[name] = {"solved": 0, "optimal": 0, "time": 0}
+
+    for i in instances:
+      row = solve_instance(args.model, i, solver, Budget(args.timeout), run_args)
+      _, time, _, _, _, status, optimal, _, _ = row
+
+      summary[name]["solved"] += status == Status.SAT
+      summary[name]["optimal"] += optimal
+      # instances not solved to optimality are charged the whole time limit
+      summary[name]["time"] += time if optimal else args.timeout
+
+      if args.csv is not None:
+        csv_writer.writerow([name] + row)
+
+  if args.csv is not None:
+    f.close()
+
+  # best strategies first: most optimal instances, then least time
+  print("%-48s %8s %8s %10s" % ("strategy", "solved", "optimal", "time"))
+  for name, s in sorted(summary.items(), key=lambda item: (-item[1]["optimal"], item[1]["time"])):
+    print("%-48s %8d %8d %9.2fs" % (name, s["solved"], s["optimal"], s["time"]))
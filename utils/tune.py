@@ -0,0 +1,149 @@
+"""
+Tune z3 parameters of a model over a training set of instances with successive halving.
+
+Random configurations, along with z3 defaults, are first run on a few instances. After each rung only the best
+1/eta of them are kept and run on eta times more instances, until one configuration is left or every instance has been used.
+Runs are scored by PAR2: solving time if the height is proven optimal, twice the timeout otherwise.
+The best configuration is saved in a profile that sat.py and smt.py load with --z3-profile.
+
+usage: python -m utils.tune -m MODEL -i INSTANCES ... [--configs N] [--eta ETA] [--min-instances K]
+                            [-t TIMEOUT] [--processes P] [--seed SEED] -o PROFILE
+"""
+from typing import Dict, Any, List, Tuple
+from multiprocessing import Pool
+from contextlib import redirect_stdout
+from importlib import import_module
+import argparse
+import random
+import math
+import sys
+import io
+from glob import glob
+from natsort import natsorted
+from utils.budget import Budget
+from utils.search import search_height
+from utils.store import expand_instances, load_instance
+from utils.determine_hbound import height_bounds
+from utils.z3_profile import parameter_space, save_profile
+
+def find_model(key: str):
+  """
+  Args:
+      key (str): Module and class name of the model e.g. sat.NaiveModel
+  Returns:
+      type: Model class
+  """
+  module, name = key.split(".")
+  return getattr(import_module(module), name)
+
+def sample_configs(space: Dict[str, List[Any]], n: int, rng: random.Random) -> List[Dict[str, Any]]:
+  """
+  Args:
+      space (Dict[str, List[Any]]): Values of each parameter
+      n (int): Number of configurations
+      rng (random.Random): Random generator
+  Returns:
+      List[Dict[str, Any]]: z3 defaults followed by n - 1 distinct random configurations
+  """
+  configs = [dict()]
+  # the space may have less than n configurations
+  for _ in range(100 * n):
+    if len(configs) >= n:
+      break
+    config = {k: rng.choice(v) for k, v in space.items()}
+    if config not in configs:
+      configs.append(config)
+
+  return configs
+
+def run(key: str, params: Dict[str, Any], instance: str, timeout: float) -> float:
+  """
+  Solve an instance with a configuration, in the same way as the drivers
+
+  Args:
+      key (str): Module and class name of the model
+      params (Dict[str, Any]): z3 parameters
+      instance (str): Path of the instance
+      timeout (float): Time limit in seconds
+  Returns:
+      float: PAR2 score of the run
+  """
+  sys.setrecursionlimit(3000)
+  model = find_model(key)
+  data = load_instance(instance)
+  budget = Budget(timeout)
+
+  lower_bound, upper_bound = height_bounds(data, data["WIDTH"])
+
+  with redirect_stdout(io.StringIO()):
+    solver = model(data["WIDTH"], data["cwidth"], data["cheight"], lower_bound, upper_bound, timeout=budget.remaining)
+    solver.configure(params)
+    result = search_height(solver, lower_bound, upper_bound, budget)
+
+  return budget.elapsed if result["optimal"] else 2 * timeout
+
+def successive_halving(key: str, instances: List[str], configs: List[Dict[str, Any]], timeout: float,
+                       eta: int = 2, min_instances: int = 2, processes: int = 1) -> Tuple[Dict[str, Any], float, float, int]:
+  """
+  Args:
+      key (str): Module and class name of the model
+      instances (List[str]): Training instances, the first ones are used by the first rungs
+      configs (List[Dict[str, Any]]): Configurations, the first one being z3 defaults
+      timeout (float): Time limit of each run in seconds
+      eta (int, optional): Fraction of configurations dropped by each rung. Defaults to 2.
+      min_instances (int, optional): Instances of the first rung. Defaults to 2.
+      processes (int, optional): Runs done in parallel. Defaults to 1.
+  Returns:
+      Tuple[Dict[str, Any], float, float, int]: Best configuration, its mean score, mean score of z3 defaults
+      on the same instances and number of instances it has been run on
+  """
+  scores = dict()
+  alive = list(range(len(configs)))
+  n = min(min_instances, len(instances))
+
+  with Pool(processes) as pool:
+    while True:
+      # runs of previous rungs are reused
+      tasks = [(c, i) for c in alive + [0] for i in instances[:n] if (c, i) not in scores]
+      tasks = list(dict.fromkeys(tasks))
+      results = pool.starmap(run, [(key, configs[c], i, timeout) for c, i in tasks])
+      scores.update(zip(tasks, results))
+
+      mean = {c: sum(scores[c, i] for i in instances[:n]) / n for c in alive}
+      alive = sorted(alive, key=lambda c: mean[c])
+      print(f"{len(alive):3} configurations on {n:3} instances, best {mean[alive[0]]:.2f}s: {configs[alive[0]] or 'z3 defaults'}")
+
+      if len(alive) == 1 or n == len(instances):
+        break
+      alive = alive[:max(1, math.ceil(len(alive) / eta))]
+      n = min(n * eta, len(instances))
+
+  best = alive[0]
+  return configs[best], mean[best], sum(scores[0, i] for i in instances[:n]) / n, n
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Tune z3 parameters of a model")
+  parser.add_argument("--model", "-m", type=str, required=True, help="Model to tune, e.g. sat.NaiveModel or smt.SymmetryModel.")
+  parser.add_argument("--instances", "-i", nargs="*", type=str, default=[], help="Training instances. Leave empty to use all.")
+  parser.add_argument("--configs", type=int, default=16, help="Configurations of the first rung. Defaults to 16.")
+  parser.add_argument("--eta", type=int, default=2, help="Only 1/eta configurations are kept by each rung. Defaults to 2.")
+  parser.add_argument("--min-instances", type=int, default=2, help="Instances of the first rung. Defaults to 2.")
+  parser.add_argument("--timeout", "-t", type=float, default=60, help="Time limit of each run in seconds. Defaults to 60s.")
+  parser.add_argument("--processes", "-p", type=int, default=1, help="Runs done in parallel. Defaults to 1.")
+  parser.add_argument("--seed", type=int, default=0, help="Seed of the sampled configurations and of the instances order. Defaults to 0.")
+  parser.add_argument("--output", "-o", type=str, required=True, help="Profile where the best configuration is saved.")
+  args = parser.parse_args()
+
+  model = find_model(args.model)
+  rng = random.Random(args.seed)
+  instances = expand_instances(args.instances if len(args.instances) > 0 else natsorted(glob("instances/*.txt")))
+  # early rungs should not only see the easiest instances
+  rng.shuffle(instances)
+
+  configs = sample_configs(parameter_space(model), args.configs, rng)
+  params, score, default_score, n = successive_halving(args.model, instances, configs, args.timeout, eta=args.eta,
+                                                       min_instances=args.min_instances, processes=args.processes)
+
+  print(f"Best configuration {params or 'z3 defaults'}: {score:.2f}s against {default_score:.2f}s of z3 defaults on {n} instances")
+  save_profile(args.output, model, {"params": params, "score": score, "default_score": default_score,
+                                    "instances": n, "timeout": args.timeout})
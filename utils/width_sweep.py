@@ -0,0 +1,141 @@
+"""
+Width sweep: minimum height of an instance at each board width of a range, in a single incremental SMT session.
+
+The model is built once with the width as a variable bounded by the widest board. Each width is then searched with
+the width fixed by an assumption, so lemmas learned on a width are reused by the next ones. Widths are swept from
+the narrowest, the packing found on a width fits every wider one: its height bounds them and it is their solution
+when their own search finds none.
+The outcome is the height/width Pareto frontier, with the timing of each point.
+
+usage: python -m utils.width_sweep -m MODEL -i INSTANCE [--widths MIN MAX] [--step STEP] [-t TIMEOUT]
+                                   [--schedule {linear,binary}] [--csv CSV] [--plot]
+"""
+from typing import Dict, Any, List, Tuple
+import argparse
+import csv
+import sys
+import time
+from utils.budget import Budget, Status
+from utils.search import search_height, SCHEDULES
+from utils.store import load_instance
+from utils.determine_hbound import height_bounds
+from utils.tune import find_model
+
+def pareto_front(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+  """
+  Args:
+      points (List[Dict[str, Any]]): Width and height of each point of the sweep, height is None if none has been found
+  Returns:
+      List[Dict[str, Any]]: Points no other point is at least as narrow and as low as, from the narrowest
+  """
+  front = list()
+  for p in sorted([p for p in points if p["height"] is not None], key=lambda p: (p["width"], p["height"])):
+    # a wider point is on the front only if it is lower than every narrower one
+    if len(front) == 0 or p["height"] < front[-1]["height"]:
+      front.append(p)
+  return front
+
+def width_sweep(model, data: Dict[str, Any], widths: List[int], timeout: float, schedule: str = "linear") -> Tuple[List[Dict[str, Any]], float]:
+  """
+  Search the minimum height of an instance at each width
+
+  Args:
+      model (type): SmtModel class
+      data (Dict[str, Any]): Instance
+      widths (List[int]): Board widths, no smaller than the widest circuit
+      timeout (float): Time limit of each width in seconds
+      schedule (str, optional): Order in which heights are tried, one of SCHEDULES. Defaults to "linear".
+  Returns:
+      Tuple[List[Dict[str, Any]], float]: Outcome of each width, from the narrowest, and time spent building the model
+  """
+  widths = sorted(widths)
+  bounds = {w: height_bounds(data, w) for w in widths}
+
+  # the model class is left untouched, the sweep runs on a subclass with a variable width.
+  # solvers built from tactics start from scratch at each check, only the generic solver keeps its lemmas
+  sweep_model = type(model.__name__, (model,), {"WIDTH_SWEEP": True, "LOGIC": None, "TACTIC": None, "__module__": model.__module__})
+  build_start = time.perf_counter()
+  solver = sweep_model(widths[-1], data["cwidth"], data["cheight"], min(lb for lb, _ in bounds.values()),
+                       max(ub for _, ub in bounds.values()), timeout=float("inf"))
+  build_time = time.perf_counter() - build_start
+
+  points = list()
+  best = None
+  for w in widths:
+    print(f"{'-' * 5} width {w} {'-' * 5}")
+    lower_bound, upper_bound = bounds[w]
+    # the packing found on a narrower board fits this one too
+    if best is not None:
+      upper_bound = min(upper_bound, best["height"])
+
+    budget = Budget(timeout)
+    checks = len(solver.solver_stats)
+    result = search_height(solver, lower_bound, upper_bound, budget, schedule=schedule, assumptions=[solver.width_literal(w)])
+    if result["height"] is not None:
+      best = result
+    elif best is not None:
+      # time ran out before a packing of this width was found, the narrower one is kept without proof of optimality
+      result = {**result, "x": best["x"], "y": best["y"], "rotations": best["rotations"], "height": best["height"],
+                "status": Status.SAT, "optimal": False}
+
+    points.append({
+      "width": w,
+      "height": result["height"],
+      "lower_bound": lower_bound,
+      "status": result["status"],
+      "optimal": result["optimal"],
+      "time": budget.elapsed,
+      "checks": len(solver.solver_stats) - checks,
+      "x": result["x"],
+      "y": result["y"],
+      "rotations": result["rotations"]
+    })
+
+  return points, build_time
+
+if __name__ == "__main__":
+  sys.setrecursionlimit(3000)
+
+  parser = argparse.ArgumentParser(description="Sweep the board width of an instance in a single SMT session")
+  parser.add_argument("--model", "-m", type=str, default="NaiveModel", help="SMT model to use. Defaults to NaiveModel.")
+  parser.add_argument("--instance", "-i", type=str, required=True, help="Instance to load.")
+  parser.add_argument("--widths", nargs=2, type=int,
+                      help="Narrowest and widest board. Defaults to the widest circuit and the width of the instance.")
+  parser.add_argument("--step", type=int, default=1, help="Width increment between two points. Defaults to 1.")
+  parser.add_argument("--timeout", "-timeout", "-t", type=float, default=60,
+                      help="Time limit of each width in seconds. Defaults to 60s.")
+  parser.add_argument("--schedule", type=str, default="linear", choices=SCHEDULES,
+                      help="Order in which heights are tried. Defaults to linear.")
+  parser.add_argument("--csv", "-csv", nargs=1, type=str, help="Save each point of the sweep in specified csv file.")
+  parser.add_argument("--plot", "-p", action="store_true", help="Plot the Pareto frontier. Defaults to false.")
+  args = parser.parse_args()
+
+  model = find_model(f"smt.{args.model}")
+  data = load_instance(args.instance)
+  min_width, max_width = args.widths if args.widths is not None else (max(data["cwidth"]), data["WIDTH"])
+  # the greedy upper bound needs every circuit to fit the board without rotating it
+  if min_width < max(data["cwidth"]):
+    parser.error(f"boards narrower than the widest circuit ({max(data['cwidth'])}) are not supported")
+
+  points, build_time = width_sweep(model, data, list(range(min_width, max_width + 1, args.step)), args.timeout, schedule=args.schedule)
+  front = pareto_front(points)
+  print(f"Built encoding and constraints once in: {build_time:04f}s")
+
+  print("%6s %6s %6s %8s %8s %10s %7s" % ("width", "height", "lb", "status", "optimal", "time", "pareto"))
+  for p in points:
+    print("%6d %6s %6d %8s %8s %10.4f %7s" % (p["width"], p["height"], p["lower_bound"], p["status"], p["optimal"], p["time"], p in front))
+
+  if args.csv is not None:
+    with open(args.csv[0], "w") as f:
+      csv_writer = csv.writer(f)
+      csv_writer.writerow(["width", "height", "lower_bound", "status", "optimal", "time", "checks", "pareto", "x", "y"])
+      for p in points:
+        csv_writer.writerow([p["width"], p["height"], p["lower_bound"], p["status"], p["optimal"], p["time"], p["checks"], p in front, p["x"], p["y"]])
+
+  if args.plot:
+    import matplotlib.pyplot as plt
+    plt.step([p["width"] for p in front], [p["height"] for p in front], where="post", marker="o")
+    plt.xlabel("width")
+    plt.ylabel("height")
+    plt.title(f"Pareto frontier of {args.instance}")
+    plt.show()
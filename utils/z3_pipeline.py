@@ -0,0 +1,77 @@
+"""
+z3 solver pipelines: the logic or the tactic chain a model is solved with instead of the generic z3 solver.
+
+A model declares its pipeline with the LOGIC and TACTIC class attributes, the drivers replace them with --logic and --tactic
+on a subclass of the model (see with_pipeline).
+A tactic is either one of the named PIPELINES or a comma separated chain of z3 tactics e.g. simplify,solve-eqs,sat,
+generic goes back to the generic z3 solver.
+"""
+from typing import Dict, Optional, Tuple
+import z3
+
+# the generic z3 solver, for models declaring another pipeline
+GENERIC = "generic"
+# tactic chains worth trying, see utils.bench_pipeline
+PIPELINES: Dict[str, str] = {
+  # purely boolean models, straight to the SAT core
+  "sat": "simplify,solve-eqs,sat",
+  "sat-cnf": "simplify,solve-eqs,tseitin-cnf,sat",
+  # difference logic models, kept on integers
+  "lia": "simplify,propagate-ineqs,solve-eqs,smt",
+  # difference logic models, bounded integers turned into bit-vectors
+  "bv": "simplify,nla2bv,qfbv",
+  "bv-sat": "simplify,nla2bv,bit-blast,sat"
+}
+
+def tactic_chain(tactic: str) -> z3.Tactic:
+  """
+  Args:
+      tactic (str): Name of a pipeline or comma separated chain of z3 tactics
+  Returns:
+      z3.Tactic: Tactics applied one after the other
+  """
+  names = PIPELINES.get(tactic, tactic).split(",")
+  if len(names) == 1:
+    return z3.Tactic(names[0])
+  return z3.Then(*names)
+
+def make_solver(logic: Optional[str] = None, tactic: Optional[str] = None) -> z3.Solver:
+  """
+  Args:
+      logic (Optional[str], optional): SMT-LIB logic e.g. QF_FD or QF_IDL. Defaults to None.
+      tactic (Optional[str], optional): Name of a pipeline or chain of z3 tactics. Defaults to None.
+  Raises:
+      ValueError: Both a logic and a tactic are given
+  Returns:
+      z3.Solver: Solver for the logic or running the tactic, generic z3 solver if none is given or the tactic is generic
+  """
+  if logic is not None and tactic is not None:
+    raise ValueError("Either a logic or a tactic can be given, not both")
+
+  if logic is not None:
+    return z3.SolverFor(logic)
+  if tactic is not None and tactic != GENERIC:
+    return tactic_chain(tactic).solver()
+  return z3.Solver()
+
+def with_pipeline(model, logic: Optional[str] = None, tactic: Optional[str] = None) -> type:
+  """
+  Args:
+      model (type): SatModel or SmtModel class, left untouched
+      logic (Optional[str], optional): SMT-LIB logic e.g. QF_FD or QF_IDL. Defaults to None.
+      tactic (Optional[str], optional): Name of a pipeline or chain of z3 tactics. Defaults to None.
+  Returns:
+      type: Subclass of the model, with the same name, solved with the logic or the tactic
+  """
+  return type(model.__name__, (model,), {"LOGIC": logic, "TACTIC": tactic, "__module__": model.__module__})
+
+def parse_pipeline(spec: str) -> Tuple[Optional[str], Optional[str]]:
+  """
+  Args:
+      spec (str): generic, a logic (upper case, e.g. QF_LIA) or a tactic
+  Returns:
+      Tuple[Optional[str], Optional[str]]: Logic and tactic
+  """
+  if spec.isupper():
+    return spec, None
+  return None, spec
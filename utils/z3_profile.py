@@ -0,0 +1,95 @@
+"""
+z3 parameter profiles: the z3 parameters found by utils.tune for each model, loaded by the drivers with --z3-profile.
+
+A profile is a json file with the parameters of each model, keyed by module and class name e.g. sat.NaiveModel.
+"""
+from typing import Dict, Any, List
+import z3
+import json
+import os
+
+# parameters tried by utils.tune and values of each one
+SMT_SPACE: Dict[str, List[Any]] = {
+  "phase_selection": [0, 1, 2, 3, 4, 5],
+  "restart_strategy": [0, 1, 2, 3, 4],
+  "restart_factor": [1.1, 1.5, 2.0],
+  "relevancy": [0, 1, 2],
+  "arith.solver": [2, 6],
+  "random_seed": list(range(8))
+}
+# purely boolean models also try the parameters of the SAT core
+SAT_SPACE: Dict[str, List[Any]] = {
+  **{k: v for k, v in SMT_SPACE.items() if k != "arith.solver"},
+  "sat.phase": ["caching", "always_false", "always_true", "random"],
+  "sat.restart": ["luby", "geometric", "ema", "static"]
+}
+
+def profile_key(model) -> str:
+  """
+  Args:
+      model (type): Model class
+  Returns:
+      str: Key of the model in a profile e.g. sat.NaiveModel
+  """
+  # portfolios use the profile of the model they run
+  model = getattr(model, "MODEL", None) or model
+  return f"{model.__module__.split('.')[0]}.{model.__name__}"
+
+def parameter_space(model) -> Dict[str, List[Any]]:
+  """
+  Args:
+      model (type): SatModel or SmtModel class
+  Returns:
+      Dict[str, List[Any]]: Parameters that can be tuned for the model and their values
+  """
+  return SAT_SPACE if model.__module__.split(".")[0] == "sat" else SMT_SPACE
+
+def set_params(solver: z3.Solver, params: Dict[str, Any]):
+  """
+  Set z3 parameters of a solver.
+  Parameters of the SAT core (sat.*) and of parallel mode (parallel.*) are global in z3, global parameters are reset first so that
+  the profile of a model does not leak into the next one. The memory limit is not part of a profile and is kept.
+
+  Args:
+      solver (z3.Solver): Solver of a model
+      params (Dict[str, Any]): Parameter name and value
+  """
+  memory_max_size = z3.get_param("memory_max_size")
+  z3.reset_params()
+  z3.set_param("memory_max_size", memory_max_size)
+  for k, v in params.items():
+    if k.startswith(("sat.", "parallel.")):
+      z3.set_param(k, v)
+    else:
+      solver.set(k, v)
+
+def load_profile(path: str, model) -> Dict[str, Any]:
+  """
+  Args:
+      path (str): Profile file
+      model (type): Model class
+  Returns:
+      Dict[str, Any]: Parameters of the model, empty if the profile has none for it
+  """
+  with open(path) as f:
+    profile = json.load(f)
+
+  return profile.get(profile_key(model), {}).get("params", {})
+
+def save_profile(path: str, model, entry: Dict[str, Any]):
+  """
+  Add the parameters of a model to a profile, parameters of other models are kept
+
+  Args:
+      path (str): Profile file
+      model (type): Model class
+      entry (Dict[str, Any]): params along with how they have been chosen
+  """
+  profile = dict()
+  if os.path.exists(path):
+    with open(path) as f:
+      profile = json.load(f)
+
+  profile[profile_key(model)] = entry
+  with open(path, "w") as f:
+    json.dump(profile, f, indent=2)